@@ -0,0 +1,106 @@
+from datetime import date, datetime, timedelta
+
+# ---------------------------------------------------------
+# Tren progress_history, dihitung di MySQL (butuh MySQL 8 untuk window function)
+#
+# - Bucket mingguan / bulanan: rata-rata BMI & kalori, selisih terhadap
+#   bucket sebelumnya (LAG) dan moving average antar bucket.
+# - Series per entri: moving average daily_calories vs goal_calories.
+# progress_percent adalah kolom generated di progress_history (migrasi 7).
+# ---------------------------------------------------------
+
+TREND_BUCKETS = {
+    # Awal minggu = Senin, awal bulan = tanggal 1
+    'week': ("DATE_SUB(DATE(created_at), INTERVAL WEEKDAY(created_at) DAY)", 7),
+    'month': ("DATE_FORMAT(created_at, '%%Y-%%m-01')", 31),
+}
+TREND_DEFAULT_PERIODS = 12
+TREND_MAX_PERIODS = 104
+TREND_DEFAULT_WINDOW = 4
+TREND_MAX_WINDOW = 30
+TREND_MAX_POINTS = 500
+
+
+def iso(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def number(value, ndigits=1):
+    if value is None:
+        return None
+    return round(float(value)) if ndigits == 0 else round(float(value), ndigits)
+
+
+def fetch_trend_buckets(cursor, user_id, bucket='week', periods=TREND_DEFAULT_PERIODS, window=TREND_DEFAULT_WINDOW):
+    expr, days_per_period = TREND_BUCKETS[bucket]
+    since = datetime.now() - timedelta(days=days_per_period * periods)
+    # window: jumlah bucket untuk moving average (termasuk bucket saat ini)
+    cursor.execute(
+        f"""
+        SELECT bucket_start, entries, avg_bmi, avg_daily_calories, avg_goal_calories, avg_progress,
+               avg_bmi - LAG(avg_bmi) OVER w AS bmi_delta,
+               avg_daily_calories - LAG(avg_daily_calories) OVER w AS daily_calories_delta,
+               AVG(avg_daily_calories) OVER (w ROWS BETWEEN %s PRECEDING AND CURRENT ROW) AS daily_calories_ma,
+               AVG(avg_goal_calories) OVER (w ROWS BETWEEN %s PRECEDING AND CURRENT ROW) AS goal_calories_ma
+        FROM (
+            SELECT {expr} AS bucket_start,
+                   COUNT(*) AS entries,
+                   AVG(bmi) AS avg_bmi,
+                   AVG(daily_calories) AS avg_daily_calories,
+                   AVG(goal_calories) AS avg_goal_calories,
+                   AVG(progress_percent) AS avg_progress
+            FROM progress_history
+            WHERE user_id = %s AND created_at >= %s
+            GROUP BY bucket_start
+        ) b
+        WINDOW w AS (ORDER BY bucket_start)
+        ORDER BY bucket_start
+        """,
+        (window - 1, window - 1, user_id, since)
+    )
+    return [{
+        'bucket_start': iso(row['bucket_start']),
+        'entries': row['entries'],
+        'avg_bmi': number(row['avg_bmi']),
+        'bmi_delta': number(row['bmi_delta'], 2),
+        'avg_daily_calories': number(row['avg_daily_calories'], 0),
+        'daily_calories_delta': number(row['daily_calories_delta'], 0),
+        'daily_calories_ma': number(row['daily_calories_ma'], 0),
+        'avg_goal_calories': number(row['avg_goal_calories'], 0),
+        'goal_calories_ma': number(row['goal_calories_ma'], 0),
+        'avg_progress_percent': number(row['avg_progress']),
+    } for row in cursor.fetchall()]
+
+
+def fetch_trend_series(cursor, user_id, window=TREND_DEFAULT_WINDOW, points=100):
+    # Entri terbaru `points` dengan moving average per `window` entri
+    cursor.execute(
+        """
+        SELECT created_at, bmi, daily_calories, goal_calories, progress_percent,
+               AVG(daily_calories) OVER w AS daily_calories_ma,
+               AVG(goal_calories) OVER w AS goal_calories_ma,
+               bmi - LAG(bmi) OVER (ORDER BY created_at, id) AS bmi_delta
+        FROM (
+            SELECT id, created_at, bmi, daily_calories, goal_calories, progress_percent
+            FROM progress_history
+            WHERE user_id = %s
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+        ) recent
+        WINDOW w AS (ORDER BY created_at, id ROWS BETWEEN %s PRECEDING AND CURRENT ROW)
+        ORDER BY created_at, id
+        """,
+        (user_id, points, window - 1)
+    )
+    return [{
+        'created_at': iso(row['created_at']),
+        'bmi': number(row['bmi']),
+        'bmi_delta': number(row['bmi_delta'], 2),
+        'daily_calories': row['daily_calories'],
+        'goal_calories': row['goal_calories'],
+        'progress_percent': row['progress_percent'],
+        'daily_calories_ma': number(row['daily_calories_ma'], 0),
+        'goal_calories_ma': number(row['goal_calories_ma'], 0),
+    } for row in cursor.fetchall()]
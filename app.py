@@ -1,164 +1,416 @@
+import csv
+import hashlib
+import hmac
+import io
+import itertools
+import json
+import mimetypes
 import os
+import queue
 import re
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from flask_mysqldb import MySQL
+import threading
+import time
+from datetime import date, datetime, timedelta
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context, g, send_file, abort
+import click
 import MySQLdb
-from werkzeug.security import check_password_hash, generate_password_hash
-from werkzeug.exceptions import HTTPException
+from werkzeug.exceptions import HTTPException, TooManyRequests
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 
-# Gemini API (google-generativeai)
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+from analytics import (
+    TREND_BUCKETS, TREND_DEFAULT_PERIODS, TREND_DEFAULT_WINDOW, TREND_MAX_PERIODS, TREND_MAX_POINTS,
+    TREND_MAX_WINDOW, fetch_trend_buckets, fetch_trend_series,
+)
+from assets import DIST_DIR, ENCODINGS, build_assets, is_hashed_name, load_manifest
+from cache import make_cache
+from catalog import FoodIndex, read_catalog_csv, upsert_catalog_rows
+from db import Database
+from executor import BoundedExecutor, FutureTimeoutError, Overloaded
+from metrics import REGISTRY, Histogram, stats_collector
+from gemini import GeminiRegistry, load_sdk, track_call
+from passwords import PasswordHasher
+from mealplan import MealPlanner, default_protein, week_start
+from migrations import SCHEMA_VERSION, current_version, migrate
+from planner import RANGE_ERROR, compute_plan, goal_label, plan_rows, valid_mask
+from ratelimit import make_rate_limiter
+from sessions import make_session_interface
+from writebehind import WriteBehindBuffer
+
+# Load .env (GEMINI_API_KEY, konfigurasi pool, dll.) sebelum app dibuat
+load_dotenv()
 
-# --- Inisialisasi Flask ---
-app = Flask(__name__)
-app.secret_key = 'dietplanner-secret-key'
 
-# Load .env for Gemini API key
-load_dotenv()
-# Gemini API key setup
+# --- Inisialisasi Flask ---
+db = Database()
+
+
+def create_app():
+    app = Flask(__name__)
+    app.secret_key = os.getenv('SECRET_KEY') or 'dietplanner-secret-key'
+    if not os.getenv('SECRET_KEY'):
+        app.logger.warning('SECRET_KEY belum diisi; memakai secret key bawaan (jangan dipakai di produksi).')
+
+    # Jumlah reverse proxy tepercaya di depan aplikasi (nginx, load balancer).
+    # Jika > 0, request.remote_addr / scheme diambil dari X-Forwarded-For /
+    # X-Forwarded-Proto sebanyak hop tersebut, sehingga batas per IP di
+    # rate limiter berlaku per client, bukan per proxy. Jangan diisi jika
+    # aplikasi menerima koneksi langsung (header dapat dipalsukan client).
+    app.config['TRUSTED_PROXY_HOPS'] = int(os.getenv('TRUSTED_PROXY_HOPS', 0))
+    if app.config['TRUSTED_PROXY_HOPS'] > 0:
+        hops = app.config['TRUSTED_PROXY_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+
+    # Session server-side: sqlite (default), redis (SESSION_REDIS_URL), atau cookie
+    app.config['SESSION_BACKEND'] = os.getenv('SESSION_BACKEND', 'sqlite')
+    app.config['SESSION_SQLITE_PATH'] = os.getenv('SESSION_SQLITE_PATH')
+    app.config['SESSION_REDIS_URL'] = os.getenv('SESSION_REDIS_URL') or os.getenv('CACHE_URL')
+    app.config['SESSION_COOKIE_HTTPONLY'] = True
+    app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    app.config['SESSION_COOKIE_SECURE'] = os.getenv('SESSION_COOKIE_SECURE', '0') == '1'
+    app.permanent_session_lifetime = timedelta(days=int(os.getenv('SESSION_LIFETIME_DAYS', 7)))
+    session_interface = make_session_interface(app)
+    if session_interface is not None:
+        app.session_interface = session_interface
+    # Data pribadi (profil, email) hanya boleh di session server-side, bukan di cookie
+    app.config['SESSION_SERVER_SIDE'] = session_interface is not None
+
+    # Konfigurasi MySQL
+    app.config['MYSQL_HOST'] = os.getenv('MYSQL_HOST', 'localhost')
+    app.config['MYSQL_USER'] = os.getenv('MYSQL_USER', 'root')
+    app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD', '')
+    app.config['MYSQL_DB'] = os.getenv('MYSQL_DB', 'dietplanner')
+
+    # Connection pool (ukuran & eviction dapat diatur lewat environment)
+    app.config['DB_POOL_MIN_SIZE'] = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+    app.config['DB_POOL_MAX_SIZE'] = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+    app.config['DB_POOL_IDLE_TIMEOUT'] = int(os.getenv('DB_POOL_IDLE_TIMEOUT', 300))
+    app.config['DB_POOL_HEALTH_CHECK_INTERVAL'] = int(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30))
+    app.config['DB_POOL_ACQUIRE_TIMEOUT'] = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', 5))
+    # Query lebih lama dari ini (ms) ditulis ke log; 0 = nonaktif
+    app.config['DB_SLOW_QUERY_MS'] = float(os.getenv('DB_SLOW_QUERY_MS', 0))
+
+    # Read replica: "host[:port],..." (kosong = semua query ke MYSQL_HOST)
+    app.config['MYSQL_REPLICAS'] = os.getenv('MYSQL_REPLICAS', '')
+    app.config['DB_REPLICA_MAX_LAG'] = float(os.getenv('DB_REPLICA_MAX_LAG', 5))
+    app.config['DB_REPLICA_LAG_CHECK_INTERVAL'] = float(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', 5))
+    # Hanya untuk pengujian: izinkan server yang bukan replica (stand-in) menerima bacaan
+    app.config['MYSQL_REPLICA_ALLOW_NON_REPLICA'] = os.getenv('MYSQL_REPLICA_ALLOW_NON_REPLICA', '0') == '1'
+    # Lama user membaca dari primary setelah mutasi miliknya sendiri
+    app.config['DB_STICKY_SECONDS'] = float(os.getenv('DB_STICKY_SECONDS', 10))
+
+    db.init_app(app)
+    app.add_template_filter(goal_label)
+    return app
+
+
+app = create_app()
+
+# Latensi per route (label = pola URL, bukan path asli, agar label tetap sedikit).
+# Untuk response streaming yang terukur adalah waktu sampai header dikirim.
+REQUEST_SECONDS = Histogram(
+    'dietplanner_http_request_seconds', 'Latensi request per route', ['route', 'method', 'status'])
+
+
+@app.before_request
+def start_request_timer():
+    g._request_started = time.perf_counter()
+
+
+@app.before_request
+def route_reads_after_write():
+    # Read-your-writes: setelah user mengubah data, baca dari primary sebentar
+    if db.replicas and session.get('db_primary_until', 0) > time.time():
+        db.use_primary()
+
+
+@app.after_request
+def remember_write(response):
+    if db.replicas and db.wrote:
+        session['db_primary_until'] = time.time() + app.config['DB_STICKY_SECONDS']
+    return response
+
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop('_request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                route=route, method=request.method, status=response.status_code)
+    return response
+
+# Rate limiting per route (token bucket per user & IP). Bucket dibagi antar
+# worker lewat Redis jika RATE_LIMIT_URL / CACHE_URL diisi.
+rate_limiter = make_rate_limiter(
+    os.getenv("RATE_LIMIT_URL") or os.getenv("CACHE_URL"),
+    enabled=os.getenv("RATE_LIMIT_ENABLED", "1") == "1",
+    env=os.environ,
+    trust_proxy=app.config['TRUSTED_PROXY_HOPS'] > 0,
+)
+
+# Gemini API key setup. Library google-generativeai baru di-import (dan
+# dikonfigurasi) saat chatbot pertama kali dipakai, lihat get_genai().
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "ISI_API_KEY_GEMINI")
-if genai and GEMINI_API_KEY and GEMINI_API_KEY != "ISI_API_KEY_GEMINI":
-    genai.configure(api_key=GEMINI_API_KEY)
 
-# Endpoint untuk menampilkan daftar model Gemini yang tersedia
-@app.route('/api/list_models', methods=['GET'])
-def list_gemini_models():
-    if not genai:
-        return jsonify({'error': 'google-generativeai library not installed'}), 500
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "ISI_API_KEY_GEMINI":
-        return jsonify({'error': 'Gemini API key not set'}), 500
-    try:
-        models = []
-        for m in genai.list_models():
-            models.append({
-                'name': getattr(m, 'name', str(m)),
-                'description': getattr(m, 'description', ''),
-                'supported_methods': getattr(m, 'supported_generation_methods', [])
-            })
-        return jsonify({'models': models})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
 
-app = Flask(__name__)
-app.secret_key = 'dietplanner-secret-key'
+def gemini_key_configured():
+    return bool(GEMINI_API_KEY) and GEMINI_API_KEY != "ISI_API_KEY_GEMINI"
+
+
+def get_genai():
+    # None jika library tidak terpasang
+    return load_sdk(GEMINI_API_KEY if gemini_key_configured() else None)
+
 
-# Load .env for Gemini API key
-load_dotenv()
-# Gemini API key setup
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "ISI_API_KEY_GEMINI")
-if genai and GEMINI_API_KEY and GEMINI_API_KEY != "ISI_API_KEY_GEMINI":
-    genai.configure(api_key=GEMINI_API_KEY)
 # ---------------------------------------------------------
 # ROUTE: Gemini Chatbot API
 # ---------------------------------------------------------
+GEMINI_MODEL_NAME = 'models/gemini-2.5-flash'
+# Restrict chatbot to diet planner topics only
+CHATBOT_SYSTEM_INSTRUCTION = (
+    "Anda adalah asisten diet planner. Jawab hanya pertanyaan seputar diet, nutrisi, pola makan sehat, fitur aplikasi dietplanner, dan kesehatan terkait makanan. "
+    "Jika pertanyaan di luar topik diet, nutrisi, atau aplikasi dietplanner, jawab dengan sopan: 'Maaf, saya hanya dapat membantu pertanyaan seputar diet, nutrisi, dan fitur aplikasi dietplanner.'"
+)
+
+# Cache jawaban chatbot: LRU + TTL di memori, atau Redis bila CACHE_URL diisi
+CACHE_URL = os.getenv("CACHE_URL")
+chatbot_cache = make_cache(
+    'chatbot',
+    maxsize=int(os.getenv("CHATBOT_CACHE_SIZE", 2048)),
+    ttl=int(os.getenv("CHATBOT_CACHE_TTL", 24 * 3600)),
+    url=CACHE_URL,
+)
+
+
+# Panggilan Gemini berjalan di thread pool terpisah dengan konkurensi & antrean
+# terbatas, sehingga LLM yang lambat tidak menghabiskan worker untuk route lain.
+gemini_executor = BoundedExecutor(
+    'gemini',
+    max_workers=int(os.getenv("GEMINI_MAX_WORKERS", 4)),
+    max_queue=int(os.getenv("GEMINI_MAX_QUEUE", 8)),
+    timeout=float(os.getenv("GEMINI_TIMEOUT", 30)),
+)
+GEMINI_RETRY_AFTER = 5
+
+# Model client dibuat sekali; katalog /api/list_models di-cache di memori
+gemini_registry = GeminiRegistry(
+    lambda: get_genai(),
+    gemini_executor,
+    refresh_interval=int(os.getenv("GEMINI_MODELS_REFRESH", 3600)),
+)
+
+
+def overloaded_response():
+    response = jsonify({'error': 'Chatbot sedang sibuk. Coba lagi sebentar.'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(GEMINI_RETRY_AFTER)
+    return response
+
+
+def gemini_timeout_response():
+    return jsonify({'error': 'Chatbot tidak merespons tepat waktu. Coba lagi nanti.'}), 504
+
+
+def normalize_question(question):
+    # "Berapa kalori  nasi?" dan "berapa kalori nasi" memakai entri cache yang sama
+    question = re.sub(r'[^\w\s]', ' ', question.lower())
+    return ' '.join(question.split())
+
+
+def chatbot_cache_key(question, system_instruction):
+    raw = '\x00'.join((GEMINI_MODEL_NAME, system_instruction, normalize_question(question)))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def sse_event(data, event=None):
+    # Satu event Server-Sent Events; data selalu JSON agar newline aman
+    lines = [f'event: {event}'] if event else []
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False))
+    return '\n'.join(lines) + '\n\n'
+
+
+def wants_event_stream():
+    return request.args.get('stream') == '1' or 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def generate_chatbot_answer(full_prompt):
+    # Dijalankan di gemini_executor (tanpa request context)
+    model = gemini_registry.get_model(GEMINI_MODEL_NAME)
+    with track_call('generate'):
+        response = model.generate_content(full_prompt)
+    return response.text if hasattr(response, 'text') else str(response)
+
+
+def produce_chatbot_stream(full_prompt, chunks):
+    # Dijalankan di gemini_executor; hasil dikirim lewat queue ke generator SSE
+    try:
+        model = gemini_registry.get_model(GEMINI_MODEL_NAME)
+        with track_call('stream'):
+            for chunk in model.generate_content(full_prompt, stream=True):
+                try:
+                    text = chunk.text
+                except Exception:
+                    # chunk tanpa teks (mis. hanya metadata / safety) dilewati
+                    text = ''
+                if text:
+                    chunks.put(('text', text))
+    except Exception as e:
+        chunks.put(('error', str(e)))
+        return
+    chunks.put(('done', None))
+
+
+def relay_chatbot_stream(chunks, cache_key):
+    # Relay potongan jawaban Gemini ke browser begitu diterima
+    parts = []
+    while True:
+        try:
+            kind, value = chunks.get(timeout=gemini_executor.timeout)
+        except queue.Empty:
+            yield sse_event({'error': 'Chatbot tidak merespons tepat waktu. Coba lagi nanti.'}, event='error')
+            return
+        if kind == 'text':
+            parts.append(value)
+            yield sse_event({'text': value})
+        elif kind == 'error':
+            yield sse_event({'error': value}, event='error')
+            return
+        else:
+            break
+    answer = ''.join(parts)
+    if answer:
+        chatbot_cache.set(cache_key, answer)
+    yield sse_event({'cached': False}, event='done')
+
+
+def event_stream_response(events):
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Matikan buffering reverse proxy (nginx) agar chunk langsung terkirim
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @app.route('/api/chatbot', methods=['POST'])
+@rate_limiter.limit('chatbot', user='10/minute', ip='30/minute')
 def api_chatbot():
-    if not genai:
-        return jsonify({'error': 'google-generativeai library not installed'}), 500
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "ISI_API_KEY_GEMINI":
+    if not gemini_key_configured():
         return jsonify({'error': 'Gemini API key not set'}), 500
-    data = request.get_json()
-    question = data.get('question', '').strip()
+    if get_genai() is None:
+        return jsonify({'error': 'google-generativeai library not installed'}), 500
+    data = request.get_json(silent=True) or {}
+    question = (data.get('question') or '').strip()
     if not question:
         return jsonify({'error': 'Pertanyaan kosong'}), 400
-    # Restrict chatbot to diet planner topics only
-    system_instruction = (
-        "Anda adalah asisten diet planner. Jawab hanya pertanyaan seputar diet, nutrisi, pola makan sehat, fitur aplikasi dietplanner, dan kesehatan terkait makanan. "
-        "Jika pertanyaan di luar topik diet, nutrisi, atau aplikasi dietplanner, jawab dengan sopan: 'Maaf, saya hanya dapat membantu pertanyaan seputar diet, nutrisi, dan fitur aplikasi dietplanner.'"
-    )
-    full_prompt = f"{system_instruction}\n\nPertanyaan pengguna: {question}"
+
+    cache_key = chatbot_cache_key(question, CHATBOT_SYSTEM_INSTRUCTION)
+    cached = chatbot_cache.get(cache_key)
+    stream = wants_event_stream()
+    if cached is not None:
+        if stream:
+            return event_stream_response(iter([
+                sse_event({'text': cached}),
+                sse_event({'cached': True}, event='done'),
+            ]))
+        return jsonify({'answer': cached, 'cached': True})
+
+    full_prompt = f"{CHATBOT_SYSTEM_INSTRUCTION}\n\nPertanyaan pengguna: {question}"
+    if stream:
+        chunks = queue.Queue()
+        try:
+            gemini_executor.submit(produce_chatbot_stream, full_prompt, chunks)
+        except Overloaded:
+            return overloaded_response()
+        return event_stream_response(relay_chatbot_stream(chunks, cache_key))
     try:
-        # Gunakan model Gemini versi terbaru yang valid
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        response = model.generate_content(full_prompt)
-        answer = response.text if hasattr(response, 'text') else str(response)
-        return jsonify({'answer': answer})
+        answer = gemini_executor.run(generate_chatbot_answer, full_prompt)
+    except Overloaded:
+        return overloaded_response()
+    except FutureTimeoutError:
+        return gemini_timeout_response()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    if answer:
+        chatbot_cache.set(cache_key, answer)
+    return jsonify({'answer': answer, 'cached': False})
 
-# Konfigurasi MySQL
-app.config['MYSQL_HOST'] = 'localhost'
-app.config['MYSQL_USER'] = 'root'
-app.config['MYSQL_PASSWORD'] = '' 
-app.config['MYSQL_DB'] = 'dietplanner'
 
-mysql = MySQL(app)
-
-# Pastikan tabel progress_history ada
-def create_progress_table():
-    cursor = mysql.connection.cursor()
+# Endpoint untuk menampilkan daftar model Gemini yang tersedia
+@app.route('/api/list_models', methods=['GET'])
+@rate_limiter.limit('list_models', ip='30/minute')
+def list_gemini_models():
+    if not gemini_key_configured():
+        return jsonify({'error': 'Gemini API key not set'}), 500
+    if get_genai() is None:
+        return jsonify({'error': 'google-generativeai library not installed'}), 500
     try:
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS progress_history (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT NOT NULL,
-                bmi FLOAT,
-                daily_calories INT,
-                goal_key VARCHAR(32),
-                goal_calories INT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            ) ENGINE=InnoDB;
-            """
-        )
-        mysql.connection.commit()
-    finally:
-        try:
-            cursor.close()
-        except Exception:
-            pass
+        models, etag = gemini_registry.list_models()
+    except Overloaded:
+        return overloaded_response()
+    except FutureTimeoutError:
+        return gemini_timeout_response()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    response = jsonify({'models': models})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    # 304 Not Modified jika If-None-Match cocok dengan ETag katalog
+    return response.make_conditional(request)
 
-# Pastikan tabel food_log ada
-def create_foodlog_table():
-    cursor = mysql.connection.cursor()
-    try:
+# -------------------------
+# Food log daily summary helpers
+# -------------------------
+# Dipanggil dalam transaksi yang sama dengan perubahan food_log (sebelum commit)
+def adjust_daily_summary(cursor, user_id, log_date, calories_delta, count_delta):
+    cursor.execute(
+        "INSERT INTO food_log_daily (user_id, log_date, total_calories, entry_count) VALUES (%s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE total_calories = total_calories + VALUES(total_calories), "
+        "entry_count = entry_count + VALUES(entry_count)",
+        (user_id, log_date, calories_delta, count_delta)
+    )
+    if count_delta < 0:
         cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS food_log (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT NOT NULL,
-                food_name VARCHAR(100),
-                calories INT,
-                log_date DATE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            ) ENGINE=InnoDB;
-            """
+            "DELETE FROM food_log_daily WHERE user_id = %s AND log_date = %s AND entry_count <= 0",
+            (user_id, log_date)
         )
-        mysql.connection.commit()
-    finally:
-        try:
-            cursor.close()
-        except Exception:
-            pass
 
-# Pastikan tabel users ada (jika belum dibuat oleh migrasi lain)
-def create_users_table():
-    cursor = mysql.connection.cursor()
-    try:
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                fullname VARCHAR(255) NOT NULL,
-                email VARCHAR(255) NOT NULL UNIQUE,
-                username VARCHAR(100) NOT NULL UNIQUE,
-                password_hash VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            ) ENGINE=InnoDB;
-            """
-        )
-        mysql.connection.commit()
-    finally:
-        try:
-            cursor.close()
-        except Exception:
-            pass
+SUMMARY_DEFAULT_DAYS = 7
+SUMMARY_MAX_DAYS = 366
+
+def fetch_daily_summary(cursor, user_id, days):
+    # O(jumlah hari): membaca food_log_daily, bukan seluruh baris food_log
+    since = date.today() - timedelta(days=days - 1)
+    cursor.execute(
+        "SELECT log_date, total_calories, entry_count FROM food_log_daily "
+        "WHERE user_id = %s AND log_date >= %s ORDER BY log_date DESC",
+        (user_id, since)
+    )
+    return list(cursor.fetchall())
+
+def fetch_latest_goal_calories(cursor, user_id):
+    cursor.execute(
+        "SELECT goal_calories FROM progress_history WHERE user_id = %s ORDER BY created_at DESC, id DESC LIMIT 1",
+        (user_id,)
+    )
+    row = cursor.fetchone()
+    return row['goal_calories'] if row else None
+
+def weekly_summary(days):
+    # Kelompokkan baris harian ke minggu ISO (Senin sebagai awal minggu)
+    weeks = {}
+    for d in days:
+        monday = d['log_date'] - timedelta(days=d['log_date'].weekday())
+        week = weeks.setdefault(monday, {'week_start': monday, 'total_calories': 0, 'entry_count': 0, 'days_logged': 0})
+        week['total_calories'] += d['total_calories']
+        week['entry_count'] += d['entry_count']
+        week['days_logged'] += 1
+    result = sorted(weeks.values(), key=lambda w: w['week_start'], reverse=True)
+    for week in result:
+        week['avg_daily_calories'] = int(week['total_calories'] / week['days_logged'])
+    return result
 
 
 # -------------------------
@@ -180,16 +432,306 @@ def safe_float(value, default=0.0):
         return float(value)
     except Exception:
         return default
-# Panggil pembuatan tabel sekali saat aplikasi start (jika koneksi tersedia)
+
+# -------------------------
+# Keyset pagination helpers
+# -------------------------
+# Cursor berbentuk "<timestamp>-<id>" dari baris terakhir halaman sebelumnya,
+# sehingga halaman berikutnya cukup memakai index (user_id, kolom waktu, id)
+# tanpa OFFSET.
+HISTORY_PAGE_SIZE = 200
+FOOD_LOG_PAGE_SIZE = 100
+HISTORY_CURSOR_FORMAT = '%Y%m%d%H%M%S'
+FOOD_LOG_CURSOR_FORMAT = '%Y%m%d'
+
+def encode_page_cursor(value, row_id, fmt):
+    return f"{value.strftime(fmt)}-{row_id}"
+
+def decode_page_cursor(cursor, fmt):
+    if not cursor:
+        return None
+    try:
+        stamp, row_id = cursor.split('-', 1)
+        return datetime.strptime(stamp, fmt), int(row_id)
+    except (ValueError, TypeError):
+        return None
+# -------------------------
+# Schema migrations
+# -------------------------
+# DDL hanya dijalankan sekali per deploy: `flask --app app migrate`
+@app.cli.command('migrate')
+def migrate_command():
+    """Terapkan migrasi skema database yang belum dijalankan."""
+    applied = migrate(db.connection)
+    if applied:
+        click.echo('Migrasi diterapkan: ' + ', '.join(str(v) for v in applied))
+    else:
+        click.echo(f'Skema sudah terbaru (versi {SCHEMA_VERSION}).')
+
+
+def check_schema_version():
+    with db.cursor() as cursor:
+        version = current_version(cursor)
+    if version < SCHEMA_VERSION:
+        app.logger.warning(
+            'Skema database versi %s, aplikasi membutuhkan versi %s. Jalankan `flask --app app migrate`.',
+            version, SCHEMA_VERSION
+        )
+    return version
+
+# Saat start hanya cek versi skema (tanpa DDL)
 with app.app_context():
     try:
-        # Ensure users table exists before progress_history which references it
-        create_users_table()
-        create_progress_table()
-        create_foodlog_table()
+        check_schema_version()
+    except Exception as e:
+        # jika DB belum siap atau belum pernah dimigrasi saat import, lewati
+        app.logger.warning('Tidak dapat memeriksa versi skema: %s', e)
+
+# ---------------------------------------------------------
+# Katalog makanan (autocomplete food_log)
+# ---------------------------------------------------------
+# Index dibangun sekali per worker saat pencarian pertama, atau langsung
+# di-load dari FOOD_INDEX_PATH (hasil `flask build-food-index`) saat start.
+# Setiap FOOD_INDEX_REFRESH detik hanya baris yang berubah yang dibaca ulang;
+# jika ada baris yang dihapus (jumlah baris berbeda) atau sudah lewat
+# FOOD_INDEX_FULL_RELOAD detik, index dibangun ulang penuh.
+FOOD_INDEX_PATH = os.getenv("FOOD_INDEX_PATH")
+FOOD_INDEX_REFRESH = int(os.getenv("FOOD_INDEX_REFRESH", 60))
+FOOD_INDEX_FULL_RELOAD = int(os.getenv("FOOD_INDEX_FULL_RELOAD", 3600))
+FOOD_SEARCH_MAX_LIMIT = 20
+
+food_index = FoodIndex()
+food_index_lock = threading.Lock()
+
+
+def ensure_food_index():
+    loaded_at = food_index.loaded_at
+    if loaded_at is not None and time.monotonic() - loaded_at < FOOD_INDEX_REFRESH:
+        return food_index
+    # Hanya satu thread yang membangun / menyegarkan; yang lain memakai index lama
+    if not food_index_lock.acquire(blocking=loaded_at is None):
+        return food_index
+    try:
+        if food_index.loaded_at == loaded_at:
+            with db.cursor(MySQLdb.cursors.DictCursor, read=True) as cursor:
+                if loaded_at is None:
+                    food_index.build_from_db(cursor)
+                else:
+                    food_index.refresh_from_db(cursor, FOOD_INDEX_FULL_RELOAD)
+    except Exception as e:
+        app.logger.error('Gagal memuat katalog makanan: %s', e)
+        if food_index.loaded_at is None:
+            raise
+        # Coba lagi setelah interval berikutnya
+        food_index.loaded_at = time.monotonic()
+    finally:
+        food_index_lock.release()
+    return food_index
+
+
+if FOOD_INDEX_PATH and os.path.exists(FOOD_INDEX_PATH):
+    try:
+        food_index.load(FOOD_INDEX_PATH)
+    except Exception as e:
+        app.logger.warning('Tidak dapat memuat index katalog %s: %s', FOOD_INDEX_PATH, e)
+
+
+@app.cli.command('import-foods')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_foods_command(path):
+    """Muat / perbarui katalog makanan dari file CSV."""
+    with db.cursor() as cursor:
+        count = upsert_catalog_rows(cursor, read_catalog_csv(path))
+        db.commit()
+    click.echo(f'{count} makanan dimuat ke food_catalog.')
+
+
+@app.cli.command('build-food-index')
+@click.argument('path', required=False)
+def build_food_index_command(path):
+    """Bangun index pencarian katalog makanan ke file (untuk FOOD_INDEX_PATH)."""
+    path = path or FOOD_INDEX_PATH
+    if not path:
+        raise click.UsageError('Sebutkan PATH atau isi FOOD_INDEX_PATH.')
+    with db.cursor(MySQLdb.cursors.DictCursor) as cursor:
+        food_index.build_from_db(cursor)
+    food_index.save(path)
+    click.echo(f'Index {len(food_index)} makanan disimpan ke {path}.')
+
+
+@app.route('/api/foods/search')
+def api_food_search():
+    query = (request.args.get('q') or '').strip()
+    limit = min(max(safe_int(request.args.get('limit'), 10), 1), FOOD_SEARCH_MAX_LIMIT)
+    if not query:
+        return jsonify({'items': []})
+    try:
+        items = ensure_food_index().search(query, limit)
     except Exception:
-        # jika DB belum siap atau tidak terhubung saat import, lewati - akan dibuat saat runtime
-        pass
+        return jsonify({'error': 'Katalog makanan tidak tersedia'}), 503
+    response = jsonify({'items': items})
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
+
+# ---------------------------------------------------------
+# Menu mingguan (mealplan.py)
+# ---------------------------------------------------------
+# Planner dibangun dari index katalog di memori dan dibuat ulang hanya jika
+# index disegarkan. Menu disimpan per user per minggu di meal_plans hanya oleh
+# POST /dietplanner dan `flask precompute-meal-plans`. GET /dietplanner hanya
+# membaca: jika menu tersimpan belum ada atau targetnya sudah berubah, menu
+# dihitung di memori tanpa ditulis. Menu deterministik (seed = user id +
+# minggu), jadi hasilnya sama dengan yang nanti disimpan.
+MEAL_PLAN_BATCH_SIZE = 500
+
+meal_planner = {'planner': None, 'loaded_at': None}
+
+
+def get_meal_planner():
+    index = ensure_food_index()
+    if meal_planner['planner'] is None or meal_planner['loaded_at'] != index.loaded_at:
+        meal_planner['planner'] = MealPlanner(index.all_items())
+        meal_planner['loaded_at'] = index.loaded_at
+    return meal_planner['planner']
+
+
+def save_meal_plans(cursor, plans):
+    # plans: list (user_id, plan dict) untuk satu minggu; satu multi-row upsert
+    cursor.executemany(
+        "INSERT INTO meal_plans (user_id, week_start, goal_calories, goal_protein, plan) VALUES (%s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE goal_calories = VALUES(goal_calories), goal_protein = VALUES(goal_protein), "
+        "plan = VALUES(plan)",
+        [(user_id, plan['week_start'], plan['goal_calories'], plan['goal_protein'], json.dumps(plan))
+         for user_id, plan in plans]
+    )
+
+
+def load_meal_plan(user_id):
+    # Mengembalikan (menu tersimpan minggu ini, target terakhir di progress_history)
+    with db.cursor(MySQLdb.cursors.DictCursor, read=True) as cursor:
+        cursor.execute(
+            "SELECT plan FROM meal_plans WHERE user_id = %s AND week_start = %s",
+            (user_id, week_start())
+        )
+        row = cursor.fetchone()
+        cursor.execute(
+            "SELECT goal_calories, goal_protein FROM progress_history WHERE user_id = %s "
+            "ORDER BY created_at DESC, id DESC LIMIT 1",
+            (user_id,)
+        )
+        latest = cursor.fetchone()
+    plan = row['plan'] if row else None
+    if isinstance(plan, (str, bytes)):
+        plan = json.loads(plan)
+    return plan, latest
+
+
+def plan_matches_goal(plan, goal_calories, goal_protein):
+    goal_protein = float(goal_protein) if goal_protein else default_protein(goal_calories)
+    return plan['goal_calories'] == int(goal_calories) and plan['goal_protein'] == round(goal_protein, 1)
+
+
+def current_meal_plan(user_id):
+    # Read-only: menu tersimpan jika masih sesuai target terakhir; jika tidak,
+    # dihitung ulang di memori (tidak disimpan agar GET tidak menulis ke DB)
+    plan, latest = load_meal_plan(user_id)
+    pending = pending_progress(user_id)
+    if pending:
+        latest = pending[0]  # target baru yang belum di-flush write-behind
+    if not latest or not latest.get('goal_calories') or latest['goal_calories'] <= 0:
+        return plan
+    if plan is not None and plan_matches_goal(plan, latest['goal_calories'], latest['goal_protein']):
+        return plan
+    return get_meal_planner().plan_week(latest['goal_calories'], latest['goal_protein'], seed=user_id)
+
+
+@app.cli.command('precompute-meal-plans')
+@click.option('--limit', type=int, default=None, help='Jumlah user maksimum (untuk uji coba).')
+def precompute_meal_plans_command(limit):
+    """Hitung menu minggu ini untuk semua user dari target terakhir di progress_history."""
+    planner = get_meal_planner()
+    if not len(planner):
+        raise click.ClickException('food_catalog kosong; jalankan migrasi atau `flask import-foods`.')
+    with db.cursor(MySQLdb.cursors.DictCursor) as cursor:
+        cursor.execute(
+            "SELECT p.user_id, p.goal_calories, p.goal_protein FROM progress_history p "
+            "JOIN (SELECT user_id, MAX(id) AS id FROM progress_history GROUP BY user_id) latest ON latest.id = p.id "
+            "WHERE p.goal_calories > 0 ORDER BY p.user_id" + (" LIMIT %s" if limit else ""),
+            (limit,) if limit else None
+        )
+        targets = cursor.fetchall()
+
+    start = week_start()
+    started = time.perf_counter()
+    saved = 0
+    for offset in range(0, len(targets), MEAL_PLAN_BATCH_SIZE):
+        plans = []
+        for row in targets[offset:offset + MEAL_PLAN_BATCH_SIZE]:
+            plan = planner.plan_week(row['goal_calories'], row['goal_protein'], seed=row['user_id'], start=start)
+            if plan is not None:
+                plans.append((row['user_id'], plan))
+        if plans:
+            with db.cursor() as cursor:
+                save_meal_plans(cursor, plans)
+                db.commit()
+            saved += len(plans)
+    click.echo(f'{saved} menu mingguan disimpan dalam {time.perf_counter() - started:.1f} s.')
+
+
+# ---------------------------------------------------------
+# ROUTE: Aset statis ber-hash (static/dist, hasil `flask build-assets`)
+# ---------------------------------------------------------
+ASSET_MAX_AGE = 365 * 24 * 3600
+asset_manifest = load_manifest(app.static_folder)
+
+
+@app.template_global()
+def asset_url(filename):
+    # Nama ber-hash jika sudah di-build; tanpa manifest jatuh ke /static biasa
+    hashed = asset_manifest.get(filename)
+    if hashed:
+        return url_for('hashed_asset', filename=hashed)
+    return url_for('static', filename=filename)
+
+
+@app.route('/assets/<path:filename>')
+def hashed_asset(filename):
+    # Semua file ber-hash di dist/ dilayani, termasuk generasi sebelumnya yang
+    # sengaja disimpan build_assets untuk halaman yang masih terbuka
+    if not is_hashed_name(filename):
+        abort(404)
+    path = safe_join(os.path.join(app.static_folder, DIST_DIR), filename)
+    if path is None:
+        abort(404)
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] > 0 and os.path.exists(path + suffix):
+            path, encoding = path + suffix, name
+            break
+    if not os.path.exists(path):
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    # Nama file berubah setiap isinya berubah, jadi boleh di-cache selamanya
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True, max_age=ASSET_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Minify, beri hash, dan kompres (gzip / brotli) file static/ ke static/dist/."""
+    global asset_manifest
+    manifest, report = build_assets(app.static_folder)
+    asset_manifest = manifest
+    for row in report:
+        variants = ''.join(f", {name} {row[name]}" for name, _ in ENCODINGS if name in row)
+        click.echo(f"{row['name']} -> {row['file']}: {row['original']} -> {row['minified']} byte{variants}")
+    click.echo(f'{len(manifest)} aset ditulis ke {os.path.join(app.static_folder, DIST_DIR)}.')
+
 
 # ---------------------------------------------------------
 # ROUTE: Home Page
@@ -202,7 +744,53 @@ def index():
 # ---------------------------------------------------------
 # ROUTE: Login
 # ---------------------------------------------------------
+# Hashing password: metode dapat diatur, dijalankan di pool terbatas
+hash_executor = BoundedExecutor(
+    'password-hash',
+    max_workers=int(os.getenv("HASH_MAX_WORKERS", os.cpu_count() or 2)),
+    max_queue=int(os.getenv("HASH_MAX_QUEUE", 32)),
+    timeout=float(os.getenv("HASH_TIMEOUT", 10)),
+)
+password_hasher = PasswordHasher(
+    hash_executor,
+    method=os.getenv("PASSWORD_HASH_METHOD", "scrypt"),
+    salt_length=int(os.getenv("PASSWORD_SALT_LENGTH", 16)),
+)
+HASH_RETRY_AFTER = 2
+
+
+def find_login_user(login_input, read=True):
+    # Satu lookup per unique index (bukan OR antar dua kolom); input dengan '@'
+    # dicoba sebagai email dulu, lalu username sebagai cadangan.
+    columns = ('email', 'username') if '@' in login_input else ('username',)
+    with db.cursor(MySQLdb.cursors.DictCursor, read=read) as cursor:
+        for column in columns:
+            cursor.execute(
+                f'SELECT id, username, fullname, email, created_at, password_hash FROM users WHERE {column} = %s LIMIT 1',
+                (login_input,)
+            )
+            user = cursor.fetchone()
+            if user:
+                return user
+    if read and db.replicas:
+        # Akun baru mungkin belum sampai di replica
+        return find_login_user(login_input, read=False)
+    return None
+
+
+def rehash_password(user_id, password):
+    # Upgrade hash lama ke parameter terbaru; kegagalan tidak menggagalkan login
+    try:
+        new_hash = password_hasher.hash(password)
+        with db.cursor() as cursor:
+            cursor.execute('UPDATE users SET password_hash = %s WHERE id = %s', (new_hash, user_id))
+            db.commit()
+    except Exception as e:
+        app.logger.warning('Gagal rehash password user %s: %s', user_id, e)
+
+
 @app.route('/login', methods=['GET', 'POST'])
+@rate_limiter.limit('login', ip='20/minute', methods=('POST',))
 def login():
     if request.method == 'POST':
 
@@ -214,27 +802,39 @@ def login():
             return render_template('login.html')
 
         try:
-            cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-            cursor.execute(
-                'SELECT * FROM users WHERE email = %s OR username = %s',
-                (login_input, login_input)
-            )
-            user = cursor.fetchone()
+            user = find_login_user(login_input)
         except MySQLdb.Error as e:
             app.logger.error('DB error on login: %s', e)
             flash('Terjadi kesalahan server. Coba lagi nanti.', 'error')
             user = None
-        finally:
-            try:
-                cursor.close()
-            except Exception:
-                pass
 
-        # Validasi login
-        if user and check_password_hash(user['password_hash'], password_input):
+        # Validasi login (hash dihitung di password_hasher, antrean terbatas)
+        try:
+            valid = bool(user) and password_hasher.verify(user['password_hash'], password_input)
+        except (Overloaded, FutureTimeoutError):
+            flash('Server sedang sibuk. Coba lagi sebentar.', 'error')
+            return render_template('login.html'), 503, {'Retry-After': str(HASH_RETRY_AFTER)}
+
+        if valid:
+            if password_hasher.needs_rehash(user['password_hash']):
+                rehash_password(user['id'], password_input)
+            if hasattr(session, 'regenerate'):
+                session.regenerate()
+            # Cookie berlaku selama permanent_session_lifetime, sama dengan TTL di store
+            session.permanent = True
             session['loggedin'] = True
             session['id'] = user['id']
             session['username'] = user['username']
+            # Profil disimpan di session server-side agar /user_info tidak query users lagi.
+            # Dengan SESSION_BACKEND=cookie isi session terbaca client, jadi hanya id / username.
+            if app.config['SESSION_SERVER_SIDE']:
+                session['profile'] = {
+                    'fullname': user.get('fullname'),
+                    'email': user.get('email'),
+                    'created_at': user.get('created_at'),
+                }
+            else:
+                session.pop('profile', None)
             flash('Login berhasil!', 'success')
             return redirect(url_for('index'))
         else:
@@ -247,6 +847,7 @@ def login():
 # ROUTE: Signup / Register
 # ---------------------------------------------------------
 @app.route('/signup', methods=['GET', 'POST'])
+@rate_limiter.limit('signup', ip='10/hour', methods=('POST',))
 def signup():
     if request.method == 'POST':
 
@@ -267,13 +868,16 @@ def signup():
             flash('Password dan konfirmasi tidak sama.', 'error')
             return render_template('signup.html')
 
-        try:
-            cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-            # Cek apakah email atau username sudah terdaftar
-            cursor.execute('SELECT * FROM users WHERE email = %s', (email,))
-            account_email = cursor.fetchone()
-            cursor.execute('SELECT * FROM users WHERE username = %s', (username,))
-            account_username = cursor.fetchone()
+        with db.cursor(MySQLdb.cursors.DictCursor) as cursor:
+            # Cek apakah email atau username sudah terdaftar (satu round trip, dua lookup index)
+            cursor.execute(
+                "SELECT 'email' AS field FROM users WHERE email = %s "
+                "UNION ALL SELECT 'username' AS field FROM users WHERE username = %s",
+                (email, username)
+            )
+            taken = {row['field'] for row in cursor.fetchall()}
+            account_email = 'email' in taken
+            account_username = 'username' in taken
 
             if account_email:
                 flash('Email sudah terdaftar!', 'error')
@@ -287,7 +891,11 @@ def signup():
                 flash('Semua field wajib diisi.', 'error')
             else:
                 # Hash password
-                hashed_pw = generate_password_hash(password)
+                try:
+                    hashed_pw = password_hasher.hash(password)
+                except (Overloaded, FutureTimeoutError):
+                    flash('Server sedang sibuk. Coba lagi sebentar.', 'error')
+                    return render_template('signup.html'), 503, {'Retry-After': str(HASH_RETRY_AFTER)}
 
                 try:
                     cursor.execute(
@@ -295,7 +903,7 @@ def signup():
                         'VALUES (%s, %s, %s, %s)',
                         (fullname, email, username, hashed_pw)
                     )
-                    mysql.connection.commit()
+                    db.commit()
                     flash('Registrasi berhasil! Silakan login.', 'success')
                     return redirect(url_for('login'))
                 except MySQLdb.IntegrityError as ie:
@@ -313,11 +921,6 @@ def signup():
                 except Exception as e:
                     app.logger.error('Error saat mendaftar user: %s', e)
                     flash('Terjadi kesalahan saat registrasi. Coba lagi nanti.', 'error')
-        finally:
-            try:
-                cursor.close()
-            except Exception:
-                pass
 
     return render_template('signup.html')
 
@@ -337,10 +940,131 @@ def reset_password():
     return render_template('resetpassword.html')
 
 
+# ---------------------------------------------------------
+# Write-behind progress_history (opsional, HISTORY_WRITE_BEHIND=1)
+# ---------------------------------------------------------
+# Riwayat dari /dietplanner dimasukkan ke buffer dan ditulis thread latar
+# dengan multi-row INSERT, jadi commit tidak lagi di jalur request. Baris
+# yang belum tersimpan ikut ditampilkan di /history dan /user_info (dalam
+# worker yang sama); sisa buffer saat shutdown disimpan ke HISTORY_SPILL_PATH.
+HISTORY_WRITE_BEHIND = os.getenv("HISTORY_WRITE_BEHIND", "0") == "1"
+HISTORY_COLUMNS = ('user_id', 'bmi', 'daily_calories', 'goal_key', 'goal_calories', 'goal_protein', 'created_at')
+HISTORY_INSERT = (
+    f"INSERT INTO progress_history ({', '.join(HISTORY_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(HISTORY_COLUMNS))})"
+)
+# Tanpa buffer created_at diisi DB (CURRENT_TIMESTAMP) seperti insert lainnya
+HISTORY_DIRECT_COLUMNS = HISTORY_COLUMNS[:-1]
+HISTORY_DIRECT_INSERT = (
+    f"INSERT INTO progress_history ({', '.join(HISTORY_DIRECT_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(HISTORY_DIRECT_COLUMNS))})"
+)
+# Baris di buffer diberi created_at dari jam DB (jam lokal + selisih terhadap
+# NOW() MySQL), agar zona waktu / clock skew tidak mengacak urutan kolom yang
+# dipakai keyset pagination. Selisih diperbarui thread flush.
+DB_CLOCK_REFRESH_SECONDS = 300
+db_clock = {'offset': None, 'checked': 0.0}
+
+
+def refresh_db_clock(cursor):
+    cursor.execute('SELECT NOW(6)')
+    row = cursor.fetchone()
+    if row and row[0]:
+        db_clock['offset'] = row[0] - datetime.now()
+    elif db_clock['offset'] is None:
+        db_clock['offset'] = timedelta(0)
+    db_clock['checked'] = time.monotonic()
+
+
+def db_now():
+    if db_clock['offset'] is None:
+        with db.cursor() as cursor:
+            refresh_db_clock(cursor)
+    # TIMESTAMP MySQL presisi detik; dipakai juga untuk mencocokkan baris pending
+    return (datetime.now() + db_clock['offset']).replace(microsecond=0)
+
+
+def flush_progress_history(rows):
+    values = [tuple(row[col] for col in HISTORY_COLUMNS) for row in rows]
+    with app.app_context(), db.cursor() as cursor:
+        try:
+            cursor.executemany(HISTORY_INSERT, values)
+            db.commit()
+        except MySQLdb.IntegrityError:
+            # Mis. user sudah dihapus: simpan baris lain satu per satu, lewati yang gagal
+            db.rollback()
+            for value in values:
+                try:
+                    cursor.execute(HISTORY_INSERT, value)
+                except MySQLdb.IntegrityError as e:
+                    app.logger.warning('Riwayat user %s dilewati: %s', value[0], e)
+            db.commit()
+        if time.monotonic() - db_clock['checked'] >= DB_CLOCK_REFRESH_SECONDS:
+            refresh_db_clock(cursor)
+    for user_id in {row['user_id'] for row in rows}:
+        invalidate_user_info(user_id)
+
+
+history_buffer = None
+if HISTORY_WRITE_BEHIND:
+    history_buffer = WriteBehindBuffer(
+        'progress_history',
+        flush_progress_history,
+        max_rows=int(os.getenv("HISTORY_FLUSH_ROWS", 200)),
+        max_delay=float(os.getenv("HISTORY_FLUSH_SECONDS", 1.0)),
+        max_pending=int(os.getenv("HISTORY_MAX_PENDING", 50000)),
+        spill_path=os.getenv("HISTORY_SPILL_PATH") or os.path.join(app.instance_path, 'progress_history.spill'),
+    )
+    # Thread flush (dan pemuatan spill file) dimulai lazy per worker pada
+    # add() pertama, jadi aman untuk gunicorn --preload.
+
+
+def record_progress(user_id, result):
+    row = {
+        'user_id': user_id,
+        'bmi': result['bmi'],
+        'daily_calories': result['daily_calories'],
+        'goal_key': result.get('goal_key'),
+        'goal_calories': int(result.get('goal_calories')),
+        'goal_protein': result.get('goal_protein'),
+    }
+    if history_buffer is None or not history_buffer.add(dict(row, created_at=db_now())):
+        with db.cursor() as cursor:
+            cursor.execute(HISTORY_DIRECT_INSERT, tuple(row[col] for col in HISTORY_DIRECT_COLUMNS))
+            db.commit()
+    else:
+        # Belum di-commit, tetapi user tetap dibuat membaca dari primary setelah flush
+        db.mark_write()
+    invalidate_user_info(user_id)
+
+
+def history_key(row):
+    # bmi kolom FLOAT: dibulatkan agar nilai dari DB cocok dengan nilai di buffer
+    return (row['created_at'], round(float(row['bmi'] or 0), 1), row['daily_calories'], row['goal_calories'])
+
+
+def pending_progress(user_id, saved_rows=()):
+    # Baris buffer yang belum ada di hasil query (terbaru dulu), bentuknya sama dengan baris DB
+    if history_buffer is None:
+        return []
+    saved = {history_key(row) for row in saved_rows}
+    rows = []
+    for row in reversed(history_buffer.pending(user_id)):
+        if history_key(row) in saved:
+            continue
+        daily, goal = row['daily_calories'], row['goal_calories']
+        percent = None
+        if daily and goal and daily > 0 and goal > 0:
+            percent = 100 * min(daily, goal) // max(daily, goal)  # sama dengan kolom generated
+        rows.append(dict(row, id=None, progress_percent=percent))
+    return rows
+
+
 # ---------------------------------------------------------
 # ROUTE: Diet Planner (protected)
 # ---------------------------------------------------------
 @app.route('/dietplanner', methods=['GET', 'POST'])
+@rate_limiter.limit('dietplanner', user='20/minute', ip='60/minute', methods=('POST',))
 def dietplanner():
     if not session.get('loggedin'):
         flash("Silakan login terlebih dahulu.", 'error')
@@ -356,167 +1080,181 @@ def dietplanner():
         activity = request.form.get('activity')
         goal = request.form.get('goal')
 
-        # Basic input validation
-        if weight <= 0 or height <= 0 or age <= 0:
-            flash('Masukkan nilai berat, tinggi, dan umur yang valid.', 'error')
+        # Basic input validation (rentang yang sama dengan batch API)
+        if not valid_mask(weight, height, age):
+            flash(f'Masukkan nilai yang valid: {RANGE_ERROR}.', 'error')
             return render_template('dietplanner.html', result=None)
 
-        # Hitung BMI
-        height_m = height / 100
-        bmi = round(weight / (height_m * height_m), 1)
-
-        # Status BMI (DITAMBAHKAN sesuai permintaan)
-        if bmi < 16:
-            bmi_status = "Sangat Kurus"
-        elif 16 <= bmi < 18.5:
-            bmi_status = "Kurus"
-        elif 18.5 <= bmi < 22:
-            bmi_status = "Normal"
-        elif 22 <= bmi < 25:
-            bmi_status = "Ideal"
-        elif 25 <= bmi < 27:
-            bmi_status = "Gemuk"
-        elif 27 <= bmi < 30:
-            bmi_status = "Sangat Gemuk"
-        else:
-            bmi_status = "Obesitas"
-
-        # Hitung BMR
-        if gender == 'male':
-            bmr = 88.362 + (13.397 * weight) + (4.799 * height) - (5.677 * age)
-        else:
-            bmr = 447.593 + (9.247 * weight) + (3.098 * height) - (4.330 * age)
-
-        # Faktor aktivitas
-        activity_factors = {
-            'sedentary': 1.2,
-            'light': 1.375,
-            'moderate': 1.55,
-            'active': 1.725,
-            'very_active': 1.9
-        }
-        factor = activity_factors.get(activity, 1.2)
-        daily_calories = int(bmr * factor)
-
-        # Rekomendasi otomatis berdasarkan BMI (Bahasa Indonesia)
-        if bmi_status in ["Sangat Kurus", "Kurus"]:
-            system_recommendation = "Kekurangan gizi. Direkomendasikan menaikkan berat badan dengan asupan kalori lebih tinggi dan latihan penguatan otot."
-            deposit_calories = daily_calories + 400
-            # for underweight, suggest calorie-dense healthy foods
-            food = "Susu penuh lemak, telur, daging tanpa lemak, roti gandum, selai kacang, alpukat, pisang"
-            exercise = "Latihan kekuatan ringan, peningkatan frekuensi makan: 3-4x/ hari"
-        elif bmi_status in ["Normal", "Ideal"]:
-            # Provide maintenance recommendations in Indonesian
-            system_recommendation = (
-                "Berat badan dalam kisaran normal. Untuk mempertahankan berat badan, "
-                "pertahankan asupan kalori seimbang, porsi terkontrol, dan olahraga teratur."
-            )
-            deposit_calories = daily_calories
-            # maintenance suggestions
-            food = "Porsi seimbang: karbohidrat kompleks, sumber protein, sayur, buah; batasi gula dan gorengan."
-            exercise = "Olahraga teratur 3–5x/minggu (cardio ringan + kekuatan ringan)."
-        elif bmi_status in ["Overweight", "Obesitas"]:
-            system_recommendation = "Kelebihan berat badan. Direkomendasikan program diet seimbang dan peningkatan aktivitas fisik."
-            deposit_calories = daily_calories - 400
-            food = "Sayur, ikan, dada ayam tanpa kulit, oatmeal, apel, almond, yogurt rendah lemak"
-            exercise = "Cardio teratur, latihan kekuatan, pengurangan asupan kalori." 
-        else:
-            system_recommendation = "Perlu konsultasi lebih detail dengan profesional kesehatan."
-            deposit_calories = daily_calories
-
-        # Rekomendasi olahraga
-        exercise_map = {
-            'None': 'Tidak Pernah Olahraga',
-            'sedentary': 'Jalan kaki ringan, stretching',
-            'light': 'Jogging, yoga, bersepeda santai',
-            'moderate': 'Renang, gym, aerobik',
-            'active': 'HIIT, lari, olahraga tim',
-            'very_active': 'Crossfit, olahraga kompetitif'
-        }
-        exercise = exercise_map.get(activity, 'Jalan kaki ringan')
-
-        # Rekomendasi makanan berdasarkan status BMI
-        if bmi_status in ["Sangat Kurus", "Kurus"]:
-            food = "Susu, telur, daging, roti gandum, selai kacang, alpukat, pisang"
-        elif bmi_status in ["Overweight", "Obesitas"]:
-            food = "Sayur, ikan, dada ayam, oatmeal, apel, almond, yogurt low-fat"
-        else:
-            food = "Menjaga porsi seimbang: karbohidrat, protein, serat, vitamin"
-
-        # ---------------------------------------------------------
-        # ✨ LOGIKA TAMBAHAN: Protein Harian
-        # ---------------------------------------------------------
-        protein_per_kg = 1.5
-        protein_grams = round(weight * protein_per_kg, 1)  # default
-
-        # Inisialisasi goal
-        goal_calories = deposit_calories
-        goal_food = food
-        goal_exercise = exercise
-        goal_protein = protein_grams
-
-        # Match form option values: 'gain_weight', 'maintain_weight', 'lose_weight'
-        if goal in ("gain_weight", "gain"):
-            goal_calories = deposit_calories + 300
-            goal_food = "Kalori tinggi sehat: daging, susu penuh lemak, kacang-kacangan, alpukat, pisang, nasi merah."
-            goal_exercise = "Latihan angkat beban 3–4x/minggu dan fokus pada progresif overload."
-            goal_protein = round(weight * 1.8, 1)
-
-        elif goal in ("maintain_weight", "maintain"):
-            goal_calories = deposit_calories
-            goal_food = "Porsi seimbang: protein sedang, karbohidrat kompleks, banyak sayur dan buah, batasi gula olahan."
-            goal_exercise = "Olahraga teratur 3–5x/minggu (kombinasi cardio & kekuatan)."
-            goal_protein = protein_grams
-
-        elif goal in ("lose_weight", "loss"):
-            goal_calories = deposit_calories - 300
-            goal_food = "Defisit kalori: dada ayam, ikan, brokoli, oatmeal, apel, yogurt rendah lemak."
-            goal_exercise = "Cardio + latihan kekuatan 4–5x/minggu dengan defisit kalori moderat."
-            goal_protein = round(weight * 1.2, 1)
-
-        result = {
-            'bmi': bmi,
-            'bmi_status': bmi_status,
-            'system_recommendation': system_recommendation,
-            'daily_calories': daily_calories,
-            'deposit_calories': deposit_calories,
-            'exercise': exercise,
-            'food': food,
-            'protein': protein_grams,
-            'goal_calories': goal_calories,
-            'goal_food': goal_food,
-            'goal_exercise': goal_exercise,
-            'goal_protein': goal_protein
-        }
-        # Normalized goal key for templating (gain / maintain / lose)
-        if goal in ('gain_weight', 'gain'):
-            result['goal_key'] = 'gain'
-        elif goal in ('maintain_weight', 'maintain'):
-            result['goal_key'] = 'maintain'
-        else:
-            result['goal_key'] = 'lose'
+        # Hitung BMI, kalori, protein & goal lewat planning engine
+        result = compute_plan(weight, height, age, gender, activity, goal)
 
-        # Simpan ke tabel history jika user login
+        # Simpan ke tabel history jika user login (langsung atau lewat write-behind)
         try:
             if session.get('id'):
-                cursor = mysql.connection.cursor()
-                try:
-                    cursor.execute(
-                        "INSERT INTO progress_history (user_id, bmi, daily_calories, goal_key, goal_calories) VALUES (%s, %s, %s, %s, %s)",
-                        (session.get('id'), bmi, daily_calories, result.get('goal_key'), int(result.get('goal_calories')))
-                    )
-                    mysql.connection.commit()
-                finally:
-                    try:
-                        cursor.close()
-                    except Exception:
-                        pass
+                record_progress(session.get('id'), result)
         except Exception as e:
             app.logger.error('Gagal menyimpan history: %s', e)
             # do not expose DB errors to users
             flash('Gagal menyimpan riwayat. Lanjutkan tanpa menyimpan.', 'warning')
 
-    return render_template("dietplanner.html", result=result)
+    # Menu 7 hari: dihitung ulang dari target baru dan disimpan, atau menu
+    # minggu ini (GET hanya membaca)
+    meal_plan = None
+    try:
+        if result is not None:
+            meal_plan = get_meal_planner().plan_week(
+                result['goal_calories'], result['goal_protein'], seed=session.get('id'))
+            if meal_plan is not None and session.get('id'):
+                with db.cursor() as cursor:
+                    save_meal_plans(cursor, [(session.get('id'), meal_plan)])
+                    db.commit()
+        elif session.get('id'):
+            meal_plan = current_meal_plan(session.get('id'))
+    except Exception as e:
+        app.logger.error('Gagal menyusun menu mingguan: %s', e)
+
+    return render_template("dietplanner.html", result=result, meal_plan=meal_plan)
+
+
+# ---------------------------------------------------------
+# ROUTE: Batch Plan API (CSV / NDJSON masuk, NDJSON keluar)
+# ---------------------------------------------------------
+BATCH_API_TOKEN = os.getenv("BATCH_API_TOKEN")
+BATCH_CHUNK_SIZE = 1000
+BATCH_MAX_CHUNK_SIZE = 10000
+BATCH_CSV_TYPES = ('text/csv', 'application/csv')
+BATCH_NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+
+def iter_batch_records(stream, fmt):
+    # Baca body request baris per baris (tanpa memuat seluruh file ke memori).
+    # Baris NDJSON yang rusak dikembalikan sebagai None agar tetap dilaporkan.
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for record in csv.DictReader(text):
+            yield {(k or '').strip().lower(): v for k, v in record.items()}
+        return
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield record if isinstance(record, dict) else None
+
+
+def save_plan_rows(pairs):
+    # Simpan (user_id, plan) ke progress_history dengan satu multi-row INSERT.
+    # Hanya user yang benar-benar ada yang disimpan; mengembalikan set user_id tersimpan.
+    user_ids = sorted({uid for uid, _ in pairs})
+    if not user_ids:
+        return set()
+    with db.cursor() as cursor:
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        cursor.execute(f'SELECT id FROM users WHERE id IN ({placeholders})', user_ids)
+        existing = {row[0] for row in cursor.fetchall()}
+        values = [
+            (uid, plan['bmi'], plan['daily_calories'], plan['goal_key'], plan['goal_calories'], plan['goal_protein'])
+            for uid, plan in pairs if uid in existing
+        ]
+        if values:
+            cursor.executemany(
+                "INSERT INTO progress_history (user_id, bmi, daily_calories, goal_key, goal_calories, goal_protein) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                values
+            )
+            db.commit()
+            for uid in existing:
+                invalidate_user_info(uid)
+        return existing
+
+
+@app.route('/api/plans/batch', methods=['POST'])
+@rate_limiter.limit('batch', ip='30/minute')
+def api_plans_batch():
+    if not BATCH_API_TOKEN:
+        return jsonify({'error': 'Batch API belum dikonfigurasi'}), 503
+    auth = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(auth.encode(), f'Bearer {BATCH_API_TOKEN}'.encode()):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    if request.mimetype in BATCH_CSV_TYPES:
+        fmt = 'csv'
+    elif request.mimetype in BATCH_NDJSON_TYPES:
+        fmt = 'ndjson'
+    else:
+        return jsonify({'error': 'Content-Type harus text/csv atau application/x-ndjson'}), 415
+
+    save = request.args.get('save', '').lower() in ('1', 'true', 'yes')
+    chunk_size = min(max(safe_int(request.args.get('chunk_size'), BATCH_CHUNK_SIZE), 1), BATCH_MAX_CHUNK_SIZE)
+
+    def generate():
+        records = iter_batch_records(request.stream, fmt)
+        row_no = 0
+        while True:
+            chunk, read_error = [], None
+            try:
+                for record in itertools.islice(records, chunk_size):
+                    chunk.append(record)
+            except (UnicodeDecodeError, csv.Error) as e:
+                read_error = e
+            if chunk:
+                yield plan_chunk(chunk, row_no)
+                row_no += len(chunk)
+            if read_error is not None:
+                # Status 200 sudah terkirim: akhiri stream dengan baris error
+                app.logger.warning('Batch plan berhenti di baris %s: %s', row_no + 1, read_error)
+                yield json.dumps({'row': row_no + 1, 'error': f'Data tidak dapat dibaca: {read_error}'},
+                                 ensure_ascii=False) + '\n'
+                return
+            if len(chunk) < chunk_size:
+                return
+
+    def plan_chunk(chunk, row_no):
+        # Hitung (dan simpan) satu chunk, kembalikan baris NDJSON-nya
+        usable = [r or {} for r in chunk]
+        plans = plan_rows(
+            [safe_float(r.get('weight')) for r in usable],
+            [safe_float(r.get('height')) for r in usable],
+            [safe_int(r.get('age')) for r in usable],
+            [r.get('gender') for r in usable],
+            [r.get('activity') for r in usable],
+            [r.get('goal') for r in usable],
+        )
+
+        saved = set()
+        if save:
+            pairs = [
+                (safe_int(r.get('user_id'), None), plan)
+                for r, plan in zip(usable, plans)
+                if plan is not None and safe_int(r.get('user_id'), None) is not None
+            ]
+            try:
+                saved = save_plan_rows(pairs)
+            except Exception as e:
+                app.logger.error('Gagal menyimpan batch plan: %s', e)
+
+        lines = []
+        for record, plan in zip(chunk, plans):
+            row_no += 1
+            out = {'row': row_no}
+            if record is None:
+                out['error'] = 'Baris tidak dapat dibaca'
+            elif plan is None:
+                out['error'] = RANGE_ERROR
+            else:
+                out.update(plan)
+            for key in ('id', 'user_id'):
+                if record and record.get(key) not in (None, ''):
+                    out[key] = record.get(key)
+            if save and plan is not None:
+                out['saved'] = safe_int(record.get('user_id'), None) in saved
+            lines.append(json.dumps(out, ensure_ascii=False))
+        return '\n'.join(lines) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 # ---------------------------------------------------------
@@ -525,36 +1263,106 @@ def dietplanner():
 @app.route('/logout')
 def logout():
     session.clear()
+    if hasattr(session, 'regenerate'):
+        session.regenerate()
     flash("Anda telah logout.", 'info')
     return redirect(url_for('index'))
 
+
+def revoke_user_sessions(user_id):
+    # Hapus semua session server-side milik user (berlaku di semua worker)
+    store = getattr(app.session_interface, 'store', None)
+    if store is None:
+        return 0
+    count = store.delete_user(user_id)
+    invalidate_user_info(user_id)
+    return count
+
+
+# Logout dari semua perangkat
+@app.route('/logout_all', methods=['POST'])
+def logout_all():
+    if session.get('loggedin'):
+        revoke_user_sessions(session.get('id'))
+    return logout()
+
+
+@app.cli.command('revoke-sessions')
+@click.argument('username')
+def revoke_sessions_command(username):
+    """Cabut semua session login milik USERNAME."""
+    with db.cursor() as cursor:
+        cursor.execute('SELECT id FROM users WHERE username = %s', (username,))
+        row = cursor.fetchone()
+    if not row:
+        raise click.ClickException(f'User {username} tidak ditemukan.')
+    click.echo(f'{revoke_user_sessions(row[0])} session dicabut.')
+
 # ---------------------------------------------------------
 # USER INFO (harus sebelum app.run)
 # ---------------------------------------------------------
+# Payload popup di-cache per user dan dihapus saat progress_history berubah.
+# TTL pendek membatasi data basi di worker lain bila tanpa CACHE_URL bersama.
+user_info_cache = make_cache(
+    'user_info',
+    maxsize=int(os.getenv("USER_INFO_CACHE_SIZE", 10000)),
+    ttl=int(os.getenv("USER_INFO_CACHE_TTL", 60)),
+    url=CACHE_URL,
+)
+
+def invalidate_user_info(user_id):
+    if user_id:
+        user_info_cache.delete(str(user_id))
+
 @app.route('/user_info')
 def user_info():
     if 'username' not in session:
         return {"error": "Not logged in"}, 403
 
-    cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-    try:
-        cursor.execute("""
-            SELECT id, fullname, email, created_at
-            FROM users
-            WHERE username = %s
-        """, (session['username'],))
-        user = cursor.fetchone()
+    cache_key = str(session.get('id') or session['username'])
+    cached = user_info_cache.get(cache_key)
+    if cached is None:
+        profile = session.get('profile') if app.config['SESSION_SERVER_SIDE'] else None
+        data = load_user_info(session['username'], session.get('id'), profile)
+        if data is None:
+            return {"error": "User not found"}, 404
+        body = app.json.dumps(data)
+        cached = {'body': body, 'etag': hashlib.sha1(body.encode('utf-8')).hexdigest()}
+        user_info_cache.set(cache_key, cached)
+
+    response = Response(cached['body'], mimetype='application/json')
+    response.set_etag(cached['etag'])
+    # Browser wajib revalidasi, tetapi cukup dengan If-None-Match -> 304
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def load_user_info(username, user_id=None, profile=None):
+    with db.cursor(MySQLdb.cursors.DictCursor, read=True) as cursor:
+        if profile and user_id:
+            # profil dari session (diisi saat login)
+            user = dict(profile, id=user_id)
+        else:
+            cursor.execute("""
+                SELECT id, fullname, email, created_at
+                FROM users
+                WHERE username = %s
+            """, (username,))
+            user = cursor.fetchone()
 
         if not user:
-            return {"error": "User not found"}, 404
+            return None
 
         # try to fetch latest progress for this user
         cursor.execute(
-            "SELECT bmi, daily_calories, goal_key, goal_calories, created_at "
+            "SELECT bmi, daily_calories, goal_key, goal_calories, progress_percent, created_at "
             "FROM progress_history WHERE user_id = %s ORDER BY created_at DESC LIMIT 1",
             (user['id'],),
         )
         latest = cursor.fetchone()
+        pending = pending_progress(user['id'], [latest] if latest else [])
+        if pending and (not latest or pending[0]['created_at'] >= latest['created_at']):
+            latest = pending[0]
 
         data = {
             'fullname': user.get('fullname'),
@@ -568,28 +1376,13 @@ def user_info():
                 'daily_calories': latest.get('daily_calories'),
                 'goal_calories': latest.get('goal_calories'),
                 'goal_key': latest.get('goal_key'),
+                'goal_label': goal_label(latest.get('goal_key')),
+                # seberapa dekat daily_calories dengan goal_calories (kolom generated)
+                'progress_percent': latest.get('progress_percent'),
                 'latest_at': latest.get('created_at')
             })
 
-            # compute a simple progress percent (how close daily_calories is to goal_calories)
-            try:
-                gc = float(latest.get('goal_calories') or 0)
-                dc = float(latest.get('daily_calories') or 0)
-                if gc > 0 and dc > 0:
-                    ratio = min(dc, gc) / max(dc, gc)
-                    pct = int(ratio * 100)
-                    data['progress_percent'] = pct
-                else:
-                    data['progress_percent'] = None
-            except Exception:
-                data['progress_percent'] = None
-
         return data
-    finally:
-        try:
-            cursor.close()
-        except Exception:
-            pass
 
 
 # ---------------------------------------------------------
@@ -607,36 +1400,212 @@ def food_log():
             flash('Semua field wajib diisi.', 'error')
         else:
             try:
-                cursor = mysql.connection.cursor()
-                cursor.execute(
-                    "INSERT INTO food_log (user_id, food_name, calories, log_date) VALUES (%s, %s, %s, %s)",
-                    (session.get('id'), food_name, int(calories), log_date)
-                )
-                mysql.connection.commit()
+                with db.cursor() as cursor:
+                    cursor.execute(
+                        "INSERT INTO food_log (user_id, food_name, calories, log_date) VALUES (%s, %s, %s, %s)",
+                        (session.get('id'), food_name, int(calories), log_date)
+                    )
+                    adjust_daily_summary(cursor, session.get('id'), log_date, int(calories), 1)
+                    db.commit()
                 flash('Log makanan berhasil disimpan.', 'success')
             except Exception as e:
                 app.logger.error('Gagal simpan food log: %s', e)
                 flash('Gagal menyimpan log makanan.', 'error')
-            finally:
-                try:
-                    cursor.close()
-                except Exception:
-                    pass
         return redirect(url_for('food_log'))
-    # GET: tampilkan log makanan user
-    cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-    try:
-        cursor.execute(
-            "SELECT id, food_name, calories, log_date FROM food_log WHERE user_id = %s ORDER BY log_date DESC, id DESC LIMIT 100",
-            (session.get('id'),)
-        )
-        logs = cursor.fetchall()
-    finally:
+    # GET: tampilkan log makanan user (keyset pagination lewat ?before=)
+    before = decode_page_cursor(request.args.get('before'), FOOD_LOG_CURSOR_FORMAT)
+    with db.cursor(MySQLdb.cursors.DictCursor, read=True) as cursor:
+        if before:
+            before_date, before_id = before[0].date(), before[1]
+            cursor.execute(
+                "SELECT id, food_name, calories, log_date FROM food_log "
+                "WHERE user_id = %s AND (log_date < %s OR (log_date = %s AND id < %s)) "
+                "ORDER BY log_date DESC, id DESC LIMIT %s",
+                (session.get('id'), before_date, before_date, before_id, FOOD_LOG_PAGE_SIZE + 1)
+            )
+        else:
+            cursor.execute(
+                "SELECT id, food_name, calories, log_date FROM food_log WHERE user_id = %s ORDER BY log_date DESC, id DESC LIMIT %s",
+                (session.get('id'), FOOD_LOG_PAGE_SIZE + 1)
+            )
+        logs = list(cursor.fetchall())
+        summary = fetch_daily_summary(cursor, session.get('id'), SUMMARY_DEFAULT_DAYS)
+        goal_calories = fetch_latest_goal_calories(cursor, session.get('id'))
+
+    next_cursor = None
+    if len(logs) > FOOD_LOG_PAGE_SIZE:
+        logs = logs[:FOOD_LOG_PAGE_SIZE]
+        last = logs[-1]
+        next_cursor = encode_page_cursor(last['log_date'], last['id'], FOOD_LOG_CURSOR_FORMAT)
+    return render_template(
+        'food_log.html',
+        logs=logs,
+        next_cursor=next_cursor,
+        is_first_page=before is None,
+        summary=summary,
+        goal_calories=goal_calories,
+    )
+
+
+# ROUTE: Bulk food_log (form array, JSON, atau upload CSV)
+FOOD_LOG_BULK_MAX = 5000
+FOOD_LOG_BULK_CHUNK = 1000
+FOOD_LOG_MAX_CALORIES = 20000
+
+
+def iter_bulk_food_records():
+    # Menghasilkan dict per baris dari sumber apa pun yang dikirim client
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('entries')
+        if not isinstance(data, list):
+            raise ValueError('Body JSON harus berupa list entri atau {"entries": [...]}')
+        for record in data:
+            yield record if isinstance(record, dict) else None
+        return
+    upload = request.files.get('file')
+    if upload is not None or request.mimetype in BATCH_CSV_TYPES:
+        yield from iter_batch_records(upload.stream if upload is not None else request.stream, 'csv')
+        return
+    # Form array: food_name[] / calories[] / log_date[] (baris kosong dilewati)
+    names = request.form.getlist('food_name[]') or request.form.getlist('food_name')
+    calories = request.form.getlist('calories[]') or request.form.getlist('calories')
+    dates = request.form.getlist('log_date[]') or request.form.getlist('log_date')
+    for name, cal, log_date in itertools.zip_longest(names, calories, dates, fillvalue=''):
+        if name.strip() or cal.strip() or log_date.strip():
+            yield {'food_name': name, 'calories': cal, 'log_date': log_date}
+
+
+def parse_calories(value):
+    # JSON bisa mengirim float/bool; int() akan memotong 250.7 menjadi 250
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        return None
+    return safe_int(value, None)
+
+
+def validate_food_entries(records):
+    # Satu kali jalan: kembalikan (baris valid, error per baris)
+    valid, errors = [], []
+    for row_no, record in enumerate(records, start=1):
+        if row_no > FOOD_LOG_BULK_MAX:
+            raise ValueError(f'Maksimal {FOOD_LOG_BULK_MAX} entri per permintaan')
+        if record is None:
+            errors.append({'row': row_no, 'error': 'Baris tidak dapat dibaca'})
+            continue
+        food_name = str(record.get('food_name') or '').strip()
+        calories = parse_calories(record.get('calories'))
         try:
-            cursor.close()
+            log_date = datetime.strptime(str(record.get('log_date') or '').strip(), '%Y-%m-%d').date()
+        except ValueError:
+            log_date = None
+        if not food_name:
+            error = 'Nama makanan wajib diisi'
+        elif len(food_name) > 100:
+            error = 'Nama makanan maksimal 100 karakter'
+        elif calories is None or not 0 <= calories <= FOOD_LOG_MAX_CALORIES:
+            error = f'Kalori harus bilangan bulat 0-{FOOD_LOG_MAX_CALORIES}'
+        elif log_date is None:
+            error = 'Tanggal harus berformat YYYY-MM-DD'
+        else:
+            valid.append((row_no, food_name, calories, log_date))
+            continue
+        errors.append({'row': row_no, 'error': error})
+    return valid, errors
+
+
+def insert_food_entries(user_id, entries):
+    # Semua baris + ringkasan harian dalam satu transaksi. executemany pada
+    # INSERT ... VALUES dikirim MySQLdb sebagai multi-row INSERT.
+    per_day = {}
+    for _, _, calories, log_date in entries:
+        total, count = per_day.get(log_date, (0, 0))
+        per_day[log_date] = (total + calories, count + 1)
+    with db.cursor() as cursor:
+        try:
+            for start in range(0, len(entries), FOOD_LOG_BULK_CHUNK):
+                cursor.executemany(
+                    "INSERT INTO food_log (user_id, food_name, calories, log_date) VALUES (%s, %s, %s, %s)",
+                    [(user_id, name, calories, log_date)
+                     for _, name, calories, log_date in entries[start:start + FOOD_LOG_BULK_CHUNK]]
+                )
+            cursor.executemany(
+                "INSERT INTO food_log_daily (user_id, log_date, total_calories, entry_count) VALUES (%s, %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE total_calories = total_calories + VALUES(total_calories), "
+                "entry_count = entry_count + VALUES(entry_count)",
+                [(user_id, log_date, total, count) for log_date, (total, count) in sorted(per_day.items())]
+            )
+            db.commit()
         except Exception:
-            pass
-    return render_template('food_log.html', logs=logs)
+            db.rollback()
+            raise
+
+
+@app.route('/food_log/bulk', methods=['POST'])
+@rate_limiter.limit('food_log_bulk', user='10/minute', ip='30/minute')
+def food_log_bulk():
+    wants_json = request.is_json or request.accept_mimetypes.best == 'application/json'
+    if not session.get('loggedin'):
+        if wants_json:
+            return jsonify({'error': 'Not logged in'}), 403
+        flash('Silakan login untuk mengakses food log.', 'error')
+        return redirect(url_for('login'))
+
+    try:
+        valid, errors = validate_food_entries(iter_bulk_food_records())
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash(f'Data tidak dapat diproses: {e}', 'error')
+        return redirect(url_for('food_log'))
+
+    # ?strict=1: tidak ada yang disimpan jika satu baris pun tidak valid
+    strict = request.args.get('strict', '').lower() in ('1', 'true', 'yes')
+    inserted = 0
+    if valid and not (strict and errors):
+        try:
+            insert_food_entries(session.get('id'), valid)
+            inserted = len(valid)
+        except Exception as e:
+            app.logger.error('Gagal simpan bulk food log: %s', e)
+            if wants_json:
+                return jsonify({'error': 'Gagal menyimpan log makanan', 'inserted': 0, 'errors': errors}), 500
+            flash('Gagal menyimpan log makanan.', 'error')
+            return redirect(url_for('food_log'))
+
+    if wants_json:
+        status = 200 if inserted or not errors else 422
+        return jsonify({'inserted': inserted, 'errors': errors}), status
+    if inserted:
+        flash(f'{inserted} log makanan berhasil disimpan.', 'success')
+    for err in errors[:5]:
+        flash(f"Baris {err['row']}: {err['error']}", 'error')
+    if len(errors) > 5:
+        flash(f'... dan {len(errors) - 5} baris lain tidak valid.', 'error')
+    if not inserted and not errors:
+        flash('Tidak ada entri yang dikirim.', 'error')
+    return redirect(url_for('food_log'))
+
+
+# ROUTE: Ringkasan kalori harian / mingguan (JSON)
+@app.route('/api/food_log/summary')
+def food_log_summary():
+    if not session.get('loggedin'):
+        return jsonify({'error': 'Not logged in'}), 403
+    days = min(max(safe_int(request.args.get('days'), SUMMARY_DEFAULT_DAYS), 1), SUMMARY_MAX_DAYS)
+    with db.cursor(MySQLdb.cursors.DictCursor, read=True) as cursor:
+        daily = fetch_daily_summary(cursor, session.get('id'), days)
+        goal_calories = fetch_latest_goal_calories(cursor, session.get('id'))
+
+    for d in daily:
+        d['diff_from_goal'] = d['total_calories'] - goal_calories if goal_calories else None
+    weeks = weekly_summary(daily)
+    for week in weeks:
+        week['goal_calories'] = goal_calories * week['days_logged'] if goal_calories else None
+        week['week_start'] = week['week_start'].isoformat()
+    for d in daily:
+        d['log_date'] = d['log_date'].isoformat()
+    return jsonify({'goal_calories': goal_calories, 'days': daily, 'weeks': weeks})
 
 # ROUTE: Delete food log entry
 @app.route('/delete_food_log/<int:log_id>', methods=['POST'])
@@ -644,22 +1613,24 @@ def delete_food_log(log_id):
     if not session.get('loggedin'):
         flash('Silakan login untuk menghapus log makanan.', 'error')
         return redirect(url_for('login'))
-    cursor = mysql.connection.cursor()
     try:
-        cursor.execute(
-            'DELETE FROM food_log WHERE id = %s AND user_id = %s',
-            (log_id, session.get('id'))
-        )
-        mysql.connection.commit()
+        with db.cursor() as cursor:
+            cursor.execute(
+                'SELECT calories, log_date FROM food_log WHERE id = %s AND user_id = %s FOR UPDATE',
+                (log_id, session.get('id'))
+            )
+            old = cursor.fetchone()
+            cursor.execute(
+                'DELETE FROM food_log WHERE id = %s AND user_id = %s',
+                (log_id, session.get('id'))
+            )
+            if old and old[1] is not None:
+                adjust_daily_summary(cursor, session.get('id'), old[1], -(old[0] or 0), -1)
+            db.commit()
         flash('Log makanan berhasil dihapus.', 'success')
     except Exception as e:
         app.logger.error('Gagal hapus food log: %s', e)
         flash('Gagal menghapus log makanan.', 'error')
-    finally:
-        try:
-            cursor.close()
-        except Exception:
-            pass
     return redirect(url_for('food_log'))
 
 
@@ -678,18 +1649,28 @@ def update_food_log(log_id):
         flash('Semua field wajib diisi untuk memperbarui log.', 'error')
         return redirect(url_for('food_log'))
 
-    cursor = mysql.connection.cursor()
     try:
-        cursor.execute(
-            'UPDATE food_log SET food_name = %s, calories = %s, log_date = %s WHERE id = %s AND user_id = %s',
-            (food_name, int(calories), log_date, log_id, session.get('id'))
-        )
-        mysql.connection.commit()
-        # cursor.rowcount tidak selalu tersedia tergantung driver, cek dengan safety
-        try:
-            updated = cursor.rowcount
-        except Exception:
-            updated = 1
+        with db.cursor() as cursor:
+            cursor.execute(
+                'SELECT calories, log_date FROM food_log WHERE id = %s AND user_id = %s FOR UPDATE',
+                (log_id, session.get('id'))
+            )
+            old = cursor.fetchone()
+            cursor.execute(
+                'UPDATE food_log SET food_name = %s, calories = %s, log_date = %s WHERE id = %s AND user_id = %s',
+                (food_name, int(calories), log_date, log_id, session.get('id'))
+            )
+            # cursor.rowcount tidak selalu tersedia tergantung driver, cek dengan safety
+            try:
+                updated = cursor.rowcount
+            except Exception:
+                updated = 1
+            if old:
+                # Pindahkan kontribusi entri lama ke tanggal/kalori yang baru
+                if old[1] is not None:
+                    adjust_daily_summary(cursor, session.get('id'), old[1], -(old[0] or 0), -1)
+                adjust_daily_summary(cursor, session.get('id'), log_date, int(calories), 1)
+            db.commit()
 
         if updated:
             flash('Log makanan berhasil diperbarui.', 'success')
@@ -698,11 +1679,6 @@ def update_food_log(log_id):
     except Exception as e:
         app.logger.error('Gagal memperbarui food log: %s', e)
         flash('Gagal memperbarui log makanan.', 'error')
-    finally:
-        try:
-            cursor.close()
-        except Exception:
-            pass
 
     return redirect(url_for('food_log'))
 # ---------------------------------------------------------
@@ -712,43 +1688,58 @@ def history():
         flash('Silakan login untuk melihat riwayat Anda.', 'error')
         return redirect(url_for('login'))
 
-    cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-    try:
-        cursor.execute(
-            'SELECT id, bmi, daily_calories, goal_key, goal_calories, created_at FROM progress_history WHERE user_id = %s ORDER BY created_at DESC LIMIT 200',
-            (session.get('id'),)
-        )
-        rows = cursor.fetchall()
-    finally:
-        try:
-            cursor.close()
-        except Exception:
-            pass
-
-    # enhance rows with human-friendly label and progress percent
-    for r in rows:
-        key = r.get('goal_key')
-        if key == 'gain':
-            r['goal_label'] = 'Menaikkan'
-        elif key == 'maintain':
-            r['goal_label'] = 'Mempertahankan'
-        elif key == 'lose':
-            r['goal_label'] = 'Menurunkan'
+    before = decode_page_cursor(request.args.get('before'), HISTORY_CURSOR_FORMAT)
+    with db.cursor(MySQLdb.cursors.DictCursor, read=True) as cursor:
+        if before:
+            before_at, before_id = before
+            cursor.execute(
+                'SELECT id, bmi, daily_calories, goal_key, goal_calories, progress_percent, created_at FROM progress_history '
+                'WHERE user_id = %s AND (created_at < %s OR (created_at = %s AND id < %s)) '
+                'ORDER BY created_at DESC, id DESC LIMIT %s',
+                (session.get('id'), before_at, before_at, before_id, HISTORY_PAGE_SIZE + 1)
+            )
         else:
-            r['goal_label'] = key or ''
+            cursor.execute(
+                'SELECT id, bmi, daily_calories, goal_key, goal_calories, progress_percent, created_at FROM progress_history '
+                'WHERE user_id = %s ORDER BY created_at DESC, id DESC LIMIT %s',
+                (session.get('id'), HISTORY_PAGE_SIZE + 1)
+            )
+        rows = list(cursor.fetchall())
 
-        try:
-            gc = float(r.get('goal_calories') or 0)
-            dc = float(r.get('daily_calories') or 0)
-            if gc > 0 and dc > 0:
-                ratio = min(dc, gc) / max(dc, gc)
-                r['progress_percent'] = int(ratio * 100)
-            else:
-                r['progress_percent'] = None
-        except Exception:
-            r['progress_percent'] = None
+    next_cursor = None
+    if len(rows) > HISTORY_PAGE_SIZE:
+        rows = rows[:HISTORY_PAGE_SIZE]
+        last = rows[-1]
+        next_cursor = encode_page_cursor(last['created_at'], last['id'], HISTORY_CURSOR_FORMAT)
+
+    if before is None:
+        # Riwayat yang masih di buffer write-behind tampil paling atas
+        rows = pending_progress(session.get('id'), rows) + rows
 
-    return render_template('history.html', rows=rows)
+    # goal_label lewat filter template; progress_percent kolom generated di DB
+    return render_template('history.html', rows=rows, next_cursor=next_cursor, is_first_page=before is None)
+
+# ROUTE: Tren progress (data grafik di halaman history)
+@app.route('/api/trends')
+def api_trends():
+    if not session.get('loggedin'):
+        return jsonify({'error': 'Not logged in'}), 403
+    bucket = request.args.get('bucket', 'week')
+    if bucket not in TREND_BUCKETS:
+        return jsonify({'error': 'bucket harus week atau month'}), 400
+    periods = min(max(safe_int(request.args.get('periods'), TREND_DEFAULT_PERIODS), 1), TREND_MAX_PERIODS)
+    window = min(max(safe_int(request.args.get('window'), TREND_DEFAULT_WINDOW), 1), TREND_MAX_WINDOW)
+    points = min(max(safe_int(request.args.get('points'), 100), 1), TREND_MAX_POINTS)
+    with db.cursor(MySQLdb.cursors.DictCursor, read=True) as cursor:
+        buckets = fetch_trend_buckets(cursor, session.get('id'), bucket, periods, window)
+        series = fetch_trend_series(cursor, session.get('id'), window, points)
+    return jsonify({
+        'bucket': bucket,
+        'periods': periods,
+        'window': window,
+        'buckets': buckets,
+        'series': series,
+    })
 
 # ROUTE: Delete history entry
 @app.route('/delete_history/<int:history_id>', methods=['POST'])
@@ -756,25 +1747,205 @@ def delete_history(history_id):
     if not session.get('loggedin'):
         flash('Silakan login untuk menghapus riwayat.', 'error')
         return redirect(url_for('login'))
-    cursor = mysql.connection.cursor()
     try:
-        cursor.execute(
-            'DELETE FROM progress_history WHERE id = %s AND user_id = %s',
-            (history_id, session.get('id'))
-        )
-        mysql.connection.commit()
+        with db.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM progress_history WHERE id = %s AND user_id = %s',
+                (history_id, session.get('id'))
+            )
+            db.commit()
+        invalidate_user_info(session.get('id'))
         flash('Riwayat berhasil dihapus.', 'success')
     except Exception as e:
         app.logger.error('Gagal hapus riwayat: %s', e)
         flash('Gagal menghapus riwayat.', 'error')
-    finally:
-        try:
-            cursor.close()
-        except Exception:
-            pass
     return redirect(url_for('history'))
 
 
+# ---------------------------------------------------------
+# ROUTE: Export seluruh food_log / progress_history (CSV / NDJSON)
+# ---------------------------------------------------------
+# Baris dibaca dengan cursor server-side (SSDictCursor) per EXPORT_FETCH_SIZE
+# dan langsung dikirim sebagai chunk, jadi memori tetap kecil berapa pun
+# jumlah datanya. Koneksi DB dipegang sampai stream selesai.
+EXPORT_FETCH_SIZE = 500
+# Token khusus export (tim analitik, ?user_id=); terpisah dari BATCH_API_TOKEN
+# karena memberi akses baca ke data pribadi user mana pun. Kosong = nonaktif.
+EXPORT_API_TOKEN = os.getenv("EXPORT_API_TOKEN")
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+EXPORTS = {
+    'food_log': (
+        'SELECT id, food_name, calories, log_date, created_at FROM food_log '
+        'WHERE user_id = %s ORDER BY log_date, id',
+        ['id', 'food_name', 'calories', 'log_date', 'created_at'],
+    ),
+    'history': (
+        'SELECT id, bmi, daily_calories, goal_key, goal_calories, progress_percent, created_at FROM progress_history '
+        'WHERE user_id = %s ORDER BY created_at, id',
+        ['id', 'bmi', 'daily_calories', 'goal_key', 'goal_calories', 'progress_percent', 'created_at'],
+    ),
+}
+
+
+def export_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def iter_export_rows(query, user_id):
+    with db.cursor(MySQLdb.cursors.SSDictCursor, read=True) as cursor:
+        cursor.execute(query, (user_id,))
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            yield rows
+
+
+def iter_export_csv(query, columns, user_id):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in iter_export_rows(query, user_id):
+        for row in rows:
+            writer.writerow([export_value(row.get(col)) for col in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_export_ndjson(query, columns, user_id):
+    for rows in iter_export_rows(query, user_id):
+        yield ''.join(
+            json.dumps({col: export_value(row.get(col)) for col in columns}, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+@app.route('/export/<kind>')
+@rate_limiter.limit('export', user='10/minute', ip='30/minute')
+def export_data(kind):
+    auth = request.headers.get('Authorization')
+    if auth:
+        # Akses tim analitik: EXPORT_API_TOKEN + ?user_id=
+        if not EXPORT_API_TOKEN or not hmac.compare_digest(auth.encode(), f'Bearer {EXPORT_API_TOKEN}'.encode()):
+            return jsonify({'error': 'Unauthorized'}), 401
+        user_id = safe_int(request.args.get('user_id'), None)
+        if user_id is None:
+            return jsonify({'error': 'user_id wajib diisi'}), 400
+        owner = f'user{user_id}'
+    elif not session.get('loggedin'):
+        flash('Silakan login untuk mengunduh data Anda.', 'error')
+        return redirect(url_for('login'))
+    else:
+        user_id = session.get('id')
+        owner = session.get('username')
+    if kind not in EXPORTS:
+        return jsonify({'error': 'Jenis export tidak dikenal'}), 404
+    fmt = (request.args.get('format') or 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'format harus csv atau ndjson'}), 400
+
+    query, columns = EXPORTS[kind]
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    rows = (iter_export_csv if fmt == 'csv' else iter_export_ndjson)(query, columns, user_id)
+    response = Response(stream_with_context(rows), mimetype=mimetype)
+    # Username bisa berisi " ; atau non-ASCII yang merusak header
+    filename = secure_filename(f"{kind}-{owner}-{date.today().isoformat()}.{extension}") or f"{kind}.{extension}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ---------------------------------------------------------
+# ROUTE: Health check (liveness saja; statistik di /healthz/details)
+# ---------------------------------------------------------
+def check_db():
+    try:
+        with db.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        return 'ok'
+    except Exception as e:
+        app.logger.error('Health check DB gagal: %s', e)
+        return 'error'
+
+
+@app.route('/healthz')
+def healthz():
+    # Tanpa auth: jangan tampilkan detail internal (pool, replica, cache, ...)
+    status = check_db()
+    return jsonify({'db': status}), 200 if status == 'ok' else 503
+
+
+# ---------------------------------------------------------
+# ROUTE: Metrics (format teks Prometheus)
+# ---------------------------------------------------------
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+REGISTRY.register_collector(stats_collector(
+    'dietplanner_db_pool', 'pool',
+    lambda: dict({'mysql': db.pool.stats()}, **{f'replica:{r.name}': r.pool.stats() for r in db.replicas}),
+    'Statistik connection pool MySQL'))
+REGISTRY.register_collector(stats_collector(
+    'dietplanner_db_replica', 'replica', lambda: {r.name: r.stats() for r in db.replicas}, 'Status read replica'))
+REGISTRY.register_collector(stats_collector(
+    'dietplanner_db_reads', 'target',
+    lambda: {target: {'total': n} for target, n in db.replica_stats()['reads'].items()} if db.replicas else {},
+    'Koneksi baca per tujuan (replica / primary)'))
+REGISTRY.register_collector(stats_collector(
+    'dietplanner_cache', 'cache',
+    lambda: {'chatbot': chatbot_cache.stats(), 'user_info': user_info_cache.stats()}, 'Statistik cache'))
+REGISTRY.register_collector(stats_collector(
+    'dietplanner_writebehind', 'buffer',
+    lambda: {'progress_history': history_buffer.stats()} if history_buffer is not None else {},
+    'Statistik write-behind'))
+REGISTRY.register_collector(stats_collector(
+    'dietplanner_ratelimit', 'limiter', lambda: {'default': rate_limiter.backend.stats()}, 'Statistik rate limiter'))
+REGISTRY.register_collector(stats_collector(
+    'dietplanner_executor', 'executor',
+    lambda: {'gemini': gemini_executor.stats(), 'password_hash': hash_executor.stats()}, 'Statistik thread pool'))
+
+
+def metrics_authorized():
+    # Jika METRICS_TOKEN diisi, scraper harus mengirim "Authorization: Bearer <token>"
+    if not METRICS_TOKEN:
+        return True
+    auth = request.headers.get('Authorization', '')
+    return hmac.compare_digest(auth.encode(), f'Bearer {METRICS_TOKEN}'.encode())
+
+
+@app.route('/metrics')
+def metrics():
+    if not metrics_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/healthz/details')
+def healthz_details():
+    # Statistik internal: dilindungi token yang sama dengan /metrics
+    if not metrics_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    status = check_db()
+    return jsonify({
+        'db': status,
+        'pool': db.pool.stats(),
+        'replication': db.replica_stats() if db.replicas else None,
+        'caches': {'chatbot': chatbot_cache.stats(), 'user_info': user_info_cache.stats()},
+        'executors': {'gemini': gemini_executor.stats(), 'password_hash': hash_executor.stats()},
+        'rate_limiter': rate_limiter.stats(),
+        'history_write_behind': history_buffer.stats() if history_buffer is not None else None,
+    }), 200 if status == 'ok' else 503
+
+
 # ---------------------------------------------------------
 # RUN SERVER
 
@@ -798,6 +1969,20 @@ def server_error(e):
     return render_template('error.html', code=500, title='Kesalahan Server', message='Terjadi kesalahan pada server. Coba lagi nanti.'), 500
 
 
+@app.errorhandler(TooManyRequests)
+def too_many_requests(e):
+    # Dari rate_limiter: JSON untuk API, halaman error untuk form biasa
+    if request.path.startswith('/api/') or request.is_json or request.accept_mimetypes.best == 'application/json':
+        response = jsonify({'error': e.description})
+    else:
+        response = app.make_response(render_template(
+            'error.html', code=429, title='Terlalu Banyak Permintaan', message=e.description))
+    response.status_code = 429
+    if e.retry_after:
+        response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
 @app.errorhandler(HTTPException)
 def handle_http_exception(e):
     # Generic handler for HTTPExceptions
@@ -0,0 +1,274 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import zlib
+
+# Minifier / kompresi opsional; tanpa library ini dipakai minifier bawaan
+# (konservatif), hanya varian gzip yang dibuat, dan PNG dikompres dengan zlib.
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zopfli.zlib as zopfli_zlib
+except ImportError:
+    zopfli_zlib = None
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Build aset statis: minify + content hash + varian gzip / brotli
+#
+# `flask build-assets` membaca file di static/, menulis static/dist/
+# <nama>.<hash>.<ext> (+ .gz / .br untuk teks) dan static/dist/manifest.json
+# berisi nama asli -> nama ber-hash. Template memakai asset_url('style.css');
+# tanpa manifest (mis. saat development) asset_url jatuh ke /static biasa.
+# Karena nama file berubah setiap isinya berubah, file di dist/ dapat
+# di-cache browser selamanya (Cache-Control: immutable).
+# ---------------------------------------------------------
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 10
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt')
+MIN_COMPRESS_SIZE = 256
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+# --- minify ---------------------------------------------------------------
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.DOTALL)
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    # String diganti placeholder agar tidak tersentuh, komentar dibuang, spasi
+    # diringkas, lalu spasi di sekitar { } ; , > dan setelah : dihapus.
+    # Spasi di sekitar + - * / dipertahankan (calc()).
+    strings = []
+
+    def protect(match):
+        if match.group(1) is None:
+            return ' '
+        strings.append(match.group(1))
+        return f'\x00{len(strings) - 1}\x00'
+
+    css = _CSS_TOKENS.sub(protect, text)
+    css = re.sub(r'\s+', ' ', css)
+    css = _CSS_PUNCTUATION.sub(r'\1', css)
+    css = re.sub(r':\s+', ':', css).replace(';}', '}').strip()
+    return re.sub(r'\x00(\d+)\x00', lambda m: strings[int(m.group(1))], css)
+
+
+def minify_js(text):
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    # Tanpa parser JS: hanya indentasi, baris kosong, dan baris yang seluruhnya
+    # komentar // yang dibuang. Baris baru dipertahankan (aman untuk ASI,
+    # regex literal, dan template string).
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith('//'):
+            lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+# --- PNG ------------------------------------------------------------------
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Chunk yang memengaruhi tampilan; sisanya (tEXt, tIME, pHYs, ...) dibuang
+PNG_KEEP_CHUNKS = {b'IHDR', b'PLTE', b'tRNS', b'gAMA', b'cHRM', b'sRGB', b'iCCP', b'sBIT'}
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def _png_chunks(data):
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError('bukan file PNG')
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        yield kind, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+
+def _png_chunk(kind, body):
+    return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body) & 0xffffffff)
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def _unfilter(raw, width, height, bpp, row_bytes):
+    # Kembalikan scanline tanpa filter (list of bytearray)
+    rows, prev, pos = [], bytearray(row_bytes), 0
+    for _ in range(height):
+        kind = raw[pos]
+        line = bytearray(raw[pos + 1:pos + 1 + row_bytes])
+        pos += 1 + row_bytes
+        if kind == 1:
+            for i in range(bpp, row_bytes):
+                line[i] = (line[i] + line[i - bpp]) & 0xff
+        elif kind == 2:
+            for i in range(row_bytes):
+                line[i] = (line[i] + prev[i]) & 0xff
+        elif kind == 3:
+            for i in range(row_bytes):
+                left = line[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xff
+        elif kind == 4:
+            for i in range(row_bytes):
+                left = line[i - bpp] if i >= bpp else 0
+                upleft = prev[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + _paeth(left, prev[i], upleft)) & 0xff
+        elif kind != 0:
+            raise ValueError(f'filter PNG tidak dikenal: {kind}')
+        rows.append(line)
+        prev = line
+    return rows
+
+
+def _deflate(data, strategy):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+    return compressor.compress(data) + compressor.flush()
+
+
+def optimize_png(data):
+    # Lossless: buang chunk metadata, gabungkan IDAT, kompres ulang dengan
+    # zlib level 9 / zopfli (beberapa strategi, dengan / tanpa filter) dan ambil
+    # yang terkecil. Mengembalikan data asli jika hasilnya tidak lebih kecil.
+    chunks = list(_png_chunks(data))
+    header = dict(chunks)[b'IHDR']
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', header)
+    raw = zlib.decompress(b''.join(body for kind, body in chunks if kind == b'IDAT'))
+
+    streams = [raw]
+    if interlace == 0:
+        bits = PNG_CHANNELS[color_type] * bit_depth
+        bpp, row_bytes = max(1, bits // 8), (width * bits + 7) // 8
+        rows = _unfilter(raw, width, height, bpp, row_bytes)
+        # Gambar palet / bit depth rendah biasanya paling kecil tanpa filter
+        streams.append(b''.join(b'\x00' + bytes(row) for row in rows))
+    candidates = [_deflate(stream, strategy)
+                  for stream in streams for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)]
+    if zopfli_zlib is not None:
+        candidates.extend(zopfli_zlib.compress(stream) for stream in streams)
+    idat = min(candidates, key=len)
+
+    out = [PNG_SIGNATURE]
+    for kind, body in chunks:
+        if kind in PNG_KEEP_CHUNKS:
+            out.append(_png_chunk(kind, body))
+    out.append(_png_chunk(b'IDAT', idat))
+    out.append(_png_chunk(b'IEND', b''))
+    optimized = b''.join(out)
+    return optimized if len(optimized) < len(data) else data
+
+
+# --- build ----------------------------------------------------------------
+
+def process_asset(name, data):
+    ext = os.path.splitext(name)[1].lower()
+    if ext == '.css':
+        return minify_css(data.decode('utf-8')).encode('utf-8')
+    if ext == '.js':
+        return minify_js(data.decode('utf-8')).encode('utf-8')
+    if ext == '.png':
+        try:
+            return optimize_png(data)
+        except (ValueError, zlib.error, struct.error, KeyError) as e:
+            logger.warning('PNG %s tidak dioptimasi: %s', name, e)
+    return data
+
+
+HASHED_NAME = re.compile(r'^(?:[\w-]+/)*[\w.-]+\.[0-9a-f]{%d}\.\w+$' % HASH_LENGTH)
+
+
+def hashed_name(name, data):
+    root, ext = os.path.splitext(name)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def is_hashed_name(filename):
+    # Nama hasil hashed_name(); file generasi sebelumnya juga lolos
+    return bool(HASHED_NAME.match(filename)) and '..' not in filename
+
+
+def _write(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def load_manifest(static_dir):
+    path = os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def build_assets(static_dir):
+    # Mengembalikan (manifest, laporan per file)
+    dist = os.path.join(static_dir, DIST_DIR)
+    previous = load_manifest(static_dir)
+    manifest, report = {}, []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist)
+        for filename in sorted(files):
+            source = os.path.join(root, filename)
+            name = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                original = f.read()
+            data = process_asset(name, original)
+            target = hashed_name(name, data)
+            _write(os.path.join(dist, target), data)
+            sizes = {'name': name, 'file': target, 'original': len(original), 'minified': len(data)}
+            if name.lower().endswith(COMPRESSIBLE) and len(data) >= MIN_COMPRESS_SIZE:
+                sizes['gzip'] = len(_write_variant(dist, target, '.gz', gzip.compress(data, 9, mtime=0)))
+                if brotli is not None:
+                    sizes['br'] = len(_write_variant(dist, target, '.br', brotli.compress(data, quality=11)))
+            manifest[name] = target
+            report.append(sizes)
+
+    _write(os.path.join(dist, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    # File ber-hash dari build sebelumnya tetap disimpan satu generasi
+    # (halaman yang sudah terbuka masih merujuknya); yang lebih lama dihapus.
+    keep = set(manifest.values()) | set(previous.values()) | {MANIFEST_NAME}
+    for root, _, files in os.walk(dist):
+        for filename in files:
+            path = os.path.join(root, filename)
+            rel = os.path.relpath(path, dist).replace(os.sep, '/')
+            base = rel[:-3] if rel.endswith(('.gz', '.br')) else rel
+            if base not in keep:
+                os.remove(path)
+    return manifest, report
+
+
+def _write_variant(dist, target, suffix, data):
+    _write(os.path.join(dist, target + suffix), data)
+    return data
@@ -0,0 +1,107 @@
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+# ---------------------------------------------------------
+# Helper bersama untuk benchmark: persentil, ringkasan, baseline
+#
+# Baseline disimpan di benchmarks/baseline.json per nama hasil
+# (mis. "plan:batch-100000" atau "load:history@100000"). Hasil dianggap
+# regresi jika p95 naik atau throughput turun lebih dari toleransi.
+# ---------------------------------------------------------
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank; sorted_values harus sudah terurut naik
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies_ms, elapsed_s, errors=0):
+    latencies_ms = sorted(latencies_ms)
+    count = len(latencies_ms)
+    return {
+        'count': count,
+        'errors': errors,
+        'throughput': round(count / elapsed_s, 1) if elapsed_s > 0 else 0.0,
+        'p50_ms': round(percentile(latencies_ms, 50), 3),
+        'p95_ms': round(percentile(latencies_ms, 95), 3),
+        'p99_ms': round(percentile(latencies_ms, 99), 3),
+        'max_ms': round(latencies_ms[-1], 3) if latencies_ms else 0.0,
+    }
+
+
+def print_results(results):
+    print(f"{'benchmark':<36} {'count':>7} {'err':>5} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<36} {r['count']:>7} {r['errors']:>5} {r['throughput']:>10} "
+              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(results, path=DEFAULT_BASELINE):
+    # Hasil baru digabung dengan baseline lama (benchmark lain tidak terhapus)
+    merged = load_baseline(path)
+    merged.update(results)
+    with open(path, 'w') as f:
+        json.dump({
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': merged,
+        }, f, indent=2, sort_keys=True)
+    print(f'Baseline disimpan ke {path}')
+
+
+def compare_to_baseline(results, baseline, tolerance=0.20):
+    # Mengembalikan daftar pesan regresi (kosong jika aman)
+    failures = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base.get('p95_ms') and r['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            failures.append(f"{name}: p95 {r['p95_ms']} ms > baseline {base['p95_ms']} ms")
+        if base.get('throughput') and r['throughput'] < base['throughput'] * (1 - tolerance):
+            failures.append(f"{name}: throughput {r['throughput']} < baseline {base['throughput']}")
+        if r['errors'] > base.get('errors', 0):
+            failures.append(f"{name}: {r['errors']} error (baseline {base.get('errors', 0)})")
+    return failures
+
+
+def finish(results, args):
+    # Dipakai semua script: cetak, lalu simpan atau bandingkan baseline
+    print_results(results)
+    if args.update_baseline:
+        save_baseline(results, args.baseline)
+        return 0
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print('Belum ada baseline; jalankan dengan --update-baseline untuk membuatnya.')
+        return 0
+    failures = compare_to_baseline(results, baseline, args.tolerance)
+    for failure in failures:
+        print(f'REGRESI: {failure}')
+    return 1 if failures else 0
+
+
+def add_baseline_arguments(parser):
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.20, help='perubahan relatif maksimum terhadap baseline')
+    parser.add_argument('--update-baseline', action='store_true')
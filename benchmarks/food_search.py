@@ -0,0 +1,105 @@
+import argparse
+import random
+import sys
+import time
+
+from common import percentile
+
+from catalog import FoodIndex, read_catalog_csv  # noqa: E402
+from migrations import BUNDLED_FOODS_CSV  # noqa: E402
+
+# ---------------------------------------------------------
+# Benchmark pencarian katalog makanan (FoodIndex.search)
+#
+# Membuat katalog sintetis (default 100k item) dari nama di data/foods.csv,
+# lalu mengukur latensi query prefix / kata / salah ketik.
+#
+#   python benchmarks/food_search.py --items 100000 --queries 20000
+#
+# Exit code 1 jika p99 melebihi --max-p99-ms.
+# ---------------------------------------------------------
+
+VARIANTS = ['', 'pedas', 'manis', 'spesial', 'jumbo', 'mini', 'komplit', 'original', 'keju', 'madu']
+REGIONS = ['', 'jawa', 'padang', 'betawi', 'bali', 'medan', 'sunda', 'makassar', 'aceh', 'manado']
+
+
+def synthetic_catalog(count, seed=1):
+    rng = random.Random(seed)
+    base = list(read_catalog_csv(BUNDLED_FOODS_CSV))
+    rows, seen, item_id = [], set(), 0
+    while len(rows) < count:
+        name, category, serving, calories, protein, carbs, fat = rng.choice(base)
+        parts = [name, rng.choice(VARIANTS), rng.choice(REGIONS)]
+        full = ' '.join(p for p in parts if p)
+        if full in seen:
+            full = f'{full} {rng.randint(1, 10 ** 6)}'
+            if full in seen:
+                continue
+        seen.add(full)
+        item_id += 1
+        rows.append({
+            'id': item_id, 'name': full, 'category': category, 'serving': serving,
+            'calories': int(calories * rng.uniform(0.8, 1.3)), 'protein': protein,
+            'carbs': carbs, 'fat': fat, 'updated_at': None,
+        })
+    return rows
+
+
+def make_queries(rows, count, seed=2):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        name = rng.choice(rows)['name'].lower()
+        words = name.split()
+        kind = rng.random()
+        if kind < 0.5:
+            q = name[:rng.randint(1, min(len(name), 10))]
+        elif kind < 0.8:
+            word = rng.choice(words)
+            q = word[:rng.randint(1, len(word))]
+        else:
+            # salah ketik: tukar dua huruf di tengah
+            word = max(words, key=len)
+            if len(word) > 3:
+                i = rng.randint(1, len(word) - 3)
+                word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+            q = word
+        queries.append(q)
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark FoodIndex.search')
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=20000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--max-p99-ms', type=float, default=10.0)
+    args = parser.parse_args()
+
+    rows = synthetic_catalog(args.items)
+    index = FoodIndex()
+    started = time.perf_counter()
+    index.build(rows)
+    build_s = time.perf_counter() - started
+
+    queries = make_queries(rows, args.queries)
+    for q in queries[:500]:
+        index.search(q, args.limit)  # pemanasan
+    timings = []
+    for q in queries:
+        started = time.perf_counter()
+        index.search(q, args.limit)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+
+    p50, p95, p99 = (percentile(timings, p) for p in (50, 95, 99))
+    print(f'{len(index)} item, build {build_s:.2f} s')
+    print(f'{len(timings)} query: p50 {p50:.3f} ms  p95 {p95:.3f} ms  p99 {p99:.3f} ms  max {timings[-1]:.3f} ms')
+    if p99 > args.max_p99_ms:
+        print(f'GAGAL: p99 {p99:.3f} ms > {args.max_p99_ms} ms')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import types
+from datetime import date, datetime, timedelta
+
+from common import ROOT, add_baseline_arguments, finish, summarize
+
+# ---------------------------------------------------------
+# Load test route utama terhadap MySQL lokal
+#
+# Memakai Flask test client (tanpa server HTTP), jadi yang terukur adalah
+# waktu aplikasi + database. Database terpisah (default dietplanner_bench)
+# dibuat, dimigrasi, lalu diisi data sintetis sebanyak --rows baris untuk
+# food_log dan progress_history. Gemini diganti stub lokal.
+#
+#   BENCH_MYSQL_USER=root BENCH_MYSQL_PASSWORD=... \
+#   python benchmarks/load_test.py --rows 100000 --requests 500 --concurrency 4
+#
+# Data hanya di-seed ulang jika jumlah barisnya berbeda (atau --reseed).
+# --mysql-replicas host:port,... mengarahkan bacaan ke replica dari database
+# benchmark (mis. MySQL lokal kedua yang mereplikasi instance pertama).
+# --allow-non-replica mengizinkan server biasa sebagai stand-in replica.
+# Hasil dibandingkan dengan benchmarks/baseline.json per "load:<route>@<rows>".
+# ---------------------------------------------------------
+
+BENCH_PASSWORD = 'bench-password'
+SCENARIOS = ['login', 'dietplanner_post', 'food_log_get', 'food_log_post', 'history', 'user_info', 'chatbot']
+SEED_CHUNK = 10000
+FOOD_NAMES = ['Nasi goreng', 'Ayam bakar', 'Tempe goreng', 'Sayur asem', 'Pisang ambon',
+              'Soto ayam', 'Teh manis', 'Telur rebus', 'Gado-gado', 'Mie ayam']
+
+
+def configure_environment(args):
+    # Harus sebelum `import app`: create_app() membaca konfigurasi dari environment
+    os.environ['MYSQL_HOST'] = args.mysql_host
+    os.environ['MYSQL_USER'] = args.mysql_user
+    os.environ['MYSQL_PASSWORD'] = args.mysql_password
+    os.environ['MYSQL_DB'] = args.mysql_db
+    os.environ['DB_POOL_MAX_SIZE'] = str(args.concurrency + 2)
+    os.environ['MYSQL_REPLICAS'] = args.mysql_replicas
+    os.environ['MYSQL_REPLICA_ALLOW_NON_REPLICA'] = '1' if args.allow_non_replica else '0'
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    # Load test sengaja melebihi batas per user / IP
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+
+
+def ensure_database(args):
+    import MySQLdb
+    conn = MySQLdb.connect(host=args.mysql_host, user=args.mysql_user, passwd=args.mysql_password)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'CREATE DATABASE IF NOT EXISTS `{args.mysql_db}` CHARACTER SET utf8mb4')
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def stub_gemini(delay):
+    class Response:
+        def __init__(self, text):
+            self.text = text
+
+    class Model:
+        def __init__(self, name):
+            self.name = name
+
+        def generate_content(self, prompt, stream=False, **kwargs):
+            time.sleep(delay)
+            if stream:
+                return iter([Response('Jawaban '), Response('benchmark')])
+            return Response('Jawaban benchmark')
+
+    return types.SimpleNamespace(
+        GenerativeModel=Model,
+        configure=lambda **kwargs: None,
+        list_models=lambda: [],
+    )
+
+
+def table_count(cursor, table):
+    cursor.execute(f'SELECT COUNT(*) FROM {table}')
+    return cursor.fetchone()[0]
+
+
+def seed(app_module, rows, users, reseed=False):
+    db = app_module.db
+    with app_module.app.app_context(), db.cursor() as cursor:
+        pwhash = app_module.password_hasher.hash(BENCH_PASSWORD)
+        cursor.executemany(
+            'INSERT IGNORE INTO users (fullname, email, username, password_hash) VALUES (%s, %s, %s, %s)',
+            [(f'Bench {i}', f'bench_{i}@example.com', f'bench_{i}', pwhash) for i in range(users)]
+        )
+        db.commit()
+        cursor.execute("SELECT id, username FROM users WHERE username LIKE 'bench\\_%%' ORDER BY id")
+        accounts = list(cursor.fetchall())[:users]
+
+        if not reseed and table_count(cursor, 'food_log') == rows and table_count(cursor, 'progress_history') == rows:
+            print(f'Data benchmark ({rows} baris) sudah ada, seed dilewati.')
+            return accounts
+
+        print(f'Seed {rows} baris food_log & progress_history untuk {len(accounts)} user...')
+        started = time.perf_counter()
+        for table in ('food_log_daily', 'food_log', 'progress_history'):
+            cursor.execute(f'TRUNCATE TABLE {table}')
+        rng = random.Random(42)
+        user_ids = [uid for uid, _ in accounts]
+        today = date.today()
+        now = datetime.now()
+        for start in range(0, rows, SEED_CHUNK):
+            size = min(SEED_CHUNK, rows - start)
+            cursor.executemany(
+                'INSERT INTO food_log (user_id, food_name, calories, log_date) VALUES (%s, %s, %s, %s)',
+                [(rng.choice(user_ids), rng.choice(FOOD_NAMES), rng.randint(50, 900),
+                  today - timedelta(days=rng.randint(0, 730))) for _ in range(size)]
+            )
+            cursor.executemany(
+                'INSERT INTO progress_history (user_id, bmi, daily_calories, goal_key, goal_calories, created_at) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                [(rng.choice(user_ids), round(rng.uniform(17, 35), 1), rng.randint(1500, 3200),
+                  rng.choice(['gain', 'maintain', 'lose']), rng.randint(1300, 3500),
+                  now - timedelta(minutes=rng.randint(0, 730 * 24 * 60))) for _ in range(size)]
+            )
+            db.commit()
+        cursor.execute(
+            'INSERT INTO food_log_daily (user_id, log_date, total_calories, entry_count) '
+            'SELECT user_id, log_date, SUM(calories), COUNT(*) FROM food_log GROUP BY user_id, log_date'
+        )
+        db.commit()
+        print(f'Seed selesai dalam {time.perf_counter() - started:.1f} s')
+        return accounts
+
+
+def make_request(scenario, client, account, rng):
+    # Mengembalikan (response, status yang diharapkan)
+    if scenario == 'login':
+        return client.post('/login', data={'email': account[1], 'password': BENCH_PASSWORD}), (302,)
+    if scenario == 'dietplanner_post':
+        return client.post('/dietplanner', data={
+            'weight': round(rng.uniform(45, 110), 1), 'height': rng.randint(150, 195), 'age': rng.randint(18, 70),
+            'gender': rng.choice(['male', 'female']), 'activity': rng.choice(['sedentary', 'light', 'moderate']),
+            'goal': rng.choice(['gain_weight', 'maintain_weight', 'lose_weight']),
+        }), (200,)
+    if scenario == 'food_log_get':
+        return client.get('/food_log'), (200,)
+    if scenario == 'food_log_post':
+        return client.post('/food_log', data={
+            'food_name': rng.choice(FOOD_NAMES), 'calories': rng.randint(50, 900),
+            'log_date': (date.today() - timedelta(days=rng.randint(0, 30))).isoformat(),
+        }), (302,)
+    if scenario == 'history':
+        return client.get('/history'), (200,)
+    if scenario == 'user_info':
+        return client.get('/user_info'), (200, 304)
+    if scenario == 'chatbot':
+        # Pertanyaan unik agar tidak dilayani cache jawaban
+        return client.post('/api/chatbot', json={'question': f'menu sehat {rng.random()}'}), (200,)
+    raise ValueError(scenario)
+
+
+def run_scenario(app_module, scenario, accounts, total, concurrency):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker(index):
+        rng = random.Random(index)
+        account = accounts[index % len(accounts)]
+        client = app_module.app.test_client()
+        if scenario != 'login':
+            with client.session_transaction() as sess:
+                sess['loggedin'] = True
+                sess['id'] = account[0]
+                sess['username'] = account[1]
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            t0 = time.perf_counter()
+            response, expected = make_request(scenario, client, account, rng)
+            response.get_data()  # pastikan body (termasuk stream) selesai dibaca
+            elapsed = (time.perf_counter() - t0) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code not in expected:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies, time.perf_counter() - started, errors[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test route utama (Flask test client + MySQL lokal)')
+    parser.add_argument('--rows', type=int, default=10000, help='jumlah baris food_log & progress_history (1k-1M)')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=300, help='request per skenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--gemini-delay', type=float, default=0.0, help='latensi stub Gemini (detik)')
+    parser.add_argument('--reseed', action='store_true')
+    parser.add_argument('--mysql-host', default=os.getenv('BENCH_MYSQL_HOST', 'localhost'))
+    parser.add_argument('--mysql-user', default=os.getenv('BENCH_MYSQL_USER', 'root'))
+    parser.add_argument('--mysql-password', default=os.getenv('BENCH_MYSQL_PASSWORD', ''))
+    parser.add_argument('--mysql-db', default=os.getenv('BENCH_MYSQL_DB', 'dietplanner_bench'))
+    parser.add_argument('--mysql-replicas', default=os.getenv('BENCH_MYSQL_REPLICAS', ''),
+                        help='read replica host[:port],... (kosong = semua query ke primary)')
+    parser.add_argument('--allow-non-replica', action='store_true',
+                        help='pakai --mysql-replicas walaupun bukan replica (stand-in lokal)')
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    configure_environment(args)
+    ensure_database(args)
+    os.chdir(ROOT)
+    import app as app_module
+    from migrations import migrate
+
+    with app_module.app.app_context():
+        migrate(app_module.db.connection)
+    genai_stub = stub_gemini(args.gemini_delay)
+    app_module.get_genai = lambda: genai_stub
+    app_module.gemini_registry.reset()
+
+    accounts = seed(app_module, args.rows, args.users, args.reseed)
+    results = {}
+    for scenario in [s for s in args.scenarios.split(',') if s]:
+        if scenario not in SCENARIOS:
+            parser.error(f'skenario tidak dikenal: {scenario}')
+        results[f'load:{scenario}@{args.rows}'] = run_scenario(
+            app_module, scenario, accounts, args.requests, args.concurrency)
+    return finish(results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
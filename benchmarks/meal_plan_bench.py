@@ -0,0 +1,78 @@
+import argparse
+import random
+import sys
+import time
+
+from common import ROOT, add_baseline_arguments, finish, summarize
+
+from catalog import read_catalog_csv  # noqa: E402
+from mealplan import MealPlanner  # noqa: E402
+from migrations import BUNDLED_FOODS_CSV  # noqa: E402
+
+# ---------------------------------------------------------
+# Microbenchmark generator menu mingguan (mealplan.py)
+#
+#   python benchmarks/meal_plan_bench.py                    # bandingkan ke baseline
+#   python benchmarks/meal_plan_bench.py --catalog foods.csv --update-baseline
+#
+# - mealplan:week      : plan_week() per user (jalur /dietplanner, target < 100 ms)
+# - mealplan:batch-N   : N user berturut-turut seperti `flask precompute-meal-plans`;
+#                        throughput dalam user per detik
+# ---------------------------------------------------------
+
+
+def load_planner(path):
+    foods = [
+        {'id': i, 'name': row[0], 'category': row[1], 'serving': row[2], 'calories': row[3], 'protein': row[4]}
+        for i, row in enumerate(read_catalog_csv(path), 1)
+    ]
+    return MealPlanner(foods)
+
+
+def random_target(rng):
+    calories = rng.randint(1200, 3600)
+    return calories, round(calories * rng.uniform(0.15, 0.3) / 4, 1)
+
+
+def bench_week(planner, iterations, seed=1):
+    rng = random.Random(seed)
+    latencies = []
+    started = time.perf_counter()
+    for user_id in range(iterations):
+        calories, protein = random_target(rng)
+        t0 = time.perf_counter()
+        planner.plan_week(calories, protein, seed=user_id)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def bench_batch(planner, users, seed=2):
+    rng = random.Random(seed)
+    targets = [random_target(rng) for _ in range(users)]
+    t0 = time.perf_counter()
+    for user_id, (calories, protein) in enumerate(targets):
+        planner.plan_week(calories, protein, seed=user_id)
+    elapsed = time.perf_counter() - t0
+    result = summarize([elapsed * 1000], elapsed)
+    result['throughput'] = round(users / elapsed, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark menu mingguan')
+    parser.add_argument('--catalog', default=BUNDLED_FOODS_CSV, help=f'CSV katalog (default: data bawaan di {ROOT})')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--batch-users', type=int, default=1000)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    planner = load_planner(args.catalog)
+    results = {
+        'mealplan:week': bench_week(planner, args.iterations),
+        f'mealplan:batch-{args.batch_users}': bench_batch(planner, args.batch_users),
+    }
+    return finish(results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
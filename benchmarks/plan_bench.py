@@ -0,0 +1,82 @@
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+from common import add_baseline_arguments, finish, summarize
+
+from planner import compute_plan, compute_plans  # noqa: E402
+
+# ---------------------------------------------------------
+# Microbenchmark perhitungan rencana diet (planner.py)
+#
+#   python benchmarks/plan_bench.py                     # bandingkan ke baseline
+#   python benchmarks/plan_bench.py --update-baseline
+#
+# - plan:single       : compute_plan() per request (jalur /dietplanner)
+# - plan:batch-N      : compute_plans() vektor untuk N baris (jalur batch API);
+#                       throughput dalam baris per detik
+# ---------------------------------------------------------
+
+GENDERS = ['male', 'female']
+ACTIVITIES = ['sedentary', 'light', 'moderate', 'active', 'very_active', 'None']
+GOALS = ['gain_weight', 'maintain_weight', 'lose_weight', '']
+
+
+def random_inputs(n, seed=1):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.uniform(35, 150, n),
+        rng.uniform(140, 200, n),
+        rng.integers(15, 80, n),
+        rng.choice(GENDERS, n),
+        rng.choice(ACTIVITIES, n),
+        rng.choice(GOALS, n),
+    )
+
+
+def bench_single(iterations, seed=1):
+    rng = random.Random(seed)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        args = (rng.uniform(35, 150), rng.uniform(140, 200), rng.randint(15, 80),
+                rng.choice(GENDERS), rng.choice(ACTIVITIES), rng.choice(GOALS))
+        t0 = time.perf_counter()
+        compute_plan(*args)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def bench_batch(rows, repeats):
+    inputs = random_inputs(rows)
+    compute_plans(*inputs)  # pemanasan
+    latencies = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        compute_plans(*inputs)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    result = summarize(latencies, sum(latencies) / 1000)
+    # throughput batch = baris per detik
+    result['throughput'] = round(rows * len(latencies) / (sum(latencies) / 1000), 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark planner')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--batch-sizes', default='1000,100000,1000000')
+    parser.add_argument('--repeats', type=int, default=10)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    results = {'plan:single': bench_single(args.iterations)}
+    for size in (int(s) for s in args.batch_sizes.split(',') if s):
+        results[f'plan:batch-{size}'] = bench_batch(size, args.repeats)
+    return finish(results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
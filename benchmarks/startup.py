@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# ---------------------------------------------------------
+# Benchmark waktu start worker (import app)
+#
+# Menjalankan `python -X importtime -c "import app"` beberapa kali di proses
+# baru, lalu melaporkan total waktu import dan modul paling mahal (kumulatif).
+#
+#   python benchmarks/startup.py                   # laporan + bandingkan baseline
+#   python benchmarks/startup.py --update-baseline # simpan hasil sebagai baseline
+#
+# Exit code 1 jika total melebihi baseline lebih dari --tolerance, atau jika
+# modul yang seharusnya lazy (LAZY_MODULES) ikut ter-import saat start.
+# ---------------------------------------------------------
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'startup_baseline.json')
+
+# Hanya boleh dimuat saat dipakai (lihat gemini.load_sdk)
+LAZY_MODULES = ['google.generativeai']
+
+
+def run_importtime(module='app'):
+    # Baris stderr: "import time: self [us] | cumulative | imported package"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f'import {module} gagal:\n{result.stderr[-2000:]}')
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = {
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+        }
+    if module not in timings:
+        raise SystemExit(f'Tidak ada data importtime untuk {module}')
+    return timings
+
+
+def measure(module='app', runs=5):
+    totals = []
+    last = None
+    for _ in range(runs):
+        last = run_importtime(module)
+        totals.append(last[module]['cumulative_us'])
+    return {
+        'module': module,
+        'runs': runs,
+        'total_ms_median': round(statistics.median(totals) / 1000, 1),
+        'total_ms_min': round(min(totals) / 1000, 1),
+        'modules': last,
+    }
+
+
+def top_modules(modules, limit=15):
+    # Hanya modul level atas (mis. "numpy", bukan "numpy.core._methods")
+    top = [(name, t['cumulative_us']) for name, t in modules.items() if '.' not in name]
+    top.sort(key=lambda item: item[1], reverse=True)
+    return top[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Laporan waktu import app (-X importtime)')
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.20, help='kenaikan maksimum relatif terhadap baseline')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    result = measure(args.module, args.runs)
+    print(f"import {result['module']}: median {result['total_ms_median']} ms, "
+          f"min {result['total_ms_min']} ms ({result['runs']} run)")
+    for name, cumulative_us in top_modules(result['modules'], args.top):
+        print(f'  {cumulative_us / 1000:9.1f} ms  {name}')
+
+    failures = []
+    eager = [name for name in LAZY_MODULES if name in result['modules']]
+    if eager:
+        failures.append(f"modul lazy ter-import saat start: {', '.join(eager)}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'module': result['module'],
+                'total_ms_median': result['total_ms_median'],
+                'top': top_modules(result['modules'], args.top),
+            }, f, indent=2)
+        print(f'Baseline disimpan ke {args.baseline}')
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        limit = baseline['total_ms_median'] * (1 + args.tolerance)
+        print(f"baseline: {baseline['total_ms_median']} ms (batas {limit:.1f} ms)")
+        if result['total_ms_median'] > limit:
+            failures.append(f"waktu import naik: {result['total_ms_median']} ms > {limit:.1f} ms")
+    else:
+        print('Belum ada baseline; jalankan dengan --update-baseline untuk membuatnya.')
+
+    for failure in failures:
+        print(f'GAGAL: {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+# Redis opsional: hanya dipakai jika CACHE_URL diisi dan library tersedia
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Cache sederhana dengan eviction LRU + TTL
+#
+# TTLCache menyimpan data di memori proses; RedisCache memakai interface yang
+# sama tetapi dibagi oleh semua worker. Keduanya mencatat hit/miss.
+# ---------------------------------------------------------
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._counters['misses'] += 1
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self._counters['hits'] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+            data.update({'backend': 'memory', 'size': len(self._data), 'maxsize': self.maxsize})
+            return data
+
+
+class RedisCache:
+    # Nilai disimpan sebagai JSON; TTL ditangani Redis, LRU oleh maxmemory-policy server
+    def __init__(self, client, prefix, ttl=3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key, default=None):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning('Cache get gagal (%s): %s', self.prefix, e)
+            self._count('errors')
+            raw = None
+        if raw is None:
+            self._count('misses')
+            return default
+        self._count('hits')
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.client.set(self.prefix + key, json.dumps(value, default=str), ex=int(self.ttl if ttl is None else ttl))
+        except Exception as e:
+            logger.warning('Cache set gagal (%s): %s', self.prefix, e)
+            self._count('errors')
+
+    def delete(self, key):
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning('Cache delete gagal (%s): %s', self.prefix, e)
+            self._count('errors')
+
+    def clear(self):
+        try:
+            for key in self.client.scan_iter(self.prefix + '*'):
+                self.client.delete(key)
+        except Exception as e:
+            logger.warning('Cache clear gagal (%s): %s', self.prefix, e)
+            self._count('errors')
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+        data['backend'] = 'redis'
+        return data
+
+
+def make_cache(name, maxsize=1024, ttl=3600, url=None):
+    # Pakai Redis bila url diberikan, selain itu (atau jika gagal) cache in-process
+    if url:
+        if redis is None:
+            logger.warning('CACHE_URL diisi tetapi library redis tidak terpasang; memakai cache lokal untuk %s', name)
+        else:
+            try:
+                return RedisCache(redis.Redis.from_url(url), prefix=f'dietplanner:{name}:', ttl=ttl)
+            except Exception as e:
+                logger.warning('Tidak dapat membuat Redis cache %s: %s', name, e)
+    return TTLCache(maxsize=maxsize, ttl=ttl)
@@ -0,0 +1,255 @@
+import bisect
+import csv
+import logging
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Katalog makanan + index pencarian di memori
+#
+# - Prefix: daftar terurut (kunci, id) untuk nama lengkap dan setiap kata,
+#   dicari dengan bisect, jadi "gor" menemukan "nasi goreng".
+# - Trigram: fallback untuk salah ketik / potongan kata di tengah.
+# - Index dibangun sekali per worker (atau di-load dari file hasil
+#   `flask build-food-index`), lalu diperbarui incremental berdasarkan
+#   kolom updated_at di food_catalog. Baris yang dihapus tidak terlihat
+#   lewat updated_at, jadi index dibangun ulang penuh jika jumlah baris
+#   tabel berbeda dengan index, dan paling lama setiap full_reload_after detik.
+# ---------------------------------------------------------
+
+CATALOG_COLUMNS = ['name', 'category', 'serving', 'calories', 'protein', 'carbs', 'fat']
+CATALOG_SELECT = (
+    'SELECT id, name, category, serving, calories, protein, carbs, fat, updated_at FROM food_catalog'
+)
+
+# Posting list trigram yang lebih besar dari ini terlalu umum untuk membantu
+TRIGRAM_MAX_POSTING = 5000
+TRIGRAM_MIN_SCORE = 0.5
+FULL_RELOAD_SECONDS = 3600
+
+
+def normalize_name(name):
+    # "Nasi Goreng (Telur)" -> "nasi goreng telur"; huruf beraksen disederhanakan
+    text = unicodedata.normalize('NFKD', str(name or '')).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_catalog_row(record):
+    # Baris CSV -> tuple kolom food_catalog; None jika tidak valid
+    name = (record.get('name') or '').strip()
+    try:
+        calories = int(float(record.get('calories')))
+    except (TypeError, ValueError):
+        return None
+    if not name or calories < 0:
+        return None
+
+    def number(key):
+        try:
+            return round(float(record.get(key)), 1)
+        except (TypeError, ValueError):
+            return None
+
+    return (
+        name[:100],
+        (record.get('category') or '').strip()[:32] or None,
+        (record.get('serving') or '').strip()[:32] or None,
+        calories,
+        number('protein'),
+        number('carbs'),
+        number('fat'),
+    )
+
+
+def read_catalog_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for record in csv.DictReader(f):
+            row = parse_catalog_row({(k or '').strip().lower(): v for k, v in record.items()})
+            if row is not None:
+                yield row
+
+
+def upsert_catalog_rows(cursor, rows, chunk_size=1000):
+    rows = list(rows)
+    for start in range(0, len(rows), chunk_size):
+        cursor.executemany(
+            'INSERT INTO food_catalog (name, category, serving, calories, protein, carbs, fat) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s) '
+            'ON DUPLICATE KEY UPDATE category = VALUES(category), serving = VALUES(serving), '
+            'calories = VALUES(calories), protein = VALUES(protein), carbs = VALUES(carbs), fat = VALUES(fat)',
+            rows[start:start + chunk_size]
+        )
+    return len(rows)
+
+
+class FoodIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.items = {}       # id -> dict
+        self._names = []      # (nama ter-normalisasi, id), terurut
+        self._words = []      # (kata, id), terurut
+        self._trigrams = {}   # trigram -> set(id)
+        self.watermark = None  # updated_at terbaru yang sudah masuk index
+        self.loaded_at = None
+        self.built_at = None   # build penuh terakhir
+
+    def __len__(self):
+        return len(self.items)
+
+    # --- build / update ---------------------------------------------------
+
+    def _keys(self, item):
+        norm = item['_norm']
+        return (norm, item['id']), [(word, item['id']) for word in set(norm.split())]
+
+    def _remove(self, item_id):
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return
+        name_key, word_keys = self._keys(item)
+        for keys, key in [(self._names, name_key)] + [(self._words, k) for k in word_keys]:
+            pos = bisect.bisect_left(keys, key)
+            if pos < len(keys) and keys[pos] == key:
+                del keys[pos]
+        for gram in trigrams(item['_norm']):
+            posting = self._trigrams.get(gram)
+            if posting is not None:
+                posting.discard(item_id)
+                if not posting:
+                    del self._trigrams[gram]
+
+    def _add(self, item, bulk=False):
+        item = dict(item)
+        item['_norm'] = normalize_name(item['name'])
+        self.items[item['id']] = item
+        name_key, word_keys = self._keys(item)
+        if bulk:
+            self._names.append(name_key)
+            self._words.extend(word_keys)
+        else:
+            bisect.insort(self._names, name_key)
+            for key in word_keys:
+                bisect.insort(self._words, key)
+        for gram in trigrams(item['_norm']):
+            self._trigrams.setdefault(gram, set()).add(item['id'])
+        updated_at = item.get('updated_at')
+        if updated_at is not None and (self.watermark is None or updated_at > self.watermark):
+            self.watermark = updated_at
+
+    def build(self, rows):
+        with self._lock:
+            self.items, self._names, self._words, self._trigrams = {}, [], [], {}
+            self.watermark = None
+            for row in rows:
+                self._add(row, bulk=True)
+            self._names.sort()
+            self._words.sort()
+            self.loaded_at = self.built_at = time.monotonic()
+
+    def update(self, rows):
+        # Incremental: baris baru / berubah menggantikan entri lama dengan id sama
+        count = 0
+        with self._lock:
+            for row in rows:
+                self._remove(row['id'])
+                self._add(row)
+                count += 1
+            self.loaded_at = time.monotonic()
+        return count
+
+    def all_items(self):
+        with self._lock:
+            return list(self.items.values())
+
+    def build_from_db(self, cursor):
+        cursor.execute(CATALOG_SELECT)
+        self.build(cursor.fetchall())
+
+    def refresh_from_db(self, cursor, full_reload_after=FULL_RELOAD_SECONDS):
+        with self._lock:
+            watermark, built_at = self.watermark, self.built_at
+        if watermark is None or built_at is None or time.monotonic() - built_at >= full_reload_after:
+            self.build_from_db(cursor)
+            return len(self)
+        cursor.execute(CATALOG_SELECT + ' WHERE updated_at >= %s ORDER BY updated_at', (watermark,))
+        # >= karena beberapa baris bisa berbagi detik yang sama; entri sama hanya ditimpa
+        count = self.update(cursor.fetchall())
+        cursor.execute('SELECT COUNT(*) AS row_count FROM food_catalog')
+        row = cursor.fetchone()
+        if row is not None and row['row_count'] != len(self):
+            # Ada baris yang dihapus: bangun ulang agar tidak muncul lagi di pencarian
+            logger.info('Katalog makanan berubah (%s baris, index %s); index dibangun ulang',
+                        row['row_count'], len(self))
+            self.build_from_db(cursor)
+            return len(self)
+        return count
+
+    def save(self, path):
+        with self._lock:
+            state = (self.items, self._names, self._words, self._trigrams, self.watermark)
+            with open(path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, path):
+        # Hanya untuk file lokal yang dibuat oleh `flask build-food-index`
+        with open(path, 'rb') as f:
+            items, names, words, grams, watermark = pickle.load(f)
+        with self._lock:
+            self.items, self._names, self._words, self._trigrams = items, names, words, grams
+            self.watermark = watermark
+            self.loaded_at = self.built_at = time.monotonic()
+
+    # --- search -----------------------------------------------------------
+
+    def _scan_prefix(self, keys, prefix, found, limit):
+        pos = bisect.bisect_left(keys, (prefix,))
+        while pos < len(keys) and len(found) < limit:
+            key, item_id = keys[pos]
+            if not key.startswith(prefix):
+                break
+            if item_id not in found:
+                found.append(item_id)
+            pos += 1
+
+    def _scan_trigrams(self, query, found, limit):
+        grams = trigrams(query)
+        postings = sorted((self._trigrams.get(g, ()) for g in grams), key=len)
+        useful = [p for p in postings if 0 < len(p) <= TRIGRAM_MAX_POSTING] or postings[:1]
+        scores = Counter()
+        for posting in useful[:6]:
+            scores.update(posting)
+        need = TRIGRAM_MIN_SCORE * min(len(grams), len(useful[:6]))
+        for item_id, score in scores.most_common():
+            if len(found) >= limit or score < need:
+                break
+            if item_id not in found:
+                found.append(item_id)
+
+    def search(self, query, limit=10):
+        query = normalize_name(query)
+        if not query:
+            return []
+        found = []
+        with self._lock:
+            # 1) awal nama lengkap, 2) awal salah satu kata, 3) trigram
+            self._scan_prefix(self._names, query, found, limit)
+            if len(found) < limit and ' ' not in query:
+                self._scan_prefix(self._words, query, found, limit)
+            if len(found) < limit and len(query) >= 3:
+                self._scan_trigrams(query, found, limit)
+            return [self.public(self.items[item_id]) for item_id in found]
+
+    @staticmethod
+    def public(item):
+        return {key: item.get(key) for key in ['id'] + CATALOG_COLUMNS}
@@ -0,0 +1,497 @@
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import MySQLdb
+from flask import g
+
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Connection pool MySQL
+#
+# Satu pool per proses worker. Setiap request meminjam paling banyak satu
+# koneksi (disimpan di flask.g) dan mengembalikannya saat app context selesai,
+# jadi semua query dalam satu request memakai koneksi yang sama.
+# ---------------------------------------------------------
+
+
+class PoolTimeout(MySQLdb.OperationalError):
+    # Semua koneksi sedang dipakai dan tidak ada yang kembali dalam batas waktu
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, connect_kwargs, min_size=1, max_size=10, idle_timeout=300,
+                 health_check_interval=30, acquire_timeout=5):
+        self.connect_kwargs = connect_kwargs
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (conn, last_used) - LIFO agar koneksi "hangat" dipakai ulang
+        self._size = 0
+        self._pid = os.getpid()
+        self._counters = {
+            'created': 0,
+            'closed': 0,
+            'acquired': 0,
+            'released': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+            'evicted_idle': 0,
+        }
+
+    def _connect(self):
+        return MySQLdb.connect(**self.connect_kwargs)
+
+    def _close(self, conn):
+        self._counters['closed'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _check_fork(self):
+        # Setelah fork (gunicorn --preload) koneksi milik parent tidak boleh dipakai
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._size = 0
+
+    def _evict_idle_locked(self, now):
+        # Tutup koneksi idle yang terlalu lama, tetapi sisakan min_size koneksi
+        while self._idle and self._size > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._counters['evicted_idle'] += 1
+            self._close(conn)
+
+    def _is_healthy(self, conn, last_used, now):
+        # Dipanggil tanpa lock: ping() adalah round-trip jaringan
+        if now - last_used < self.health_check_interval:
+            return True
+        try:
+            conn.ping()
+            return True
+        except Exception:
+            return False
+
+    def warm_up(self):
+        with self._lock:
+            self._check_fork()
+            while self._size < self.min_size:
+                self._idle.append((self._connect(), time.monotonic()))
+                self._size += 1
+                self._counters['created'] += 1
+
+    def acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            conn = None
+            with self._lock:
+                self._check_fork()
+                while True:
+                    now = time.monotonic()
+                    self._evict_idle_locked(now)
+                    if self._idle:
+                        # Slotnya tetap terhitung di _size selama diperiksa
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout('Connection pool exhausted (max_size=%d)' % self.max_size)
+                    self._counters['waits'] += 1
+                    self._lock.wait(remaining)
+            if conn is None:
+                break
+            # Health check di luar lock, sama seperti _connect(): koneksi yang
+            # lambat / setengah mati tidak memblokir acquire() dan release() lain
+            healthy = self._is_healthy(conn, last_used, now)
+            with self._lock:
+                if healthy:
+                    self._counters['acquired'] += 1
+                    return conn
+                self._counters['health_check_failures'] += 1
+                self._size -= 1
+                self._close(conn)
+                self._lock.notify()
+
+        # Buka koneksi baru di luar lock agar thread lain tidak ikut menunggu
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._counters['created'] += 1
+            self._counters['acquired'] += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        with self._lock:
+            self._counters['released'] += 1
+            if self._pid != os.getpid():
+                return
+            if discard:
+                self._size -= 1
+                self._close(conn)
+            else:
+                now = time.monotonic()
+                self._idle.append((conn, now))
+                self._evict_idle_locked(now)
+            self._lock.notify()
+
+    def close_all(self):
+        with self._lock:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._close(conn)
+            self._lock.notify_all()
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+            data = dict(self._counters)
+            data.update({
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+            return data
+
+
+# ---------------------------------------------------------
+# Instrumentasi query
+#
+# Setiap cursor dari Database.cursor() dibungkus agar durasi dan jumlah baris
+# per execute tercatat, dikelompokkan per operasi + tabel (bukan per teks SQL,
+# supaya jumlah label tetap kecil). Query yang melewati DB_SLOW_QUERY_MS
+# ditulis ke log tanpa parameter.
+# ---------------------------------------------------------
+
+QUERY_SECONDS = Histogram(
+    'dietplanner_db_query_seconds', 'Durasi execute() MySQL', ['operation', 'table'])
+QUERY_ROWS = Histogram(
+    'dietplanner_db_query_rows', 'Jumlah baris dibaca/diubah per execute()', ['operation', 'table'],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000))
+
+_QUERY_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE)\s+`?(\w+)', re.IGNORECASE)
+
+
+def query_labels(query):
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    words = query.split(None, 1)
+    operation = words[0].lower() if words else ''
+    match = _QUERY_TABLE.search(query)
+    return operation, match.group(1).lower() if match else ''
+
+
+class InstrumentedCursor:
+    def __init__(self, cursor, slow_query_ms=None):
+        self._cursor = cursor
+        self._slow_query_ms = slow_query_ms
+        # Cursor server-side (SSCursor) belum tahu jumlah baris saat execute selesai
+        self._server_side = isinstance(cursor, MySQLdb.cursors.CursorUseResultMixIn)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, method, query, args):
+        started = time.perf_counter()
+        try:
+            return method(query, args)
+        finally:
+            elapsed = time.perf_counter() - started
+            operation, table = query_labels(query)
+            QUERY_SECONDS.observe(elapsed, operation=operation, table=table)
+            rows = None if self._server_side else self._cursor.rowcount
+            if isinstance(rows, int) and rows >= 0:
+                QUERY_ROWS.observe(rows, operation=operation, table=table)
+            if self._slow_query_ms and elapsed * 1000 >= self._slow_query_ms:
+                logger.warning('Slow query (%.1f ms, %s baris): %s',
+                               elapsed * 1000, rows, ' '.join(str(query).split())[:500])
+
+    def execute(self, query, args=None):
+        return self._timed(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed(self._cursor.executemany, query, args)
+
+
+# ---------------------------------------------------------
+# Read replica (opsional)
+#
+# MYSQL_REPLICAS="host1:3306,host2" menambahkan satu pool per replica.
+# Query lewat db.cursor(..., read=True) dikirim ke replica (round-robin)
+# selama lag replikasinya <= DB_REPLICA_MAX_LAG detik; jika tidak ada replica
+# yang sehat, ke primary. Lag diperiksa paling sering setiap
+# DB_REPLICA_LAG_CHECK_INTERVAL detik dengan SHOW REPLICA STATUS. Server yang
+# bukan replica (status kosong, mis. primary lama / server standalone yang
+# salah konfigurasi) tidak dipakai, kecuali MYSQL_REPLICA_ALLOW_NON_REPLICA=1
+# (stand-in untuk pengujian lokal; dianggap lag 0).
+#
+# Read-your-writes: commit() menandai request; app lalu menyimpan batas waktu
+# di session dan memanggil use_primary() untuk request user tersebut sampai
+# DB_STICKY_SECONDS berlalu. Dalam satu request, setelah commit semua
+# pembacaan juga kembali ke primary.
+# ---------------------------------------------------------
+
+
+def parse_hosts(value, default_port=3306):
+    # "db-a:3307, db-b" -> [('db-a', 3307), ('db-b', 3306)]
+    hosts = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(':') if ':' in item else (item, '', '')
+        hosts.append((host, int(port) if port else default_port))
+    return hosts
+
+
+class Replica:
+    def __init__(self, name, pool, max_lag=5, check_interval=5, allow_non_replica=False):
+        self.name = name
+        self.pool = pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.allow_non_replica = allow_non_replica
+        self.lag = None
+        self.checked_at = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._counters = {'lag_checks': 0, 'failures': 0}
+
+    def _read_lag(self):
+        conn = self.pool.acquire()
+        discard = False
+        try:
+            cursor = conn.cursor(MySQLdb.cursors.DictCursor)
+            try:
+                try:
+                    cursor.execute('SHOW REPLICA STATUS')
+                except MySQLdb.ProgrammingError:
+                    # MySQL < 8.0.22
+                    cursor.execute('SHOW SLAVE STATUS')
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+        except Exception:
+            discard = True
+            raise
+        finally:
+            self.pool.release(conn, discard=discard)
+        if not row:
+            if self.allow_non_replica:
+                return 0
+            raise MySQLdb.OperationalError('server bukan replica (SHOW REPLICA STATUS kosong)')
+        lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+        # NULL = thread replikasi berhenti
+        return None if lag is None else int(lag)
+
+    def available(self):
+        checked_at = self.checked_at
+        if checked_at is None or time.monotonic() - checked_at >= self.check_interval:
+            # Satu thread memeriksa; yang lain memakai hasil sebelumnya
+            if self._lock.acquire(blocking=checked_at is None):
+                try:
+                    if self.checked_at == checked_at:
+                        self._counters['lag_checks'] += 1
+                        self.lag, self.error = self._read_lag(), None
+                except Exception as e:
+                    self._mark_down(e)
+                finally:
+                    self.checked_at = time.monotonic()
+                    self._lock.release()
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def _mark_down(self, error):
+        logger.warning('Replica %s tidak dipakai: %s', self.name, error)
+        self.lag, self.error = None, str(error)
+        self._counters['failures'] += 1
+
+    def mark_down(self, error):
+        # Gagal mendapatkan koneksi: jangan dipakai sampai pemeriksaan berikutnya
+        self._mark_down(error)
+        self.checked_at = time.monotonic()
+
+    def stats(self):
+        data = dict(self._counters)
+        data.update({
+            'lag_seconds': self.lag if self.lag is not None else -1,
+            'healthy': int(self.lag is not None and self.lag <= self.max_lag),
+            'max_lag': self.max_lag,
+        })
+        return data
+
+
+class Database:
+    # Pengganti flask_mysqldb.MySQL yang memakai ConnectionPool
+    def __init__(self, app=None):
+        self.pool = None
+        self.replicas = []
+        self.slow_query_ms = None
+        self._next_replica = itertools.count()
+        self._lock = threading.Lock()
+        self._reads = {'replica': 0, 'primary_sticky': 0, 'primary_fallback': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        connect_kwargs = {
+            'host': app.config.get('MYSQL_HOST', 'localhost'),
+            'user': app.config.get('MYSQL_USER', 'root'),
+            'passwd': app.config.get('MYSQL_PASSWORD', ''),
+            'db': app.config.get('MYSQL_DB'),
+            'port': app.config.get('MYSQL_PORT', 3306),
+            'charset': app.config.get('MYSQL_CHARSET', 'utf8mb4'),
+            'connect_timeout': app.config.get('MYSQL_CONNECT_TIMEOUT', 10),
+        }
+        pool_kwargs = {
+            'min_size': app.config.get('DB_POOL_MIN_SIZE', 1),
+            'max_size': app.config.get('DB_POOL_MAX_SIZE', 10),
+            'idle_timeout': app.config.get('DB_POOL_IDLE_TIMEOUT', 300),
+            'health_check_interval': app.config.get('DB_POOL_HEALTH_CHECK_INTERVAL', 30),
+            'acquire_timeout': app.config.get('DB_POOL_ACQUIRE_TIMEOUT', 5),
+        }
+        self.pool = ConnectionPool(connect_kwargs, **pool_kwargs)
+        # Replica memakai user / database yang sama dengan primary
+        self.replicas = [
+            Replica(
+                f'{host}:{port}',
+                ConnectionPool(dict(connect_kwargs, host=host, port=port), **pool_kwargs),
+                max_lag=app.config.get('DB_REPLICA_MAX_LAG', 5),
+                check_interval=app.config.get('DB_REPLICA_LAG_CHECK_INTERVAL', 5),
+                allow_non_replica=app.config.get('MYSQL_REPLICA_ALLOW_NON_REPLICA', False),
+            )
+            for host, port in parse_hosts(app.config.get('MYSQL_REPLICAS'), connect_kwargs['port'])
+        ]
+        # Log query lambat; 0 / kosong = nonaktif
+        self.slow_query_ms = app.config.get('DB_SLOW_QUERY_MS') or None
+        app.teardown_appcontext(self._teardown)
+        app.extensions['db'] = self
+
+    @property
+    def connection(self):
+        # Koneksi milik app context saat ini (dipinjam dari pool saat pertama dipakai)
+        conn = g.get('_db_conn')
+        if conn is None:
+            conn = self.pool.acquire()
+            g._db_conn = conn
+        return conn
+
+    def _count_read(self, target):
+        with self._lock:
+            self._reads[target] += 1
+
+    def read_connection(self):
+        # Koneksi untuk query baca: replica jika ada yang sehat dan user tidak
+        # sedang "sticky" ke primary, selain itu koneksi primary.
+        if not self.replicas or g.get('_db_wrote'):
+            return self.connection
+        conn = g.get('_db_read_conn')
+        if conn is not None:
+            return conn
+        if g.get('_db_primary_only'):
+            self._count_read('primary_sticky')
+            return self.connection
+        start = next(self._next_replica)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if not replica.available():
+                continue
+            try:
+                conn = replica.pool.acquire()
+            except Exception as e:
+                replica.mark_down(e)
+                continue
+            g._db_read_conn = conn
+            g._db_read_pool = replica.pool
+            self._count_read('replica')
+            return conn
+        self._count_read('primary_fallback')
+        return self.connection
+
+    def use_primary(self):
+        # Semua bacaan di request ini ke primary (read-your-writes setelah mutasi user)
+        g._db_primary_only = True
+
+    def mark_write(self):
+        g._db_wrote = True
+
+    @property
+    def wrote(self):
+        return bool(g.get('_db_wrote'))
+
+    def commit(self):
+        self.connection.commit()
+        self.mark_write()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    @contextmanager
+    def cursor(self, cursorclass=None, read=False):
+        # read=True: boleh dilayani replica (lihat read_connection)
+        conn = self.read_connection() if read else self.connection
+        cursor = conn.cursor(cursorclass) if cursorclass else conn.cursor()
+        try:
+            yield InstrumentedCursor(cursor, self.slow_query_ms)
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    def replica_stats(self):
+        with self._lock:
+            reads = dict(self._reads)
+        return {
+            'reads': reads,
+            'replicas': {r.name: dict(r.stats(), pool=r.pool.stats()) for r in self.replicas},
+        }
+
+    def _release(self, pool, conn):
+        # Batalkan transaksi yang belum di-commit sebelum koneksi dipakai request lain
+        try:
+            conn.rollback()
+        except Exception:
+            pool.release(conn, discard=True)
+            return
+        pool.release(conn)
+
+    def _teardown(self, exc):
+        read_conn = g.pop('_db_read_conn', None)
+        if read_conn is not None:
+            self._release(g.pop('_db_read_pool'), read_conn)
+        conn = g.pop('_db_conn', None)
+        if conn is not None:
+            self._release(self.pool, conn)
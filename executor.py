@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# ---------------------------------------------------------
+# Thread pool dengan batas antrean (load shedding)
+#
+# Pekerjaan lambat (panggilan Gemini, hashing password) dijalankan di pool
+# terpisah dengan jumlah thread tetap. Jika pekerjaan yang berjalan + antre
+# sudah mencapai batas, submit() langsung menolak dengan Overloaded agar
+# request tidak menumpuk dan worker WSGI cepat dibebaskan.
+# ---------------------------------------------------------
+
+
+class Overloaded(Exception):
+    pass
+
+
+class BoundedExecutor:
+    def __init__(self, name, max_workers=4, max_queue=8, timeout=30):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = {'submitted': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0}
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self._counters[name] += delta
+
+    def _done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+            if not future.cancelled() and future.exception() is not None:
+                self._counters['errors'] += 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise Overloaded(f'{self.name}: antrean penuh')
+        with self._lock:
+            self._in_flight += 1
+            self._counters['submitted'] += 1
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        # Jalankan fn di pool dan tunggu hasilnya paling lama `timeout` detik.
+        # Saat timeout, thread tetap selesai di belakang tetapi caller sudah bebas.
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self._count('timeouts')
+            raise
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+            in_flight = self._in_flight
+        data.update({
+            'in_flight': in_flight,
+            'queued': max(0, in_flight - self.max_workers),
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+        })
+        return data
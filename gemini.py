@@ -0,0 +1,135 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from executor import Overloaded
+from metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Registry Gemini per proses
+#
+# - GenerativeModel dibuat sekali per nama model lalu dipakai ulang.
+# - Katalog model (genai.list_models) disimpan di memori bersama ETag-nya.
+#   Setelah refresh_interval lewat, data lama tetap dikirim sementara
+#   pembaruan berjalan di belakang (stale-while-revalidate).
+# ---------------------------------------------------------
+
+# google-generativeai (beserta grpc/protobuf) butuh waktu lama untuk di-import,
+# jadi baru dimuat saat pertama dibutuhkan, bukan saat worker start.
+_sdk_lock = threading.Lock()
+_sdk = None
+_sdk_loaded = False
+
+
+def load_sdk(api_key=None):
+    # Mengembalikan modul google.generativeai, atau None jika tidak terpasang
+    global _sdk, _sdk_loaded
+    if _sdk_loaded:
+        return _sdk
+    with _sdk_lock:
+        if not _sdk_loaded:
+            try:
+                import google.generativeai as genai
+            except ImportError:
+                genai = None
+            if genai is not None and api_key:
+                genai.configure(api_key=api_key)
+            _sdk = genai
+            _sdk_loaded = True
+    return _sdk
+
+
+GEMINI_SECONDS = Histogram('dietplanner_gemini_call_seconds', 'Durasi panggilan Gemini API', ['call'])
+GEMINI_ERRORS = Counter('dietplanner_gemini_errors_total', 'Panggilan Gemini API yang gagal', ['call', 'error'])
+
+
+@contextmanager
+def track_call(call):
+    # Catat latensi & error satu panggilan ke Gemini (generate, stream, list_models)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        GEMINI_ERRORS.inc(call=call, error=type(e).__name__)
+        raise
+    finally:
+        GEMINI_SECONDS.observe(time.perf_counter() - started, call=call)
+
+
+class GeminiRegistry:
+    def __init__(self, sdk, executor, refresh_interval=3600):
+        self._sdk = sdk  # callable yang mengembalikan modul google.generativeai
+        self.executor = executor
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._models = {}
+        self._catalog = None  # (models, etag, fetched_at)
+        self._refreshing = False
+
+    def get_model(self, name):
+        with self._lock:
+            model = self._models.get(name)
+            if model is None:
+                model = self._sdk().GenerativeModel(name)
+                self._models[name] = model
+            return model
+
+    def _fetch_catalog(self):
+        models = []
+        with track_call('list_models'):
+            for m in self._sdk().list_models():
+                models.append({
+                    'name': getattr(m, 'name', str(m)),
+                    'description': getattr(m, 'description', ''),
+                    'supported_methods': list(getattr(m, 'supported_generation_methods', []) or [])
+                })
+        payload = json.dumps(models, sort_keys=True).encode('utf-8')
+        return models, hashlib.sha1(payload).hexdigest()
+
+    def _store_catalog(self, models, etag):
+        with self._lock:
+            self._catalog = (models, etag, time.monotonic())
+
+    def _revalidate(self):
+        try:
+            self._store_catalog(*self._fetch_catalog())
+        except Exception as e:
+            logger.warning('Gagal memperbarui katalog model Gemini: %s', e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _revalidate_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        try:
+            self.executor.submit(self._revalidate)
+        except Overloaded:
+            # Pool sedang penuh; coba lagi pada request berikutnya
+            with self._lock:
+                self._refreshing = False
+
+    def list_models(self):
+        # Mengembalikan (models, etag). Hanya request pertama yang menunggu jaringan.
+        with self._lock:
+            catalog = self._catalog
+        if catalog is None:
+            models, etag = self.executor.run(self._fetch_catalog)
+            self._store_catalog(models, etag)
+            return models, etag
+        models, etag, fetched_at = catalog
+        if time.monotonic() - fetched_at >= self.refresh_interval:
+            self._revalidate_in_background()
+        return models, etag
+
+    def reset(self):
+        with self._lock:
+            self._models.clear()
+            self._catalog = None
@@ -0,0 +1,190 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+
+# ---------------------------------------------------------
+# Generator menu mingguan dari food_catalog
+#
+# Setiap hari terdiri dari komponen tetap (mis. sarapan = pokok + protein +
+# minuman). Untuk setiap komponen dipilih satu makanan dan porsinya sehingga
+# total kalori sedekat mungkin dengan goal_calories dan protein mencapai
+# goal_protein. Ini multiple-choice knapsack: DP atas kalori (per 10 kcal)
+# yang menyimpan protein terbaik untuk setiap total kalori, sehingga setiap
+# sub-masalah (komponen ke-i, total kalori c) hanya dihitung sekali.
+#
+# Variasi: kandidat tiap kategori diacak per user per minggu dan dibagi antar
+# komponen (tidak ada makanan yang sama dua kali dalam sehari), makanan hari
+# sebelumnya dilewati, dan satu makanan paling banyak MAX_WEEKLY_USES kali.
+# ---------------------------------------------------------
+
+MEAL_SLOTS = (
+    ('sarapan', 'Sarapan', ('pokok', 'protein', 'minuman')),
+    ('makan_siang', 'Makan Siang', ('pokok', 'protein', 'sayur', 'buah')),
+    ('makan_malam', 'Makan Malam', ('pokok', 'lauk kuah', 'sayur')),
+    ('camilan', 'Camilan', ('camilan',)),
+)
+
+# Kelipatan takaran saji yang boleh dipilih per kategori
+PORTIONS = {
+    'pokok': (0.5, 1, 1.5, 2),
+    'protein': (1, 1.5, 2),
+    'lauk kuah': (1, 1.5),
+    'sayur': (1, 1.5),
+    'buah': (1,),
+    'minuman': (1,),
+    'camilan': (1,),
+}
+
+PLAN_DAYS = 7
+CALORIE_STEP = 10
+CALORIE_TOLERANCE = 0.15      # total kalori maksimum = target + 15%
+CANDIDATES_PER_COMPONENT = 8
+MAX_WEEKLY_USES = 2
+PROTEIN_WEIGHT = 1.0          # bobot kekurangan protein relatif terhadap selisih kalori
+PROTEIN_ENERGY_SHARE = 0.2    # fallback target protein: 20% energi (4 kcal per gram)
+
+
+def default_protein(goal_calories):
+    return round(goal_calories * PROTEIN_ENERGY_SHARE / 4, 1)
+
+
+def week_start(day=None):
+    day = day or date.today()
+    return day - timedelta(days=day.weekday())
+
+
+class MealPlanner:
+    def __init__(self, foods):
+        # foods: dict dengan id, name, category, serving, calories, protein (mis. FoodIndex.all_items())
+        self.pools = {}
+        for food in foods:
+            category = food.get('category')
+            if category in PORTIONS and (food.get('calories') or 0) > 0:
+                self.pools.setdefault(category, []).append({
+                    'id': food['id'],
+                    'name': food['name'],
+                    'category': category,
+                    'serving': food.get('serving'),
+                    'calories': int(food['calories']),
+                    'protein': float(food.get('protein') or 0),
+                })
+        for pool in self.pools.values():
+            pool.sort(key=lambda f: f['id'])
+
+    def __len__(self):
+        return sum(len(pool) for pool in self.pools.values())
+
+    def components(self):
+        # (slot, kategori) untuk satu hari; kategori tanpa makanan dilewati
+        return [(slot, category) for slot, _, categories in MEAL_SLOTS
+                for category in categories if self.pools.get(category)]
+
+    def _candidates(self, components, rng, uses, yesterday):
+        # Bagi makanan tiap kategori ke komponen-komponennya (disjoint dalam sehari)
+        needed = {}
+        for index, (_, category) in enumerate(components):
+            needed.setdefault(category, []).append(index)
+        candidates = [None] * len(components)
+        for category, indexes in needed.items():
+            pool = self.pools[category]
+            eligible = [f for f in pool if uses.get(f['id'], 0) < MAX_WEEKLY_USES and f['id'] not in yesterday]
+            if len(eligible) < len(indexes):
+                # Katalog kecil: longgarkan batas variasi mingguan
+                eligible = sorted(pool, key=lambda f: uses.get(f['id'], 0))
+            eligible = list(eligible)
+            rng.shuffle(eligible)
+            for n, index in enumerate(indexes):
+                share = eligible[n::len(indexes)] or eligible
+                candidates[index] = share[:CANDIDATES_PER_COMPONENT]
+        return candidates
+
+    def solve_day(self, candidates, goal_calories, goal_protein):
+        # DP multiple-choice knapsack. best[c] = protein terbaik (dipotong di goal_protein,
+        # kelebihan protein tidak dikejar) dengan total c * CALORIE_STEP kcal
+        target = max(1, round(goal_calories / CALORIE_STEP))
+        limit = int(target * (1 + CALORIE_TOLERANCE))
+        best = np.full(limit + 1, -np.inf)
+        best[0] = 0.0
+        options, picks = [], []
+        for foods in candidates:
+            component_options = [
+                (food, portion, round(food['calories'] * portion / CALORIE_STEP), food['protein'] * portion)
+                for food in foods for portion in PORTIONS[food['category']]
+            ]
+            new = np.full(limit + 1, -np.inf)
+            pick = np.full(limit + 1, -1, dtype=np.int32)
+            for j, (_, _, units, protein) in enumerate(component_options):
+                if units > limit:
+                    continue
+                candidate = best[:limit + 1 - units] + protein
+                better = candidate > new[units:]
+                new[units:][better] = candidate[better]
+                pick[units:][better] = j
+            best = np.minimum(new, goal_protein)
+            options.append(component_options)
+            picks.append(pick)
+
+        reachable = np.isfinite(best)
+        if not reachable.any():
+            return None
+        totals = np.arange(limit + 1)
+        protein_gap = np.maximum(0.0, goal_protein - best) / max(goal_protein, 1.0)
+        cost = np.abs(totals - target) / target + PROTEIN_WEIGHT * protein_gap
+        cost[~reachable] = np.inf
+        c = int(np.argmin(cost))
+
+        chosen = [None] * len(options)
+        for i in range(len(options) - 1, -1, -1):
+            food, portion, units, _ = options[i][picks[i][c]]
+            chosen[i] = (food, portion)
+            c -= units
+        return chosen
+
+    def plan_week(self, goal_calories, goal_protein=None, seed=None, start=None, days=PLAN_DAYS):
+        # Menu `days` hari mulai `start` (default: Senin minggu ini). seed sama -> menu sama
+        components = self.components()
+        if not components or not goal_calories or goal_calories <= 0:
+            return None
+        goal_protein = float(goal_protein) if goal_protein else default_protein(goal_calories)
+        start = start or week_start()
+        rng = random.Random(f'{seed}:{start.isoformat()}')
+        labels = {slot: label for slot, label, _ in MEAL_SLOTS}
+
+        uses, yesterday, plan_days = {}, set(), []
+        for offset in range(days):
+            candidates = self._candidates(components, rng, uses, yesterday)
+            chosen = self.solve_day(candidates, goal_calories, goal_protein)
+            if chosen is None:
+                return None
+            meals, total_calories, total_protein = {}, 0, 0.0
+            for (slot, _), (food, portion) in zip(components, chosen):
+                calories = round(food['calories'] * portion)
+                protein = round(food['protein'] * portion, 1)
+                meals.setdefault(slot, []).append({
+                    'id': food['id'],
+                    'name': food['name'],
+                    'serving': food['serving'],
+                    'portion': portion,
+                    'calories': calories,
+                    'protein': protein,
+                })
+                total_calories += calories
+                total_protein += protein
+                uses[food['id']] = uses.get(food['id'], 0) + 1
+            yesterday = {food['id'] for food, _ in chosen}
+            plan_days.append({
+                'date': (start + timedelta(days=offset)).isoformat(),
+                'calories': total_calories,
+                'protein': round(total_protein, 1),
+                'meals': [{'slot': slot, 'label': labels[slot], 'items': items} for slot, items in meals.items()],
+            })
+
+        return {
+            'week_start': start.isoformat(),
+            'goal_calories': int(goal_calories),
+            'goal_protein': round(goal_protein, 1),
+            'avg_calories': round(sum(d['calories'] for d in plan_days) / len(plan_days)),
+            'avg_protein': round(sum(d['protein'] for d in plan_days) / len(plan_days), 1),
+            'days': plan_days,
+        }
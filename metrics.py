@@ -0,0 +1,143 @@
+import bisect
+import threading
+
+# ---------------------------------------------------------
+# Metrik sederhana dalam format teks Prometheus
+#
+# Histogram & Counter disimpan di memori per proses worker dan didaftarkan
+# ke REGISTRY saat dibuat. Statistik yang sudah ada (pool, cache, executor)
+# ditambahkan lewat collector yang dipanggil saat /metrics di-scrape.
+# ---------------------------------------------------------
+
+# Detik; cukup rapat di bawah 100 ms untuk query DB, sampai 30 s untuk Gemini
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        # collector() -> iterable (name, type, help, [(labels, value), ...])
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        families = [m.collect() for m in metrics]
+        for collector in collectors:
+            families.extend(collector())
+        for name, kind, help_text, samples in families:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for sample_name, labels, value in samples:
+                lines.append(f'{sample_name}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        if registry is not None:
+            registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        samples = [(self.name, list(zip(self.labelnames, key)), value) for key, value in values]
+        return self.name, 'counter', self.help_text, samples
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values = {}  # label values -> [counts per bucket..., sum, count]
+        if registry is not None:
+            registry.register(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def collect(self):
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        samples = []
+        for key, state in values:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', labels + [('le', format_value(float(bound)))], cumulative))
+            samples.append((f'{self.name}_bucket', labels + [('le', '+Inf')], state[-1]))
+            samples.append((f'{self.name}_sum', labels, state[-2]))
+            samples.append((f'{self.name}_count', labels, state[-1]))
+        return self.name, 'histogram', self.help_text, samples
+
+
+def stats_collector(prefix, label, sources, help_text=''):
+    # Ubah dict stats() (pool, cache, executor) menjadi metrik per kunci:
+    # {'gemini': {'rejected': 3}} -> dietplanner_executor_rejected{executor="gemini"} 3
+    def collect():
+        families = {}
+        for source_name, stats in sources().items():
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f'{prefix}_{key}'
+                families.setdefault(name, []).append((name, [(label, source_name)], value))
+        return [(name, 'gauge', help_text or name, samples) for name, samples in sorted(families.items())]
+    return collect
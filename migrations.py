@@ -0,0 +1,241 @@
+import logging
+import os
+
+from catalog import read_catalog_csv, upsert_catalog_rows
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Migrasi skema berversi
+#
+# Dijalankan sekali per deploy lewat `flask --app app migrate`. Versi yang
+# sudah diterapkan dicatat di schema_migrations; saat start, aplikasi hanya
+# membandingkan versi tersebut dengan SCHEMA_VERSION (tanpa DDL).
+#
+# Setiap migrasi berisi daftar langkah: string SQL, atau fungsi(cursor)
+# untuk langkah yang perlu memeriksa kondisi database terlebih dulu.
+# Semua langkah aman diulang pada database lama yang tabelnya dibuat oleh
+# bootstrap sebelum ada migrasi.
+# ---------------------------------------------------------
+
+MIGRATION_LOCK = 'dietplanner_schema_migrate'
+MIGRATION_LOCK_TIMEOUT = 60
+
+BUNDLED_FOODS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'foods.csv')
+
+
+def add_index_if_missing(table, name, columns):
+    def step(cursor):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+            (table, name)
+        )
+        if not cursor.fetchone():
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX {name} {columns}")
+    return step
+
+
+def add_column_if_missing(table, name, definition):
+    def step(cursor):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s LIMIT 1",
+            (table, name)
+        )
+        if not cursor.fetchone():
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+    return step
+
+
+def backfill_food_log_daily(cursor):
+    # Isi awal dari food_log yang sudah ada (hanya jika ringkasan masih kosong)
+    cursor.execute("SELECT 1 FROM food_log_daily LIMIT 1")
+    if cursor.fetchone():
+        return
+    cursor.execute(
+        """
+        INSERT INTO food_log_daily (user_id, log_date, total_calories, entry_count)
+        SELECT user_id, log_date, COALESCE(SUM(calories), 0), COUNT(*)
+        FROM food_log
+        WHERE log_date IS NOT NULL
+        GROUP BY user_id, log_date
+        """
+    )
+
+
+def seed_food_catalog(cursor):
+    # Katalog bawaan (data/foods.csv); katalog yang lebih besar dimuat lewat `flask import-foods`
+    cursor.execute("SELECT 1 FROM food_catalog LIMIT 1")
+    if cursor.fetchone() or not os.path.exists(BUNDLED_FOODS_CSV):
+        return
+    upsert_catalog_rows(cursor, read_catalog_csv(BUNDLED_FOODS_CSV))
+
+
+MIGRATIONS = [
+    (1, 'create users', [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            fullname VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL UNIQUE,
+            username VARCHAR(100) NOT NULL UNIQUE,
+            password_hash VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB
+        """,
+    ]),
+    (2, 'create progress_history', [
+        """
+        CREATE TABLE IF NOT EXISTS progress_history (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            bmi FLOAT,
+            daily_calories INT,
+            goal_key VARCHAR(32),
+            goal_calories INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB
+        """,
+    ]),
+    (3, 'create food_log', [
+        """
+        CREATE TABLE IF NOT EXISTS food_log (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            food_name VARCHAR(100),
+            calories INT,
+            log_date DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB
+        """,
+    ]),
+    (4, 'composite indexes for history / food_log pagination', [
+        add_index_if_missing('progress_history', 'idx_progress_user_created', '(user_id, created_at)'),
+        add_index_if_missing('food_log', 'idx_foodlog_user_date', '(user_id, log_date, id)'),
+    ]),
+    (5, 'create food_log_daily summary', [
+        """
+        CREATE TABLE IF NOT EXISTS food_log_daily (
+            user_id INT NOT NULL,
+            log_date DATE NOT NULL,
+            total_calories INT NOT NULL DEFAULT 0,
+            entry_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, log_date),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB
+        """,
+        backfill_food_log_daily,
+    ]),
+    (6, 'create food_catalog', [
+        """
+        CREATE TABLE IF NOT EXISTS food_catalog (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL UNIQUE,
+            category VARCHAR(32),
+            serving VARCHAR(32),
+            calories INT NOT NULL,
+            protein FLOAT,
+            carbs FLOAT,
+            fat FLOAT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_food_catalog_updated (updated_at)
+        ) ENGINE=InnoDB
+        """,
+        seed_food_catalog,
+    ]),
+    (7, 'progress_history.progress_percent generated column', [
+        # Seberapa dekat daily_calories dengan goal_calories (0-100), dihitung MySQL saat INSERT/UPDATE
+        add_column_if_missing(
+            'progress_history', 'progress_percent',
+            "TINYINT UNSIGNED AS (CASE WHEN goal_calories > 0 AND daily_calories > 0 "
+            "THEN FLOOR(100 * LEAST(daily_calories, goal_calories) / GREATEST(daily_calories, goal_calories)) "
+            "END) STORED"
+        ),
+    ]),
+    (8, 'progress_history.goal_protein column', [
+        add_column_if_missing('progress_history', 'goal_protein', 'FLOAT NULL AFTER goal_calories'),
+    ]),
+    (9, 'create meal_plans', [
+        # Menu mingguan hasil mealplan.py (JSON), satu baris per user per minggu
+        """
+        CREATE TABLE IF NOT EXISTS meal_plans (
+            user_id INT NOT NULL,
+            week_start DATE NOT NULL,
+            goal_calories INT NOT NULL,
+            goal_protein FLOAT,
+            plan JSON NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, week_start),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB
+        """,
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def ensure_migrations_table(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB
+        """
+    )
+
+
+def applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def current_version(cursor):
+    # Hanya membaca; dipakai saat start untuk memastikan skema sudah dimigrasi
+    cursor.execute("SELECT MAX(version) FROM schema_migrations")
+    row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else 0
+
+
+def migrate(connection, target=None):
+    # Terapkan migrasi yang belum tercatat, berurutan. Mengembalikan daftar versi
+    # yang baru diterapkan. GET_LOCK mencegah dua proses deploy berjalan bersamaan.
+    target = SCHEMA_VERSION if target is None else target
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+        if not cursor.fetchone()[0]:
+            raise RuntimeError('Migrasi lain sedang berjalan')
+        try:
+            ensure_migrations_table(cursor)
+            done = applied_versions(cursor)
+            applied = []
+            for version, description, steps in MIGRATIONS:
+                if version in done or version > target:
+                    continue
+                logger.info('Menerapkan migrasi %s: %s', version, description)
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                connection.commit()
+                applied.append(version)
+            return applied
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchone()
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
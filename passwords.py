@@ -0,0 +1,46 @@
+import threading
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# ---------------------------------------------------------
+# Kebijakan hashing password
+#
+# Metode & parameter diambil dari konfigurasi (format werkzeug, mis.
+# "scrypt:32768:8:1" atau "pbkdf2:sha256:600000"). Hash dihitung di
+# BoundedExecutor agar lonjakan login tidak menghabiskan semua worker.
+# Hash lama yang parameternya berbeda di-upgrade saat login berhasil.
+# ---------------------------------------------------------
+
+
+class PasswordHasher:
+    def __init__(self, executor, method='scrypt', salt_length=16):
+        self.executor = executor
+        self.method = method
+        self.salt_length = salt_length
+        self._lock = threading.Lock()
+        self._method_prefix = None
+
+    @property
+    def method_prefix(self):
+        # Bentuk lengkap metode seperti yang tertulis di hash, mis. "scrypt:32768:8:1"
+        with self._lock:
+            if self._method_prefix is None:
+                sample = generate_password_hash('x', method=self.method, salt_length=1)
+                self._method_prefix = sample.split('$', 1)[0]
+            return self._method_prefix
+
+    def _hash(self, password):
+        return generate_password_hash(password, method=self.method, salt_length=self.salt_length)
+
+    def hash(self, password):
+        return self.executor.run(self._hash, password)
+
+    def verify(self, pwhash, password):
+        return self.executor.run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        parts = (pwhash or '').split('$')
+        if len(parts) != 3:
+            return True
+        method, salt, _ = parts
+        return method != self.method_prefix or len(salt) != self.salt_length
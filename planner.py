@@ -0,0 +1,294 @@
+import numpy as np
+
+# ---------------------------------------------------------
+# Planning engine (BMI / BMR / kalori / protein)
+#
+# Semua fungsi di sini murni (tanpa Flask / DB) dan bekerja pada array,
+# sehingga satu baris form di dietplanner() dan ratusan ribu baris dalam
+# satu batch memakai rumus yang sama persis.
+# ---------------------------------------------------------
+
+# Batas bawah tiap status BMI (np.digitize, right=False -> lower <= bmi < upper)
+BMI_BINS = np.array([16, 18.5, 22, 25, 27, 30])
+BMI_STATUSES = np.array([
+    "Sangat Kurus",
+    "Kurus",
+    "Normal",
+    "Ideal",
+    "Gemuk",
+    "Sangat Gemuk",
+    "Obesitas",
+], dtype=object)
+
+# Selisih kalori target terhadap kalori harian per status BMI.
+# Gemuk / Sangat Gemuk tidak mendapat penyesuaian (sama seperti logika lama).
+DEPOSIT_OFFSETS = np.array([400, 400, 0, 0, 0, 0, -400])
+
+SYSTEM_RECOMMENDATIONS = np.array([
+    "Kekurangan gizi. Direkomendasikan menaikkan berat badan dengan asupan kalori lebih tinggi dan latihan penguatan otot.",
+    "Kekurangan gizi. Direkomendasikan menaikkan berat badan dengan asupan kalori lebih tinggi dan latihan penguatan otot.",
+    "Berat badan dalam kisaran normal. Untuk mempertahankan berat badan, "
+    "pertahankan asupan kalori seimbang, porsi terkontrol, dan olahraga teratur.",
+    "Berat badan dalam kisaran normal. Untuk mempertahankan berat badan, "
+    "pertahankan asupan kalori seimbang, porsi terkontrol, dan olahraga teratur.",
+    "Perlu konsultasi lebih detail dengan profesional kesehatan.",
+    "Perlu konsultasi lebih detail dengan profesional kesehatan.",
+    "Kelebihan berat badan. Direkomendasikan program diet seimbang dan peningkatan aktivitas fisik.",
+], dtype=object)
+
+FOOD_UNDERWEIGHT = "Susu, telur, daging, roti gandum, selai kacang, alpukat, pisang"
+FOOD_OVERWEIGHT = "Sayur, ikan, dada ayam, oatmeal, apel, almond, yogurt low-fat"
+FOOD_BALANCED = "Menjaga porsi seimbang: karbohidrat, protein, serat, vitamin"
+FOODS = np.array([
+    FOOD_UNDERWEIGHT,
+    FOOD_UNDERWEIGHT,
+    FOOD_BALANCED,
+    FOOD_BALANCED,
+    FOOD_BALANCED,
+    FOOD_BALANCED,
+    FOOD_OVERWEIGHT,
+], dtype=object)
+
+ACTIVITY_FACTORS = {
+    'sedentary': 1.2,
+    'light': 1.375,
+    'moderate': 1.55,
+    'active': 1.725,
+    'very_active': 1.9
+}
+DEFAULT_ACTIVITY_FACTOR = 1.2
+
+EXERCISE_MAP = {
+    'None': 'Tidak Pernah Olahraga',
+    'sedentary': 'Jalan kaki ringan, stretching',
+    'light': 'Jogging, yoga, bersepeda santai',
+    'moderate': 'Renang, gym, aerobik',
+    'active': 'HIIT, lari, olahraga tim',
+    'very_active': 'Crossfit, olahraga kompetitif'
+}
+DEFAULT_EXERCISE = 'Jalan kaki ringan'
+
+PROTEIN_PER_KG = 1.5
+
+# Rentang fisik yang masuk akal (inklusif). Di luar ini rumus menghasilkan
+# BMI tak hingga / kalori yang meluap int64 dan tidak muat di progress_history.
+WEIGHT_RANGE = (1, 500)   # kg
+HEIGHT_RANGE = (50, 300)  # cm
+AGE_RANGE = (1, 150)      # tahun
+RANGE_ERROR = (
+    f'Berat harus {WEIGHT_RANGE[0]}-{WEIGHT_RANGE[1]} kg, tinggi {HEIGHT_RANGE[0]}-{HEIGHT_RANGE[1]} cm, '
+    f'dan umur {AGE_RANGE[0]}-{AGE_RANGE[1]} tahun'
+)
+
+# Match form option values: 'gain_weight', 'maintain_weight', 'lose_weight'
+GAIN_GOALS = ('gain_weight', 'gain')
+MAINTAIN_GOALS = ('maintain_weight', 'maintain')
+LOSE_GOALS = ('lose_weight', 'loss')
+
+# Label goal_key (progress_history) untuk tampilan
+GOAL_LABELS = {
+    'gain': 'Menaikkan',
+    'maintain': 'Mempertahankan',
+    'lose': 'Menurunkan',
+}
+
+
+def goal_label(goal_key):
+    return GOAL_LABELS.get(goal_key, goal_key or '')
+
+
+GOAL_DETAILS = {
+    'gain': {
+        'calorie_offset': 300,
+        'protein_per_kg': 1.8,
+        'food': "Kalori tinggi sehat: daging, susu penuh lemak, kacang-kacangan, alpukat, pisang, nasi merah.",
+        'exercise': "Latihan angkat beban 3–4x/minggu dan fokus pada progresif overload.",
+    },
+    'maintain': {
+        'calorie_offset': 0,
+        'protein_per_kg': PROTEIN_PER_KG,
+        'food': "Porsi seimbang: protein sedang, karbohidrat kompleks, banyak sayur dan buah, batasi gula olahan.",
+        'exercise': "Olahraga teratur 3–5x/minggu (kombinasi cardio & kekuatan).",
+    },
+    'lose': {
+        'calorie_offset': -300,
+        'protein_per_kg': 1.2,
+        'food': "Defisit kalori: dada ayam, ikan, brokoli, oatmeal, apel, yogurt rendah lemak.",
+        'exercise': "Cardio + latihan kekuatan 4–5x/minggu dengan defisit kalori moderat.",
+    },
+}
+
+
+def round_like_python(values, ndigits=1):
+    # np.round membulatkan x * 10**n di float (half-to-even), sedangkan round()
+    # bawaan Python membulatkan nilai desimal persisnya. Hasilnya berbeda di
+    # sekitar angka .x5, jadi elemen yang hampir "tie" dibulatkan ulang dengan
+    # round() agar hasil batch identik dengan perhitungan per baris yang lama.
+    values = np.asarray(values, dtype=float)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    rounded = np.round(scaled) / scale
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded = rounded.copy()
+        rounded[near_tie] = [round(float(v), ndigits) for v in values[near_tie]]
+    return rounded
+
+
+def _as_str_array(values, n):
+    # None / angka ikut diubah ke str agar perbandingan array tetap vektor
+    if values is None or isinstance(values, str):
+        values = [values] * n
+    return np.asarray(values, dtype=object).astype(str)
+
+
+def valid_mask(weight, height, age):
+    # Baris yang boleh dihitung (sama dengan validasi form dietplanner)
+    weight = np.asarray(weight, dtype=float)
+    height = np.asarray(height, dtype=float)
+    age = np.asarray(age, dtype=float)
+    # Perbandingan dengan NaN selalu False, jadi NaN / inf ikut tertolak
+    return (
+        (weight >= WEIGHT_RANGE[0]) & (weight <= WEIGHT_RANGE[1])
+        & (height >= HEIGHT_RANGE[0]) & (height <= HEIGHT_RANGE[1])
+        & (age >= AGE_RANGE[0]) & (age <= AGE_RANGE[1])
+    )
+
+
+def compute_plans(weight, height, age, gender, activity, goal=None):
+    # Hitung rencana untuk banyak baris sekaligus.
+    # Mengembalikan dict berisi array numpy dengan panjang yang sama dengan input.
+    weight = np.atleast_1d(np.asarray(weight, dtype=float))
+    height = np.atleast_1d(np.asarray(height, dtype=float))
+    age = np.atleast_1d(np.asarray(age, dtype=float))
+    n = weight.shape[0]
+    gender = _as_str_array(gender, n)
+    activity = _as_str_array(activity, n)
+    goal = _as_str_array(goal, n)
+
+    # BMI + status
+    height_m = height / 100
+    bmi = round_like_python(weight / (height_m * height_m))
+    status_idx = np.digitize(bmi, BMI_BINS)
+
+    # BMR (Harris-Benedict)
+    is_male = gender == 'male'
+    bmr = np.where(
+        is_male,
+        88.362 + (13.397 * weight) + (4.799 * height) - (5.677 * age),
+        447.593 + (9.247 * weight) + (3.098 * height) - (4.330 * age),
+    )
+
+    factor = np.full(n, DEFAULT_ACTIVITY_FACTOR)
+    for name, value in ACTIVITY_FACTORS.items():
+        factor[activity == name] = value
+    daily_calories = np.trunc(bmr * factor).astype(np.int64)
+    deposit_calories = daily_calories + DEPOSIT_OFFSETS[status_idx]
+
+    protein = round_like_python(weight * PROTEIN_PER_KG)
+
+    is_gain = np.isin(goal, GAIN_GOALS)
+    is_maintain = np.isin(goal, MAINTAIN_GOALS)
+    is_lose = np.isin(goal, LOSE_GOALS)
+
+    calorie_offset = np.select(
+        [is_gain, is_lose],
+        [GOAL_DETAILS['gain']['calorie_offset'], GOAL_DETAILS['lose']['calorie_offset']],
+        0,
+    )
+    goal_calories = deposit_calories + calorie_offset
+    goal_protein = np.select(
+        [is_gain, is_lose],
+        [
+            round_like_python(weight * GOAL_DETAILS['gain']['protein_per_kg']),
+            round_like_python(weight * GOAL_DETAILS['lose']['protein_per_kg']),
+        ],
+        protein,
+    )
+    # Goal yang tidak dikenali tetap diberi key 'lose' untuk templating
+    goal_key = np.where(is_gain, 'gain', np.where(is_maintain, 'maintain', 'lose')).astype(object)
+
+    return {
+        'bmi': bmi,
+        'bmi_status': BMI_STATUSES[status_idx],
+        'status_idx': status_idx,
+        'daily_calories': daily_calories,
+        'deposit_calories': deposit_calories,
+        'protein': protein,
+        'goal_calories': goal_calories,
+        'goal_protein': goal_protein,
+        'goal_key': goal_key,
+        'goal_selected': is_gain | is_maintain | is_lose,
+    }
+
+
+def compute_plan(weight, height, age, gender, activity, goal=None):
+    # Versi satu baris untuk dietplanner(): hasil numerik dari compute_plans()
+    # plus teks rekomendasi yang ditampilkan di template.
+    plans = compute_plans([weight], [height], [age], [gender], [activity], [goal])
+    idx = int(plans['status_idx'][0])
+    goal_key = plans['goal_key'][0]
+
+    food = FOODS[idx]
+    exercise = EXERCISE_MAP.get(activity, DEFAULT_EXERCISE)
+    if plans['goal_selected'][0]:
+        goal_food = GOAL_DETAILS[goal_key]['food']
+        goal_exercise = GOAL_DETAILS[goal_key]['exercise']
+    else:
+        goal_food = food
+        goal_exercise = exercise
+
+    return {
+        'bmi': float(plans['bmi'][0]),
+        'bmi_status': plans['bmi_status'][0],
+        'system_recommendation': SYSTEM_RECOMMENDATIONS[idx],
+        'daily_calories': int(plans['daily_calories'][0]),
+        'deposit_calories': int(plans['deposit_calories'][0]),
+        'exercise': exercise,
+        'food': food,
+        'protein': float(plans['protein'][0]),
+        'goal_calories': int(plans['goal_calories'][0]),
+        'goal_food': goal_food,
+        'goal_exercise': goal_exercise,
+        'goal_protein': float(plans['goal_protein'][0]),
+        'goal_key': goal_key,
+    }
+
+
+# Kolom hasil yang dikirim ke klien batch / disimpan ke progress_history
+PLAN_FIELDS = (
+    'bmi',
+    'bmi_status',
+    'daily_calories',
+    'deposit_calories',
+    'goal_calories',
+    'protein',
+    'goal_protein',
+    'goal_key',
+)
+
+
+def plan_rows(weight, height, age, gender, activity, goal=None):
+    # compute_plans() untuk satu chunk, dikembalikan sebagai list of dict berisi
+    # tipe Python biasa (siap di-JSON-kan). Baris yang tidak valid bernilai None.
+    weight = np.asarray(weight, dtype=float)
+    height = np.asarray(height, dtype=float)
+    age = np.asarray(age, dtype=float)
+    n = weight.shape[0]
+    gender = _as_str_array(gender, n)
+    activity = _as_str_array(activity, n)
+    goal = _as_str_array(goal, n)
+
+    rows = [None] * n
+    valid = valid_mask(weight, height, age)
+    if not valid.any():
+        return rows
+
+    plans = compute_plans(
+        weight[valid], height[valid], age[valid],
+        gender[valid], activity[valid], goal[valid],
+    )
+    columns = [plans[field].tolist() for field in PLAN_FIELDS]
+    for values, i in zip(zip(*columns), np.flatnonzero(valid).tolist()):
+        rows[i] = dict(zip(PLAN_FIELDS, values))
+    return rows
@@ -0,0 +1,219 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, session
+from werkzeug.exceptions import TooManyRequests
+
+from metrics import Counter
+
+# Redis opsional: bucket dibagi semua worker jika RATE_LIMIT_URL / CACHE_URL diisi
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Rate limiting token bucket per route
+#
+# Setiap route punya bucket per user (session id) dan per IP. Bucket terisi
+# `rate` token per detik sampai `burst`; setiap request memakai satu token.
+# Jika kosong, request ditolak 429 dengan Retry-After = waktu sampai token
+# berikutnya tersedia, dan token yang sudah diambil dari bucket lain untuk
+# request yang sama dikembalikan. Batas bawaan dapat diubah lewat
+# environment, mis. RATE_LIMIT_CHATBOT_USER=20/minute atau
+# RATE_LIMIT_CHATBOT_IP=off.
+#
+# Batas per IP memakai request.remote_addr. Di belakang reverse proxy isi
+# TRUSTED_PROXY_HOPS (jumlah proxy, lihat create_app) agar alamat client
+# diambil dari X-Forwarded-For; tanpa itu semua client berbagi alamat proxy
+# dan satu client dapat menghabiskan bucket login / signup untuk semua orang.
+# ---------------------------------------------------------
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+RATE_LIMIT_REQUESTS = Counter(
+    'dietplanner_ratelimit_requests_total', 'Keputusan rate limiter per route', ['route', 'scope', 'result'])
+
+
+def parse_rule(rule):
+    # "10/minute" -> (rate per detik, burst); "10/minute;burst=3"; "off" / "0" -> None
+    if not rule or rule.strip().lower() in ('off', '0', 'none'):
+        return None
+    spec, _, extra = rule.partition(';')
+    count, _, period = spec.strip().partition('/')
+    count = float(count)
+    seconds = PERIODS[(period.strip() or 'minute').rstrip('s')]
+    burst = count
+    if extra.strip().startswith('burst='):
+        burst = float(extra.strip()[len('burst='):])
+    return count / seconds, max(1.0, burst)
+
+
+class MemoryBuckets:
+    # Bucket in-process (per worker); bucket lama dibuang LRU agar memori terbatas
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1.0):
+        # Mengembalikan (diizinkan, detik sampai token cukup)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens = min(burst, tokens - cost)  # cost negatif = refund
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def refund(self, key, rate, burst, cost=1.0):
+        self.take(key, rate, burst, -cost)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'buckets': len(self._buckets), 'maxsize': self.maxsize}
+
+
+# Dijalankan atomik di Redis: KEYS[1]=bucket, ARGV=rate, burst, now, cost
+TOKEN_BUCKET_LUA = """
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+  tokens = math.min(burst, tokens - cost)
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBuckets:
+    def __init__(self, client, prefix='dietplanner:ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(TOKEN_BUCKET_LUA)
+        self._lock = threading.Lock()
+        self.errors = 0
+
+    def take(self, key, rate, burst, cost=1.0):
+        try:
+            allowed, tokens = self._script(keys=[self.prefix + key], args=[rate, burst, time.time(), cost])
+        except Exception as e:
+            # Redis bermasalah: jangan blokir user (fail open), cukup dicatat
+            logger.warning('Rate limiter Redis gagal: %s', e)
+            with self._lock:
+                self.errors += 1
+            return True, 0.0
+        tokens = float(tokens)
+        return bool(allowed), 0.0 if allowed else (cost - tokens) / rate
+
+    def refund(self, key, rate, burst, cost=1.0):
+        self.take(key, rate, burst, -cost)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'redis', 'errors': self.errors}
+
+
+class RateLimiter:
+    def __init__(self, backend, enabled=True, env=None, trust_proxy=False):
+        self.backend = backend
+        self.enabled = enabled
+        self.env = env or {}
+        self.trust_proxy = trust_proxy
+        self._proxy_warned = False
+        self.rules = {}  # nama route -> {'user': (rate, burst), 'ip': (rate, burst)}
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def _rule(self, name, scope, default):
+        return parse_rule(self.env.get(f'RATE_LIMIT_{name.upper()}_{scope.upper()}', default))
+
+    def _count(self, name, scope, result):
+        RATE_LIMIT_REQUESTS.inc(route=name, scope=scope, result=result)
+        with self._lock:
+            key = f'{name}_{result}'
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def check(self, name):
+        # Raise TooManyRequests (Retry-After terisi) jika salah satu bucket habis
+        rules = self.rules.get(name, {})
+        user_id = session.get('id') if session.get('loggedin') else None
+        keys = []
+        if rules.get('user') and user_id is not None:
+            keys.append(('user', f'{name}:user:{user_id}', rules['user']))
+        if rules.get('ip'):
+            if not self.trust_proxy and not self._proxy_warned and 'X-Forwarded-For' in request.headers:
+                self._proxy_warned = True
+                logger.warning('Request melalui proxy (X-Forwarded-For) tetapi TRUSTED_PROXY_HOPS belum diisi; '
+                               'batas per IP berlaku untuk alamat proxy')
+            keys.append(('ip', f'{name}:ip:{request.remote_addr}', rules['ip']))
+        taken = []
+        for scope, key, (rate, burst) in keys:
+            allowed, retry_after = self.backend.take(key, rate, burst)
+            if not allowed:
+                # Request ditolak tidak boleh menghabiskan bucket lain, mis. jatah
+                # user di belakang NAT yang bucket IP-nya sudah habis
+                for taken_key, taken_rate, taken_burst in taken:
+                    self.backend.refund(taken_key, taken_rate, taken_burst)
+                self._count(name, scope, 'limited')
+                raise TooManyRequests(
+                    'Terlalu banyak permintaan. Coba lagi sebentar.',
+                    retry_after=max(1, math.ceil(retry_after)),
+                )
+            taken.append((key, rate, burst))
+        self._count(name, 'all', 'allowed')
+
+    def limit(self, name, user=None, ip=None, methods=None):
+        # Dekorator route; `methods` membatasi hanya pada method tertentu (mis. POST)
+        self.rules[name] = {
+            'user': self._rule(name, 'user', user),
+            'ip': self._rule(name, 'ip', ip),
+        }
+
+        def decorator(view):
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                if self.enabled and (methods is None or request.method in methods):
+                    self.check(name)
+                return view(*args, **kwargs)
+            return wrapped
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+        data.update(self.backend.stats())
+        data['enabled'] = self.enabled
+        return data
+
+
+def make_rate_limiter(url=None, enabled=True, env=None, trust_proxy=False):
+    if url:
+        if redis is None:
+            logger.warning('RATE_LIMIT_URL diisi tetapi library redis tidak terpasang; memakai bucket lokal')
+        else:
+            try:
+                return RateLimiter(RedisBuckets(redis.Redis.from_url(url)), enabled, env, trust_proxy)
+            except Exception as e:
+                logger.warning('Tidak dapat membuat rate limiter Redis: %s', e)
+    return RateLimiter(MemoryBuckets(), enabled, env, trust_proxy)
@@ -0,0 +1,225 @@
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+# Redis opsional: hanya dipakai jika SESSION_BACKEND=redis
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Session server-side
+#
+# Cookie hanya berisi session id acak; isi session (login, profil user,
+# flash message) disimpan di SQLite lokal (default, dibagi semua worker di
+# satu host) atau Redis (dibagi antar host). Karena data ada di server,
+# session bisa dicabut: saat logout, reset password, atau `flask revoke-sessions`.
+# ---------------------------------------------------------
+
+serializer = TaggedJSONSerializer()
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.previous_sid = None
+
+    def regenerate(self):
+        # Session id baru setelah login (mencegah session fixation)
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = new_session_id()
+        self.modified = True
+
+
+def new_session_id():
+    return secrets.token_urlsafe(32)
+
+
+class SQLiteSessionStore:
+    # Satu koneksi per thread per proses; WAL agar banyak worker bisa membaca bersamaan
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "sid TEXT PRIMARY KEY, user_id INTEGER, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, sid):
+        row = self._connect().execute(
+            "SELECT data, expires_at FROM sessions WHERE sid = ?", (sid,)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None, None
+        return row[0], row[1]
+
+    def save(self, sid, data, user_id, ttl):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO sessions (sid, user_id, data, expires_at) VALUES (?, ?, ?, ?)",
+            (sid, user_id, data, time.time() + ttl)
+        )
+        # Sesekali bersihkan session kedaluwarsa
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % 500 == 0
+        if purge:
+            self.purge_expired()
+
+    def delete(self, sid):
+        self._connect().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def delete_user(self, user_id):
+        return self._connect().execute("DELETE FROM sessions WHERE user_id = ?", (user_id,)).rowcount
+
+    def purge_expired(self):
+        return self._connect().execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def stats(self):
+        count = self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {'backend': 'sqlite', 'sessions': count}
+
+
+class RedisSessionStore:
+    # session:<sid> -> data (dengan TTL); user:<id> -> set sid untuk revoke per user
+    def __init__(self, client, prefix='dietplanner:session:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, sid):
+        pipe = self.client.pipeline()
+        pipe.get(self.prefix + sid)
+        pipe.ttl(self.prefix + sid)
+        data, ttl = pipe.execute()
+        if data is None:
+            return None, None
+        return data.decode('utf-8') if isinstance(data, bytes) else data, time.time() + max(ttl, 0)
+
+    def save(self, sid, data, user_id, ttl):
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + sid, data, ex=int(ttl))
+        if user_id is not None:
+            pipe.sadd(f'{self.prefix}user:{user_id}', sid)
+            pipe.expire(f'{self.prefix}user:{user_id}', int(ttl))
+        pipe.execute()
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+    def delete_user(self, user_id):
+        key = f'{self.prefix}user:{user_id}'
+        sids = [s.decode('utf-8') if isinstance(s, bytes) else s for s in self.client.smembers(key)]
+        if sids:
+            self.client.delete(*[self.prefix + sid for sid in sids])
+        self.client.delete(key)
+        return len(sids)
+
+    def purge_expired(self):
+        return 0  # ditangani TTL Redis
+
+    def stats(self):
+        return {'backend': 'redis'}
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            try:
+                raw, expires_at = self.store.get(sid)
+            except Exception as e:
+                logger.error('Gagal membaca session: %s', e)
+                raw, expires_at = None, None
+            if raw is not None:
+                session = ServerSession(serializer.loads(raw), sid=sid)
+                session.expires_at = expires_at
+                return session
+        return ServerSession(sid=new_session_id(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+            session.previous_sid = None
+
+        if not session:
+            if not session.new:
+                self.store.delete(session.sid)
+            if session.modified or not session.new:
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        response.vary.add('Cookie')
+        ttl = app.permanent_session_lifetime.total_seconds()
+        # Perpanjang masa berlaku tanpa menulis ke store di setiap request:
+        # cukup saat isi berubah atau sisa umur tinggal kurang dari setengah.
+        expires_at = getattr(session, 'expires_at', None)
+        refresh = expires_at is None or expires_at - time.time() < ttl / 2
+        if not (session.modified or session.new or refresh):
+            return
+        self.store.save(session.sid, serializer.dumps(dict(session)), session.get('id'), ttl)
+        session.expires_at = time.time() + ttl
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def make_session_interface(app):
+    # SESSION_BACKEND: sqlite (default), redis, atau cookie (perilaku lama Flask;
+    # isi session terbaca client, jadi app tidak menyimpan profil di sana)
+    backend = app.config.get('SESSION_BACKEND', 'sqlite')
+    if backend == 'cookie':
+        return None
+    if backend == 'redis':
+        url = app.config.get('SESSION_REDIS_URL')
+        if redis is None or not url:
+            logger.warning('SESSION_BACKEND=redis tetapi library redis / SESSION_REDIS_URL tidak tersedia; memakai SQLite')
+        else:
+            return ServerSessionInterface(RedisSessionStore(redis.Redis.from_url(url)))
+    path = app.config.get('SESSION_SQLITE_PATH') or os.path.join(app.instance_path, 'sessions.sqlite3')
+    return ServerSessionInterface(SQLiteSessionStore(path))
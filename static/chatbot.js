@@ -31,33 +31,90 @@ function sendMessage() {
   chatInput.value = "";
   chatMessages.scrollTop = chatMessages.scrollHeight;
 
-  // Kirim ke backend Gemini API
+  // Bubble jawaban dibuat di awal lalu diisi bertahap saat stream berjalan
+  const aiMsg = document.createElement("div");
+  aiMsg.className = "chat-msg ai";
+  aiMsg.textContent = "...";
+  chatMessages.appendChild(aiMsg);
+  chatMessages.scrollTop = chatMessages.scrollHeight;
+
+  function showAnswer(text) {
+    aiMsg.textContent = text;
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+  }
+
+  // Kirim ke backend Gemini API (SSE jika didukung, JSON sebagai fallback)
+  const canStream = !!(window.ReadableStream && window.TextDecoder);
   fetch("/api/chatbot", {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
+      Accept: canStream ? "text/event-stream" : "application/json",
     },
     body: JSON.stringify({ question: msg }),
   })
-    .then((res) => res.json())
-    .then((data) => {
-      const aiMsg = document.createElement("div");
-      aiMsg.className = "chat-msg ai";
-      if (data.answer) {
-        aiMsg.textContent = data.answer;
-      } else {
-        aiMsg.textContent = data.error || "Maaf, terjadi kesalahan.";
+    .then((res) => {
+      const type = res.headers.get("Content-Type") || "";
+      if (canStream && res.body && type.indexOf("text/event-stream") !== -1) {
+        return readEventStream(res.body, showAnswer);
       }
-      chatMessages.appendChild(aiMsg);
-      chatMessages.scrollTop = chatMessages.scrollHeight;
+      return res.json().then((data) => {
+        if (data.answer) {
+          showAnswer(data.answer);
+        } else {
+          showAnswer(data.error || "Maaf, terjadi kesalahan.");
+        }
+      });
     })
     .catch(() => {
-      const aiMsg = document.createElement("div");
-      aiMsg.className = "chat-msg ai";
-      aiMsg.textContent = "Maaf, tidak dapat terhubung ke server.";
-      chatMessages.appendChild(aiMsg);
-      chatMessages.scrollTop = chatMessages.scrollHeight;
+      showAnswer("Maaf, tidak dapat terhubung ke server.");
+    });
+}
+
+// Baca response text/event-stream dan render potongan jawaban saat tiba
+function readEventStream(body, showAnswer) {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let answer = "";
+  let failed = false;
+
+  function handleEvent(block) {
+    let event = "message";
+    let data = "";
+    block.split("\n").forEach((line) => {
+      if (line.indexOf("event:") === 0) event = line.slice(6).trim();
+      else if (line.indexOf("data:") === 0) data += line.slice(5).trim();
     });
+    if (!data) return;
+    const payload = JSON.parse(data);
+    if (event === "error") {
+      failed = true;
+      showAnswer(payload.error || "Maaf, terjadi kesalahan.");
+    } else if (event === "message" && payload.text) {
+      answer += payload.text;
+      showAnswer(answer);
+    }
+  }
+
+  function pump() {
+    return reader.read().then(({ done, value }) => {
+      if (value) buffer += decoder.decode(value, { stream: true });
+      let idx;
+      while ((idx = buffer.indexOf("\n\n")) !== -1) {
+        handleEvent(buffer.slice(0, idx));
+        buffer = buffer.slice(idx + 2);
+      }
+      if (done) {
+        if (buffer.trim()) handleEvent(buffer);
+        if (!answer && !failed) showAnswer("Maaf, terjadi kesalahan.");
+        return;
+      }
+      return pump();
+    });
+  }
+
+  return pump();
 }
 
 // Kirim chat dengan tombol Enter
@@ -0,0 +1,73 @@
+// Autocomplete nama makanan dari katalog (/api/foods/search).
+// Input dengan atribut data-food-autocomplete memakai satu <datalist>
+// bersama; saat nama yang dipilih cocok dengan katalog, kolom kalori
+// pada form / baris yang sama diisi otomatis (kecuali sudah diisi manual).
+document.addEventListener("DOMContentLoaded", () => {
+  const inputs = document.querySelectorAll("[data-food-autocomplete]");
+  const datalist = document.getElementById("food-suggestions");
+  if (!inputs.length || !datalist) return;
+
+  const known = new Map(); // nama (lowercase) -> item katalog
+  let timer = null;
+  let controller = null;
+
+  function caloriesInput(input) {
+    const scope = input.closest("tr") || input.closest("form");
+    return scope ? scope.querySelector("input[name^='calories']") : null;
+  }
+
+  function fillCalories(input) {
+    const item = known.get(input.value.trim().toLowerCase());
+    const target = caloriesInput(input);
+    if (!item || !target) return;
+    if (target.value === "" || target.dataset.autofilled === "1") {
+      target.value = item.calories;
+      target.dataset.autofilled = "1";
+      target.title = item.serving ? "Per " + item.serving : "";
+    }
+  }
+
+  async function suggest(query) {
+    if (controller) controller.abort();
+    controller = new AbortController();
+    try {
+      const res = await fetch(
+        "/api/foods/search?limit=10&q=" + encodeURIComponent(query),
+        { signal: controller.signal }
+      );
+      if (!res.ok) return;
+      const data = await res.json();
+      datalist.innerHTML = "";
+      (data.items || []).forEach((item) => {
+        known.set(item.name.toLowerCase(), item);
+        const option = document.createElement("option");
+        option.value = item.name;
+        option.label =
+          item.calories + " kkal" + (item.serving ? " / " + item.serving : "");
+        datalist.appendChild(option);
+      });
+    } catch (e) {
+      // permintaan dibatalkan / jaringan gagal: abaikan
+    }
+  }
+
+  inputs.forEach((input) => {
+    input.setAttribute("list", "food-suggestions");
+    input.setAttribute("autocomplete", "off");
+    input.addEventListener("input", () => {
+      fillCalories(input);
+      const query = input.value.trim();
+      clearTimeout(timer);
+      if (query.length < 2) return;
+      timer = setTimeout(() => suggest(query), 150);
+    });
+    input.addEventListener("change", () => fillCalories(input));
+  });
+
+  // Kalori yang diketik manual tidak ditimpa lagi
+  document.querySelectorAll("input[name^='calories']").forEach((input) => {
+    input.addEventListener("input", () => {
+      input.dataset.autofilled = "";
+    });
+  });
+});
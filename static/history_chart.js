@@ -0,0 +1,97 @@
+// Grafik tren di halaman history dari /api/trends (tanpa library chart).
+document.addEventListener("DOMContentLoaded", () => {
+  const bucketSelect = document.getElementById("trendBucket");
+  const caloriesCanvas = document.getElementById("trendCalories");
+  const bmiCanvas = document.getElementById("trendBmi");
+  const summary = document.getElementById("trendSummary");
+  if (!bucketSelect || !caloriesCanvas || !bmiCanvas) return;
+
+  function drawLines(canvas, labels, series) {
+    const ctx = canvas.getContext("2d");
+    const width = (canvas.width = canvas.clientWidth || 600);
+    const height = canvas.height;
+    const pad = 32;
+    ctx.clearRect(0, 0, width, height);
+
+    const values = series.flatMap((s) => s.values).filter((v) => v !== null);
+    if (!values.length) {
+      ctx.fillStyle = "#888";
+      ctx.fillText("Belum ada data", pad, height / 2);
+      return;
+    }
+    let min = Math.min(...values);
+    let max = Math.max(...values);
+    if (min === max) {
+      min -= 1;
+      max += 1;
+    }
+    const x = (i) =>
+      pad + (labels.length > 1 ? (i * (width - 2 * pad)) / (labels.length - 1) : 0);
+    const y = (v) => height - pad - ((v - min) * (height - 2 * pad)) / (max - min);
+
+    ctx.fillStyle = "#888";
+    ctx.font = "11px sans-serif";
+    ctx.fillText(String(Math.round(max * 10) / 10), 2, pad);
+    ctx.fillText(String(Math.round(min * 10) / 10), 2, height - pad);
+    if (labels.length) {
+      ctx.fillText(labels[0], pad, height - 8);
+      const last = labels[labels.length - 1];
+      ctx.fillText(last, width - pad - ctx.measureText(last).width, height - 8);
+    }
+
+    series.forEach((s, index) => {
+      ctx.strokeStyle = s.color;
+      ctx.lineWidth = 2;
+      ctx.beginPath();
+      let started = false;
+      s.values.forEach((v, i) => {
+        if (v === null) return;
+        if (started) ctx.lineTo(x(i), y(v));
+        else ctx.moveTo(x(i), y(v));
+        started = true;
+      });
+      ctx.stroke();
+      ctx.fillStyle = s.color;
+      ctx.fillText(s.label, width - pad - 150, 12 + index * 14);
+    });
+  }
+
+  async function load() {
+    try {
+      const res = await fetch("/api/trends?bucket=" + bucketSelect.value);
+      if (!res.ok) return;
+      const data = await res.json();
+      const buckets = data.buckets || [];
+      const labels = buckets.map((b) => b.bucket_start);
+      drawLines(caloriesCanvas, labels, [
+        {
+          label: "Kalori harian (MA)",
+          color: "#2f79f0",
+          values: buckets.map((b) => b.daily_calories_ma),
+        },
+        {
+          label: "Target kalori (MA)",
+          color: "#f08c2f",
+          values: buckets.map((b) => b.goal_calories_ma),
+        },
+      ]);
+      drawLines(bmiCanvas, labels, [
+        { label: "BMI", color: "#3bb273", values: buckets.map((b) => b.avg_bmi) },
+      ]);
+      const last = buckets[buckets.length - 1];
+      if (summary && last && last.bmi_delta !== null) {
+        const unit = data.bucket === "month" ? "bulan" : "minggu";
+        summary.innerText =
+          "Perubahan BMI dari " + unit + " sebelumnya: " +
+          (last.bmi_delta > 0 ? "+" : "") + last.bmi_delta;
+      } else if (summary) {
+        summary.innerText = "";
+      }
+    } catch (e) {
+      // grafik opsional; abaikan jika gagal dimuat
+    }
+  }
+
+  bucketSelect.addEventListener("change", load);
+  load();
+});
@@ -32,11 +32,7 @@ document.addEventListener("DOMContentLoaded", () => {
           data.goal_calories + " kcal";
       if (data.goal_key)
         document.getElementById("popupGoal").innerText =
-          data.goal_key === "gain"
-            ? "Menaikkan"
-            : data.goal_key === "maintain"
-            ? "Mempertahankan"
-            : "Menurunkan";
+          data.goal_label || data.goal_key;
       if (typeof data.progress_percent !== "undefined") {
         var pct = Math.max(
           0,
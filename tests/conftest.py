@@ -0,0 +1,154 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Konfigurasi untuk `import app` di test: session sqlite di direktori
+# sementara, rate limit dan write-behind dimatikan (diuji langsung per modul)
+TMP_DIR = tempfile.mkdtemp(prefix='dietplanner-tests-')
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+os.environ.setdefault('SESSION_BACKEND', 'sqlite')
+os.environ.setdefault('SESSION_SQLITE_PATH', os.path.join(TMP_DIR, 'sessions.sqlite3'))
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+os.environ.setdefault('HISTORY_WRITE_BEHIND', '0')
+os.environ.setdefault('GEMINI_API_KEY', 'test-key')
+os.environ['MYSQL_REPLICAS'] = ''
+
+
+# ---------------------------------------------------------
+# Stand-in MySQL: MySQLdb.connect diganti koneksi palsu per host yang
+# mencatat query dan mengembalikan baris yang sudah diatur per test
+# ---------------------------------------------------------
+class FakeServer:
+    def __init__(self, host):
+        self.host = host
+        self.queries = []
+        self.batches = []    # (query, args) dari executemany
+        self.responses = {}  # potongan query -> list baris atau callable(query, args)
+        self.commits = 0
+
+    def respond(self, query, args):
+        for fragment, rows in self.responses.items():
+            if fragment in query:
+                return list(rows(query, args) if callable(rows) else rows)
+        return []
+
+
+class FakeCursor:
+    def __init__(self, server):
+        self.server = server
+        self.rows = []
+        self.rowcount = 0
+        self.description = None
+
+    def execute(self, query, args=None):
+        self.server.queries.append(query)
+        self.rows = self.server.respond(query, args)
+        self.rowcount = len(self.rows)
+        return self.rowcount
+
+    def executemany(self, query, args):
+        args = list(args)
+        self.server.queries.append(query)
+        self.server.batches.append((query, args))
+        for row_args in args:
+            self.server.respond(query, row_args)  # respons callable melihat setiap baris
+        self.rowcount = len(args)
+        return self.rowcount
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+
+    def cursor(self, cursorclass=None):
+        return FakeCursor(self.server)
+
+    def commit(self):
+        self.server.commits += 1
+
+    def rollback(self):
+        pass
+
+    def ping(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeMySQL:
+    def __init__(self):
+        self.servers = {}
+
+    def server(self, host):
+        if host not in self.servers:
+            self.servers[host] = FakeServer(host)
+        return self.servers[host]
+
+    def connect(self, **kwargs):
+        return FakeConnection(self.server(kwargs.get('host')))
+
+    def reset(self):
+        for server in self.servers.values():
+            server.queries.clear()
+            server.batches.clear()
+            server.responses.clear()
+            server.commits = 0
+
+
+@pytest.fixture(scope='session')
+def fake_mysql():
+    MySQLdb = pytest.importorskip('MySQLdb')
+    fake = FakeMySQL()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(MySQLdb, 'connect', fake.connect)
+        yield fake
+
+
+@pytest.fixture
+def mysql(fake_mysql):
+    fake_mysql.reset()
+    yield fake_mysql
+    fake_mysql.reset()
+
+
+@pytest.fixture(scope='session')
+def app_module(fake_mysql):
+    # app.py dibuat sekali per proses (create_app saat import)
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module, mysql):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    def log_in(user_id=1, username='tester'):
+        with client.session_transaction() as sess:
+            sess['loggedin'] = True
+            sess['id'] = user_id
+            sess['username'] = username
+        return client
+    return log_in
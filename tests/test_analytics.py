@@ -0,0 +1,161 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import migrations
+from analytics import TREND_BUCKETS, fetch_trend_buckets, fetch_trend_series
+from planner import GOAL_LABELS, compute_plans, goal_label
+
+
+class RecordingCursor:
+    # DictCursor palsu: mengembalikan `rows` untuk execute berikutnya
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, query, args=None):
+        self.executed.append((query, args))
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.mark.parametrize('goal_key, label', [
+    ('gain', 'Menaikkan'),
+    ('maintain', 'Mempertahankan'),
+    ('lose', 'Menurunkan'),
+    ('custom', 'custom'),   # key lama / tak dikenal ditampilkan apa adanya
+    (None, ''),
+    ('', ''),
+])
+def test_goal_label(goal_key, label):
+    assert goal_label(goal_key) == label
+
+
+def test_every_planner_goal_key_has_a_label():
+    plans = compute_plans([70] * 4, [170] * 4, [30] * 4, 'male', 'light',
+                          ['gain_weight', 'maintain', 'loss', 'tidak dikenal'])
+    assert set(plans['goal_key']) <= set(GOAL_LABELS)
+
+
+def test_trend_buckets_are_shaped_for_the_chart():
+    cursor = RecordingCursor([
+        {'bucket_start': date(2024, 1, 1), 'entries': 3, 'avg_bmi': Decimal('24.2333'),
+         'avg_daily_calories': Decimal('2210.6667'), 'avg_goal_calories': Decimal('1910.0000'),
+         'avg_progress': Decimal('86.3333'), 'bmi_delta': None, 'daily_calories_delta': None,
+         'daily_calories_ma': Decimal('2210.6667'), 'goal_calories_ma': Decimal('1910.0000')},
+        {'bucket_start': date(2024, 1, 8), 'entries': 1, 'avg_bmi': 23.9,
+         'avg_daily_calories': Decimal('2150'), 'avg_goal_calories': Decimal('1850'),
+         'avg_progress': None, 'bmi_delta': Decimal('-0.3333'), 'daily_calories_delta': Decimal('-60.6667'),
+         'daily_calories_ma': Decimal('2180.3333'), 'goal_calories_ma': Decimal('1880')},
+    ])
+    rows = fetch_trend_buckets(cursor, 7, 'week', periods=12, window=4)
+
+    assert rows[0] == {
+        'bucket_start': '2024-01-01', 'entries': 3, 'avg_bmi': 24.2, 'bmi_delta': None,
+        'avg_daily_calories': 2211, 'daily_calories_delta': None, 'daily_calories_ma': 2211,
+        'avg_goal_calories': 1910, 'goal_calories_ma': 1910, 'avg_progress_percent': 86.3,
+    }
+    assert rows[1]['bmi_delta'] == -0.33 and rows[1]['daily_calories_delta'] == -61
+    assert rows[1]['avg_progress_percent'] is None
+    assert isinstance(rows[0]['avg_daily_calories'], int)
+
+    [(query, args)] = cursor.executed
+    assert TREND_BUCKETS['week'][0] in query
+    window_rows, _, user_id, since = args
+    assert window_rows == 3 and user_id == 7  # 4 bucket = 3 sebelumnya + saat ini
+    assert abs((datetime.now() - since) - timedelta(days=7 * 12)) < timedelta(minutes=1)
+
+
+def test_month_buckets_use_month_start_expression():
+    cursor = RecordingCursor([])
+    assert fetch_trend_buckets(cursor, 1, 'month', periods=6, window=1) == []
+    query, args = cursor.executed[0]
+    assert TREND_BUCKETS['month'][0] in query and args[0] == 0
+
+
+def test_trend_series_is_shaped_for_the_chart():
+    cursor = RecordingCursor([
+        {'created_at': datetime(2024, 1, 2, 8, 30), 'bmi': 24.25, 'daily_calories': 2200, 'goal_calories': 1900,
+         'progress_percent': 86, 'daily_calories_ma': Decimal('2200.0000'), 'goal_calories_ma': Decimal('1900.0000'),
+         'bmi_delta': None},
+        {'created_at': datetime(2024, 1, 5, 9, 0), 'bmi': 24.0, 'daily_calories': 2150, 'goal_calories': 1850,
+         'progress_percent': 86, 'daily_calories_ma': Decimal('2175.0000'), 'goal_calories_ma': Decimal('1875.0000'),
+         'bmi_delta': -0.25},
+    ])
+    rows = fetch_trend_series(cursor, 7, window=2, points=50)
+    assert [row['created_at'] for row in rows] == ['2024-01-02T08:30:00', '2024-01-05T09:00:00']
+    assert rows[0]['bmi_delta'] is None and rows[1]['bmi_delta'] == -0.25
+    assert [row['daily_calories_ma'] for row in rows] == [2200, 2175]
+    assert cursor.executed[0][1] == (7, 50, 1)
+
+
+def test_api_trends(client, login, mysql, app_module):
+    assert client.get('/api/trends').status_code == 403
+    login(user_id=3)
+    assert client.get('/api/trends?bucket=day').status_code == 400
+
+    primary = mysql.server(app_module.app.config['MYSQL_HOST'])
+    primary.responses['GROUP BY bucket_start'] = [
+        {'bucket_start': date(2024, 1, 1), 'entries': 1, 'avg_bmi': 24.0, 'avg_daily_calories': 2000,
+         'avg_goal_calories': 1800, 'avg_progress': 90, 'bmi_delta': None, 'daily_calories_delta': None,
+         'daily_calories_ma': 2000, 'goal_calories_ma': 1800},
+    ]
+    response = client.get('/api/trends?bucket=month&window=999&periods=0')
+    assert response.status_code == 200
+    data = response.json
+    assert (data['bucket'], data['window'], data['periods']) == ('month', 30, 1)
+    assert data['buckets'][0]['bucket_start'] == '2024-01-01'
+    assert data['series'] == []
+
+
+# --- migrasi 8: kolom goal_protein ----------------------------------------
+
+class MigrationCursor:
+    def __init__(self, applied, existing_columns):
+        self.applied = applied
+        self.existing_columns = existing_columns
+        self.executed = []
+        self.result = []
+
+    def execute(self, query, args=None):
+        self.executed.append(' '.join(query.split()))
+        if 'GET_LOCK' in query or 'RELEASE_LOCK' in query:
+            self.result = [(1,)]
+        elif query.startswith('SELECT version FROM schema_migrations'):
+            self.result = [(v,) for v in self.applied]
+        elif 'information_schema.columns' in query:
+            self.result = [(1,)] if args[1] in self.existing_columns else []
+        else:
+            self.result = []
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class MigrationConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.mark.parametrize('existing, expect_alter', [(set(), True), ({'goal_protein'}, False)])
+def test_migration_8_adds_goal_protein_once(existing, expect_alter):
+    cursor = MigrationCursor(applied=range(1, 8), existing_columns=existing)
+    assert migrations.migrate(MigrationConnection(cursor), target=8) == [8]
+    alter = 'ALTER TABLE progress_history ADD COLUMN goal_protein FLOAT NULL AFTER goal_calories'
+    assert (alter in cursor.executed) is expect_alter
+    assert any(q.startswith('INSERT INTO schema_migrations') for q in cursor.executed)
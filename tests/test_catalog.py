@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+
+from catalog import FoodIndex
+
+
+class CatalogCursor:
+    # DictCursor palsu di atas list baris food_catalog
+    def __init__(self, table):
+        self.table = table
+        self.queries = []
+        self.result = []
+
+    def execute(self, query, args=None):
+        self.queries.append(query)
+        if 'COUNT(*)' in query:
+            self.result = [{'row_count': len(self.table)}]
+        elif 'WHERE updated_at' in query:
+            self.result = [row for row in self.table if row['updated_at'] >= args[0]]
+        else:
+            self.result = list(self.table)
+
+    def fetchall(self):
+        result, self.result = self.result, []
+        return result
+
+    def fetchone(self):
+        return self.result.pop(0) if self.result else None
+
+
+def food(food_id, name, day=1):
+    return {'id': food_id, 'name': name, 'category': 'makanan pokok', 'serving': '1 porsi',
+            'calories': 200, 'protein': 5, 'carbs': 30, 'fat': 5,
+            'updated_at': datetime(2024, 1, day)}
+
+
+@pytest.fixture
+def catalog():
+    table = [food(1, 'nasi goreng'), food(2, 'nasi uduk'), food(3, 'mie ayam')]
+    cursor = CatalogCursor(table)
+    index = FoodIndex()
+    index.build_from_db(cursor)
+    return table, cursor, index
+
+
+def names(index, query):
+    return sorted(row['name'] for row in index.search(query))
+
+
+def test_incremental_refresh_picks_up_new_rows(catalog):
+    table, cursor, index = catalog
+    table.append(food(4, 'nasi kuning', day=2))
+    cursor.queries.clear()
+    index.refresh_from_db(cursor)
+    assert names(index, 'nasi') == ['nasi goreng', 'nasi kuning', 'nasi uduk']
+    # Jumlah baris cocok: tidak perlu build penuh
+    assert all('WHERE' in q or 'COUNT' in q for q in cursor.queries)
+
+
+def test_deleted_rows_trigger_full_reload(catalog):
+    table, cursor, index = catalog
+    del table[0]
+    index.refresh_from_db(cursor)
+    assert names(index, 'nasi') == ['nasi uduk']
+
+    # Hapus + tambah di interval yang sama: jumlah baris tabel tetap sama
+    del table[0]
+    table.append(food(5, 'nasi kuning', day=3))
+    index.refresh_from_db(cursor)
+    assert names(index, 'nasi') == ['nasi kuning']
+    assert len(index) == 2
+
+
+def test_full_reload_after_interval(catalog):
+    table, cursor, index = catalog
+    index.built_at -= 120
+    cursor.queries.clear()
+    index.refresh_from_db(cursor, full_reload_after=60)
+    assert len(cursor.queries) == 1 and 'WHERE' not in cursor.queries[0]
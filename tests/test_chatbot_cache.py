@@ -0,0 +1,69 @@
+import types
+
+import pytest
+
+
+class StubModel:
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls.append(prompt)
+        if stream:
+            return iter([types.SimpleNamespace(text='Halo '), types.SimpleNamespace(text='dunia')])
+        return types.SimpleNamespace(text=f'jawaban {len(self.calls)}')
+
+
+@pytest.fixture
+def genai_calls(app_module, monkeypatch):
+    calls = []
+    stub = types.SimpleNamespace(
+        GenerativeModel=lambda name: StubModel(name, calls),
+        configure=lambda **kwargs: None,
+        list_models=lambda: [],
+    )
+    monkeypatch.setattr(app_module, 'get_genai', lambda: stub)
+    monkeypatch.setattr(app_module, 'GEMINI_API_KEY', 'test-key')
+    app_module.gemini_registry.reset()
+    app_module.chatbot_cache.clear()
+    yield calls
+    app_module.gemini_registry.reset()
+    app_module.chatbot_cache.clear()
+
+
+@pytest.mark.parametrize('a, b', [
+    ('Berapa kalori nasi?', 'berapa  kalori NASI'),
+    ('  menu diet, sehat!  ', 'menu diet sehat'),
+    ('Apa itu\tBMI?\n', 'apa itu bmi'),
+])
+def test_equivalent_questions_share_cache_key(app_module, a, b):
+    instruction = app_module.CHATBOT_SYSTEM_INSTRUCTION
+    assert app_module.normalize_question(a) == app_module.normalize_question(b)
+    assert app_module.chatbot_cache_key(a, instruction) == app_module.chatbot_cache_key(b, instruction)
+
+
+def test_cache_key_depends_on_question_and_instruction(app_module):
+    instruction = app_module.CHATBOT_SYSTEM_INSTRUCTION
+    key = app_module.chatbot_cache_key('kalori nasi', instruction)
+    assert key != app_module.chatbot_cache_key('kalori roti', instruction)
+    assert key != app_module.chatbot_cache_key('kalori nasi', instruction + ' Jawab singkat.')
+
+
+def test_repeated_question_is_served_from_cache(client, genai_calls):
+    first = client.post('/api/chatbot', json={'question': 'Berapa kalori nasi?'})
+    second = client.post('/api/chatbot', json={'question': 'berapa kalori   NASI'})
+    other = client.post('/api/chatbot', json={'question': 'cara diet sehat'})
+
+    assert first.json == {'answer': 'jawaban 1', 'cached': False}
+    assert second.json == {'answer': 'jawaban 1', 'cached': True}
+    assert other.json['cached'] is False
+    assert len(genai_calls) == 2
+
+
+def test_streamed_answer_is_cached(client, genai_calls):
+    stream = client.post('/api/chatbot?stream=1', json={'question': 'menu sarapan'})
+    assert b'"text": "Halo "' in stream.get_data()
+    cached = client.post('/api/chatbot', json={'question': 'Menu sarapan?'})
+    assert cached.json == {'answer': 'Halo dunia', 'cached': True}
+    assert len(genai_calls) == 1
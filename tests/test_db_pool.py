@@ -0,0 +1,154 @@
+import threading
+
+import pytest
+
+pytest.importorskip('MySQLdb')
+
+import db  # noqa: E402
+from db import ConnectionPool, PoolTimeout  # noqa: E402
+
+
+class Conn:
+    # Koneksi palsu: ping() bisa gagal atau ditahan sampai `release_ping` di-set
+    def __init__(self, n):
+        self.n = n
+        self.closed = False
+        self.ping_error = None
+        self.ping_started = threading.Event()
+        self.release_ping = None
+
+    def ping(self, *args):
+        self.ping_started.set()
+        if self.release_ping is not None:
+            self.release_ping.wait(5)
+        if self.ping_error:
+            raise self.ping_error
+
+    def close(self):
+        self.closed = True
+
+
+class Pool(ConnectionPool):
+    def __init__(self, **kwargs):
+        kwargs.setdefault('acquire_timeout', 1)
+        super().__init__({}, **kwargs)
+        self.opened = []
+
+    def _connect(self):
+        conn = Conn(len(self.opened))
+        self.opened.append(conn)
+        return conn
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db.time, 'monotonic', clock)
+    return clock
+
+
+def test_warm_up_opens_min_size_and_reuses_idle():
+    pool = Pool(min_size=2, max_size=4)
+    pool.warm_up()
+    assert pool.stats()['size'] == 2 and pool.stats()['idle'] == 2
+
+    conn = pool.acquire()
+    assert conn in pool.opened
+    pool.release(conn)
+    assert pool.acquire() is conn  # LIFO: koneksi terakhir dipakai ulang
+    assert len(pool.opened) == 2
+
+
+def test_acquire_times_out_at_max_size():
+    pool = Pool(min_size=0, max_size=2, acquire_timeout=0.05)
+    conns = [pool.acquire(), pool.acquire()]
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats['timeouts'] == 1 and stats['waits'] >= 1
+    assert stats['in_use'] == 2 and len(pool.opened) == 2
+
+    # Koneksi yang dikembalikan membangunkan thread yang menunggu
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    pool.release(conns[0])
+    waiter.join(5)
+    assert got == [conns[0]]
+
+
+def test_idle_connections_are_evicted_down_to_min_size(clock):
+    pool = Pool(min_size=1, max_size=4, idle_timeout=60)
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+    assert pool.stats()['idle'] == 3
+
+    clock.now += 61
+    conn = pool.acquire()
+    stats = pool.stats()
+    assert stats['evicted_idle'] == 2 and stats['size'] == 1
+    assert sum(c.closed for c in conns) == 2 and not conn.closed
+
+
+def test_unhealthy_connection_is_discarded(clock):
+    pool = Pool(min_size=0, max_size=2, health_check_interval=30)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.ping_error = OSError('MySQL server has gone away')
+
+    clock.now += 10
+    assert pool.acquire() is conn  # belum waktunya ping
+    pool.release(conn)
+
+    clock.now += 31
+    fresh = pool.acquire()
+    assert fresh is not conn and conn.closed
+    stats = pool.stats()
+    assert stats['health_check_failures'] == 1 and stats['size'] == 1
+
+
+def test_health_check_runs_outside_the_pool_lock():
+    pool = Pool(min_size=2, max_size=3, health_check_interval=0)
+    pool.warm_up()
+    slow = pool.opened[-1]  # idle di akhir deque: diambil pertama
+    slow.release_ping = threading.Event()
+
+    got = []
+    worker = threading.Thread(target=lambda: got.append(pool.acquire()))
+    worker.start()
+    assert slow.ping_started.wait(5)
+
+    # Selama ping tertahan, thread lain tetap bisa memakai pool
+    other = []
+    thread = threading.Thread(target=lambda: other.append((pool.acquire(), pool.stats())))
+    thread.start()
+    thread.join(1)
+    assert not thread.is_alive()
+    assert other[0][0] is pool.opened[0]
+    assert other[0][1]['in_use'] == 2
+
+    slow.release_ping.set()
+    worker.join(5)
+    assert got == [slow]
+
+
+def test_pool_resets_after_fork(monkeypatch):
+    pool = Pool(min_size=2, max_size=2)
+    pool.warm_up()
+    conn = pool.acquire()
+
+    monkeypatch.setattr(db.os, 'getpid', lambda: -1)
+    # Koneksi parent tidak dipakai ulang dan tidak dikembalikan ke pool child
+    pool.release(conn)
+    child_conn = pool.acquire()
+    assert child_conn not in pool.opened[:2]
+    assert pool.stats()['size'] == 1 and pool.stats()['idle'] == 0
@@ -0,0 +1,169 @@
+import time
+
+import pytest
+from flask import Flask
+
+pytest.importorskip('MySQLdb')
+
+from db import ConnectionPool, Database, Replica, parse_hosts  # noqa: E402
+
+
+def make_db(**config):
+    app = Flask(__name__)
+    app.config.update({
+        'MYSQL_HOST': 'primary',
+        'MYSQL_DB': 'dietplanner',
+        'MYSQL_REPLICAS': 'replica-a:3307,replica-b',
+        'DB_REPLICA_MAX_LAG': 5,
+        'DB_REPLICA_LAG_CHECK_INTERVAL': 60,
+    })
+    app.config.update(config)
+    db = Database(app)
+    return app, db
+
+
+def set_lag(mysql, host, lag):
+    mysql.server(host).responses['SHOW REPLICA STATUS'] = [{'Seconds_Behind_Source': lag}]
+
+
+def read_host(db):
+    with db.cursor(read=True) as cursor:
+        cursor.execute('SELECT 1')
+        return cursor.server.host
+
+
+def test_parse_hosts():
+    assert parse_hosts('db-a:3307, db-b,,') == [('db-a', 3307), ('db-b', 3306)]
+    assert parse_hosts('') == []
+
+
+def test_reads_round_robin_across_healthy_replicas(mysql):
+    app, db = make_db()
+    set_lag(mysql, 'replica-a', 0)
+    set_lag(mysql, 'replica-b', 1)
+    hosts = []
+    for _ in range(4):
+        with app.app_context():
+            hosts.append(read_host(db))
+    assert sorted(hosts) == ['replica-a', 'replica-a', 'replica-b', 'replica-b']
+    assert db.replica_stats()['reads']['replica'] == 4
+    # Query tulis tetap ke primary
+    with app.app_context(), db.cursor() as cursor:
+        cursor.execute('UPDATE users SET fullname = %s WHERE id = %s', ('x', 1))
+    assert 'UPDATE users SET fullname = %s WHERE id = %s' in mysql.server('primary').queries
+
+
+def test_lagging_replica_falls_back(mysql):
+    app, db = make_db()
+    set_lag(mysql, 'replica-a', 30)
+    set_lag(mysql, 'replica-b', 0)
+    with app.app_context():
+        assert read_host(db) == 'replica-b'
+    # Semua replica tertinggal (atau thread replikasi berhenti): ke primary
+    set_lag(mysql, 'replica-b', None)
+    db.replicas[1].checked_at -= 120
+    for _ in range(2):
+        with app.app_context():
+            assert read_host(db) == 'primary'
+    assert db.replica_stats()['reads']['primary_fallback'] == 2
+    assert db.replicas[0].stats()['healthy'] == 0
+
+
+def test_lag_is_rechecked_after_interval(mysql):
+    app, db = make_db(MYSQL_REPLICAS='replica-a')
+    set_lag(mysql, 'replica-a', 30)
+    with app.app_context():
+        assert read_host(db) == 'primary'
+    set_lag(mysql, 'replica-a', 0)
+    with app.app_context():
+        assert read_host(db) == 'primary'  # hasil pemeriksaan lama masih dipakai
+    db.replicas[0].checked_at -= 120
+    with app.app_context():
+        assert read_host(db) == 'replica-a'
+
+
+def test_host_that_is_not_a_replica_is_not_used(mysql):
+    # SHOW REPLICA STATUS kosong: primary lama / server standalone
+    app, db = make_db(MYSQL_REPLICAS='standalone')
+    with app.app_context():
+        assert read_host(db) == 'primary'
+    assert db.replicas[0].error
+
+    app, db = make_db(MYSQL_REPLICAS='standalone', MYSQL_REPLICA_ALLOW_NON_REPLICA=True)
+    with app.app_context():
+        assert read_host(db) == 'standalone'
+
+
+def test_reads_after_commit_stay_on_primary(mysql):
+    app, db = make_db()
+    set_lag(mysql, 'replica-a', 0)
+    set_lag(mysql, 'replica-b', 0)
+    with app.app_context():
+        with db.cursor() as cursor:
+            cursor.execute('INSERT INTO food_log (user_id) VALUES (%s)', (1,))
+        db.commit()
+        assert db.wrote
+        assert read_host(db) == 'primary'
+    with app.app_context():
+        db.use_primary()
+        assert read_host(db) == 'primary'
+    assert db.replica_stats()['reads']['primary_sticky'] == 1
+
+
+def test_unreachable_replica_is_marked_down(mysql, monkeypatch):
+    app, db = make_db(MYSQL_REPLICAS='replica-a')
+    set_lag(mysql, 'replica-a', 0)
+
+    def refuse():
+        raise OSError('connection refused')
+
+    monkeypatch.setattr(db.replicas[0].pool, 'acquire', refuse)
+    with app.app_context():
+        assert read_host(db) == 'primary'
+    assert db.replicas[0].stats()['failures'] == 1
+
+
+# --- read-your-writes antar request di app --------------------------------
+
+@pytest.fixture
+def replica_app(app_module, mysql, monkeypatch):
+    replica_db = app_module.db
+    replica = Replica('replica-a:3306', _replica_pool(replica_db, 'replica-a'), max_lag=5, check_interval=60)
+    set_lag(mysql, 'replica-a', 0)
+    monkeypatch.setattr(replica_db, 'replicas', [replica])
+    monkeypatch.setitem(app_module.app.config, 'DB_STICKY_SECONDS', 10)
+    app_module.user_info_cache.clear()
+    return app_module
+
+
+def _replica_pool(db, host):
+    return ConnectionPool(dict(db.pool.connect_kwargs, host=host), min_size=0, max_size=2)
+
+
+def food_log_reads(mysql, host):
+    return [q for q in mysql.server(host).queries if 'FROM food_log' in q and q.lstrip().upper().startswith('SELECT')]
+
+
+def test_user_reads_primary_for_a_while_after_writing(replica_app, client, login, mysql):
+    login(user_id=7)
+    client.get('/food_log')
+    assert food_log_reads(mysql, 'replica-a')
+
+    mysql.reset()
+    set_lag(mysql, 'replica-a', 0)
+    response = client.post('/food_log', data={'food_name': 'nasi', 'calories': 200, 'log_date': '2024-01-01'})
+    assert response.status_code == 302
+    with client.session_transaction() as sess:
+        assert sess['db_primary_until'] > time.time()
+
+    client.get('/food_log')
+    assert not food_log_reads(mysql, 'replica-a')
+    assert food_log_reads(mysql, replica_app.app.config['MYSQL_HOST'])
+
+    # Setelah DB_STICKY_SECONDS bacaan kembali ke replica
+    with client.session_transaction() as sess:
+        sess['db_primary_until'] = time.time() - 1
+    mysql.reset()
+    set_lag(mysql, 'replica-a', 0)
+    client.get('/food_log')
+    assert food_log_reads(mysql, 'replica-a')
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from executor import BoundedExecutor, FutureTimeoutError, Overloaded
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor('test', max_workers=1, max_queue=1, timeout=5)
+    yield executor
+    executor._pool.shutdown(wait=True)
+
+
+def test_rejects_when_workers_and_queue_are_full(executor):
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait(5)
+        return 'done'
+
+    running = executor.submit(blocked)
+    started.wait(5)
+    queued = executor.submit(lambda: 'queued')
+    with pytest.raises(Overloaded):
+        executor.submit(lambda: 'rejected')
+
+    stats = executor.stats()
+    assert stats['rejected'] == 1
+    assert stats['in_flight'] == 2 and stats['queued'] == 1
+
+    release.set()
+    assert running.result(5) == 'done'
+    assert queued.result(5) == 'queued'
+    # Slot kembali setelah pekerjaan selesai
+    assert executor.run(lambda: 42) == 42
+    assert executor.stats()['in_flight'] == 0
+
+
+def test_run_timeout_frees_the_caller(executor):
+    release = threading.Event()
+    with pytest.raises(FutureTimeoutError):
+        executor.run(release.wait, 5, timeout=0.05)
+    assert executor.stats()['timeouts'] == 1
+    release.set()
+
+
+def test_errors_are_counted_and_slot_released(executor):
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        executor.run(fail)
+    assert executor.stats()['errors'] == 1
+    assert executor.run(lambda: 'ok') == 'ok'
+
+
+def test_chatbot_returns_503_when_gemini_pool_is_full(client, app_module, monkeypatch):
+    def overloaded(*args, **kwargs):
+        raise Overloaded('gemini: antrean penuh')
+
+    monkeypatch.setattr(app_module, 'get_genai', lambda: object())
+    monkeypatch.setattr(app_module, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(app_module.gemini_executor, 'submit', overloaded)
+    app_module.chatbot_cache.clear()
+    response = client.post('/api/chatbot', json={'question': 'pertanyaan tanpa cache'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(app_module.GEMINI_RETRY_AFTER)
@@ -0,0 +1,25 @@
+import pytest
+
+
+@pytest.mark.parametrize('calories, expected', [
+    (250, 250),
+    (250.0, 250),
+    ('300', 300),
+    (250.7, None),
+    (True, None),
+    (float('nan'), None),
+    ('250.7', None),
+])
+def test_parse_calories(app_module, calories, expected):
+    assert app_module.parse_calories(calories) == expected
+
+
+def test_json_import_rejects_fractional_calories(client, login, mysql):
+    login()
+    response = client.post('/food_log/bulk', json={'entries': [
+        {'food_name': 'nasi goreng', 'calories': 250, 'log_date': '2024-01-01'},
+        {'food_name': 'teh manis', 'calories': 99.6, 'log_date': '2024-01-01'},
+    ]})
+    assert response.status_code == 200
+    assert response.json['inserted'] == 1
+    assert response.json['errors'] == [{'row': 2, 'error': 'Kalori harus bilangan bulat 0-20000'}]
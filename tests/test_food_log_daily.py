@@ -0,0 +1,129 @@
+from datetime import date
+
+import pytest
+
+
+class FoodLogTables:
+    # food_log + food_log_daily di memori, dipasang sebagai respons FakeServer
+    def __init__(self, server):
+        self.log = {}     # id -> [user_id, food_name, calories, log_date]
+        self.daily = {}   # (user_id, log_date) -> [total_calories, entry_count]
+        self.next_id = 1
+        server.responses.update({
+            'INSERT INTO food_log (': self.insert_log,
+            'SELECT calories, log_date FROM food_log WHERE id': self.select_log,
+            'UPDATE food_log SET': self.update_log,
+            'DELETE FROM food_log WHERE': self.delete_log,
+            'INSERT INTO food_log_daily': self.upsert_daily,
+            'DELETE FROM food_log_daily': self.delete_daily,
+        })
+
+    def insert_log(self, query, args):
+        user_id, name, calories, log_date = args
+        self.log[self.next_id] = [user_id, name, calories, str(log_date)]
+        self.next_id += 1
+        return []
+
+    def select_log(self, query, args):
+        row = self.log.get(args[0])
+        if row is None or row[0] != args[1]:
+            return []
+        return [(row[2], date.fromisoformat(row[3]))]
+
+    def update_log(self, query, args):
+        name, calories, log_date, log_id, user_id = args
+        row = self.log.get(log_id)
+        if row is None or row[0] != user_id:
+            return []
+        row[1:] = [name, calories, str(log_date)]
+        return [()]  # rowcount = 1
+
+    def delete_log(self, query, args):
+        row = self.log.get(args[0])
+        if row is not None and row[0] == args[1]:
+            del self.log[args[0]]
+        return []
+
+    def upsert_daily(self, query, args):
+        user_id, log_date, calories, count = args
+        totals = self.daily.setdefault((user_id, str(log_date)), [0, 0])
+        totals[0] += calories
+        totals[1] += count
+        return []
+
+    def delete_daily(self, query, args):
+        key = (args[0], str(args[1]))
+        if key in self.daily and self.daily[key][1] <= 0:
+            del self.daily[key]
+        return []
+
+    def expected(self):
+        # SELECT user_id, log_date, SUM(calories), COUNT(*) FROM food_log GROUP BY user_id, log_date
+        totals = {}
+        for user_id, _, calories, log_date in self.log.values():
+            row = totals.setdefault((user_id, log_date), [0, 0])
+            row[0] += calories
+            row[1] += 1
+        return totals
+
+    def assert_consistent(self):
+        assert self.daily == self.expected()
+
+
+@pytest.fixture
+def tables(app_module, client, login, mysql):
+    login(user_id=1)
+    return FoodLogTables(mysql.server(app_module.app.config['MYSQL_HOST']))
+
+
+def add(client, name, calories, log_date):
+    return client.post('/food_log', data={'food_name': name, 'calories': calories, 'log_date': log_date})
+
+
+def test_summary_follows_add_update_and_delete(client, tables):
+    add(client, 'nasi goreng', 600, '2024-01-01')
+    add(client, 'teh manis', 120, '2024-01-01')
+    add(client, 'bubur', 300, '2024-01-02')
+    tables.assert_consistent()
+    assert tables.daily[(1, '2024-01-01')] == [720, 2]
+
+    # Ubah kalori di tanggal yang sama
+    client.post('/update_food_log/1', data={'food_name': 'nasi goreng', 'calories': 450, 'log_date': '2024-01-01'})
+    tables.assert_consistent()
+    assert tables.daily[(1, '2024-01-01')] == [570, 2]
+
+    # Pindah tanggal: kontribusi lama dikurangi, tanggal baru ditambah
+    client.post('/update_food_log/2', data={'food_name': 'teh manis', 'calories': 150, 'log_date': '2024-01-02'})
+    tables.assert_consistent()
+    assert tables.daily[(1, '2024-01-01')] == [450, 1]
+    assert tables.daily[(1, '2024-01-02')] == [450, 2]
+
+    # Hapus entri terakhir di suatu tanggal: baris ringkasan ikut hilang
+    client.post('/delete_food_log/1')
+    tables.assert_consistent()
+    assert (1, '2024-01-01') not in tables.daily
+
+    client.post('/delete_food_log/2')
+    client.post('/delete_food_log/3')
+    assert tables.log == {} and tables.daily == {}
+
+
+def test_summary_ignores_entries_of_other_users(client, tables, login):
+    add(client, 'nasi goreng', 600, '2024-01-01')
+    login(user_id=2)
+    client.post('/update_food_log/1', data={'food_name': 'x', 'calories': 1, 'log_date': '2024-02-01'})
+    client.post('/delete_food_log/1')
+    tables.assert_consistent()
+    assert tables.daily == {(1, '2024-01-01'): [600, 1]}
+
+
+def test_bulk_insert_keeps_summary_consistent(client, tables):
+    add(client, 'bubur', 300, '2024-01-01')
+    response = client.post('/food_log/bulk', json={'entries': [
+        {'food_name': 'nasi', 'calories': 400, 'log_date': '2024-01-01'},
+        {'food_name': 'ayam', 'calories': 250, 'log_date': '2024-01-01'},
+        {'food_name': 'apel', 'calories': 80, 'log_date': '2024-01-03'},
+    ]})
+    assert response.json['inserted'] == 3
+    tables.assert_consistent()
+    assert tables.daily[(1, '2024-01-01')] == [950, 3]
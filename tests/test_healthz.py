@@ -0,0 +1,15 @@
+def test_healthz_is_a_bare_liveness_check(client):
+    response = client.get('/healthz')
+    assert response.status_code == 200
+    assert response.json == {'db': 'ok'}
+
+
+def test_healthz_details_requires_metrics_token(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', 'rahasia')
+    assert client.get('/healthz/details').status_code == 401
+    assert client.get('/healthz/details', headers={'Authorization': 'Bearer salah'}).status_code == 401
+
+    response = client.get('/healthz/details', headers={'Authorization': 'Bearer rahasia'})
+    assert response.status_code == 200
+    assert response.json['db'] == 'ok'
+    assert 'pool' in response.json and 'executors' in response.json
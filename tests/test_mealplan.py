@@ -0,0 +1,133 @@
+import random
+from datetime import date
+
+import pytest
+
+from mealplan import CALORIE_TOLERANCE, MAX_WEEKLY_USES, PLAN_DAYS, MealPlanner, default_protein, week_start
+
+# Kalori / protein per takaran saji yang kira-kira realistis per kategori
+CATEGORY_RANGES = {
+    'pokok': ((150, 350), (3, 8)),
+    'protein': ((80, 250), (10, 30)),
+    'lauk kuah': ((100, 250), (5, 20)),
+    'sayur': ((30, 120), (1, 5)),
+    'buah': ((40, 120), (0, 2)),
+    'minuman': ((0, 150), (0, 8)),
+    'camilan': ((100, 250), (2, 8)),
+}
+MONDAY = date(2024, 1, 1)
+
+
+def make_catalog(per_category=12, seed=0):
+    rng = random.Random(seed)
+    foods, next_id = [], 1
+    for category, ((cal_lo, cal_hi), (prot_lo, prot_hi)) in CATEGORY_RANGES.items():
+        for n in range(per_category):
+            foods.append({
+                'id': next_id,
+                'name': f'{category} {n}',
+                'category': category,
+                'serving': '1 porsi',
+                'calories': rng.randint(cal_lo, cal_hi),
+                'protein': round(rng.uniform(prot_lo, prot_hi), 1),
+            })
+            next_id += 1
+    return foods
+
+
+@pytest.fixture(scope='module')
+def planner():
+    return MealPlanner(make_catalog())
+
+
+def day_food_ids(day):
+    return [item['id'] for meal in day['meals'] for item in meal['items']]
+
+
+def test_week_start_is_monday():
+    assert week_start(date(2024, 1, 4)) == MONDAY
+    assert week_start(MONDAY) == MONDAY
+
+
+@pytest.mark.parametrize('goal_calories, goal_protein', [(1500, 80), (2000, 110), (2800, 150)])
+def test_days_land_near_goal(planner, goal_calories, goal_protein):
+    plan = planner.plan_week(goal_calories, goal_protein, seed=1, start=MONDAY)
+    assert len(plan['days']) == PLAN_DAYS
+    assert plan['goal_calories'] == goal_calories and plan['goal_protein'] == goal_protein
+    for day in plan['days']:
+        assert abs(day['calories'] - goal_calories) <= goal_calories * CALORIE_TOLERANCE
+        assert day['protein'] >= goal_protein * 0.85
+    assert abs(plan['avg_calories'] - goal_calories) <= goal_calories * 0.05
+
+
+def test_variety_constraints(planner):
+    plan = planner.plan_week(2000, 100, seed=7, start=MONDAY)
+    weekly = {}
+    yesterday = set()
+    for day in plan['days']:
+        ids = day_food_ids(day)
+        assert len(ids) == len(set(ids))          # tidak ada makanan ganda dalam sehari
+        assert not set(ids) & yesterday           # tidak mengulang makanan kemarin
+        yesterday = set(ids)
+        for food_id in ids:
+            weekly[food_id] = weekly.get(food_id, 0) + 1
+    assert max(weekly.values()) <= MAX_WEEKLY_USES
+
+
+def test_same_seed_gives_same_plan(planner):
+    first = planner.plan_week(2000, 100, seed=42, start=MONDAY)
+    assert planner.plan_week(2000, 100, seed=42, start=MONDAY) == first
+    # Planner baru dari katalog yang sama (mis. worker lain) juga sama
+    assert MealPlanner(list(reversed(make_catalog()))).plan_week(2000, 100, seed=42, start=MONDAY) == first
+    assert planner.plan_week(2000, 100, seed=43, start=MONDAY) != first
+
+
+def test_missing_protein_goal_uses_default(planner):
+    plan = planner.plan_week(2000, None, seed=1, start=MONDAY)
+    assert plan['goal_protein'] == default_protein(2000) == 100.0
+
+
+def test_no_plan_without_goal_or_catalog(planner):
+    assert planner.plan_week(0, 100, seed=1) is None
+    assert MealPlanner([]).plan_week(2000, 100, seed=1) is None
+
+
+# --- /dietplanner: GET hanya membaca, POST menyimpan ---------------------
+
+@pytest.fixture
+def dietplanner(app_module, client, login, mysql, planner, monkeypatch):
+    monkeypatch.setattr(app_module, 'get_meal_planner', lambda: planner)
+    login(user_id=5)
+    return mysql.server(app_module.app.config['MYSQL_HOST'])
+
+
+def meal_plan_writes(primary):
+    return [q for q in primary.queries if 'INTO meal_plans' in q]
+
+
+def test_get_computes_stale_plan_without_writing(dietplanner, client, planner):
+    stored = planner.plan_week(1800, 90, seed=5)
+    dietplanner.responses['FROM meal_plans'] = [{'plan': stored}]
+    dietplanner.responses['FROM progress_history'] = [{'goal_calories': 2200, 'goal_protein': 120.0}]
+    response = client.get('/dietplanner')
+    assert response.status_code == 200
+    assert b'Target 2200 kcal' in response.data
+    assert not meal_plan_writes(dietplanner) and dietplanner.commits == 0
+
+
+def test_get_shows_stored_plan_when_goal_unchanged(dietplanner, client, planner, monkeypatch, app_module):
+    stored = planner.plan_week(2000, 100.0, seed=5)
+    dietplanner.responses['FROM meal_plans'] = [{'plan': stored}]
+    dietplanner.responses['FROM progress_history'] = [{'goal_calories': 2000, 'goal_protein': 100.0}]
+    monkeypatch.setattr(app_module, 'get_meal_planner', lambda: pytest.fail('menu tersimpan harus dipakai'))
+    response = client.get('/dietplanner')
+    assert b'Target 2000 kcal' in response.data
+    assert not meal_plan_writes(dietplanner)
+
+
+def test_post_saves_plan(dietplanner, client):
+    response = client.post('/dietplanner', data={
+        'weight': 70, 'height': 170, 'age': 30, 'gender': 'male', 'activity': 'light', 'goal': 'lose_weight'})
+    assert response.status_code == 200
+    [(query, args)] = [(q, a) for q, a in dietplanner.batches if 'INTO meal_plans' in q]
+    assert args[0][0] == 5
@@ -0,0 +1,144 @@
+import random
+
+import numpy as np
+import pytest
+
+from planner import compute_plan, compute_plans, plan_rows, round_like_python, valid_mask
+
+
+# Rumus per baris dari dietplanner() sebelum planning engine (referensi)
+def scalar_plan(weight, height, age, gender, activity, goal):
+    height_m = height / 100
+    bmi = round(weight / (height_m * height_m), 1)
+    if bmi < 16:
+        bmi_status = "Sangat Kurus"
+    elif bmi < 18.5:
+        bmi_status = "Kurus"
+    elif bmi < 22:
+        bmi_status = "Normal"
+    elif bmi < 25:
+        bmi_status = "Ideal"
+    elif bmi < 27:
+        bmi_status = "Gemuk"
+    elif bmi < 30:
+        bmi_status = "Sangat Gemuk"
+    else:
+        bmi_status = "Obesitas"
+
+    if gender == 'male':
+        bmr = 88.362 + (13.397 * weight) + (4.799 * height) - (5.677 * age)
+    else:
+        bmr = 447.593 + (9.247 * weight) + (3.098 * height) - (4.330 * age)
+    factor = {'sedentary': 1.2, 'light': 1.375, 'moderate': 1.55, 'active': 1.725, 'very_active': 1.9}.get(activity, 1.2)
+    daily_calories = int(bmr * factor)
+
+    if bmi_status in ("Sangat Kurus", "Kurus"):
+        deposit_calories = daily_calories + 400
+    elif bmi_status == "Obesitas":
+        deposit_calories = daily_calories - 400
+    else:
+        deposit_calories = daily_calories
+
+    protein = round(weight * 1.5, 1)
+    goal_calories, goal_protein = deposit_calories, protein
+    if goal in ("gain_weight", "gain"):
+        goal_calories, goal_protein, goal_key = deposit_calories + 300, round(weight * 1.8, 1), 'gain'
+    elif goal in ("maintain_weight", "maintain"):
+        goal_key = 'maintain'
+    elif goal in ("lose_weight", "loss"):
+        goal_calories, goal_protein, goal_key = deposit_calories - 300, round(weight * 1.2, 1), 'lose'
+    else:
+        goal_key = 'lose'
+    return {
+        'bmi': bmi,
+        'bmi_status': bmi_status,
+        'daily_calories': daily_calories,
+        'deposit_calories': deposit_calories,
+        'protein': protein,
+        'goal_calories': goal_calories,
+        'goal_protein': goal_protein,
+        'goal_key': goal_key,
+    }
+
+
+GENDERS = ['male', 'female', None]
+ACTIVITIES = ['sedentary', 'light', 'moderate', 'active', 'very_active', 'None', None]
+GOALS = ['gain_weight', 'gain', 'maintain_weight', 'maintain', 'lose_weight', 'loss', None, 'x']
+
+
+def random_inputs(n, seed=1):
+    rng = random.Random(seed)
+    return [
+        (round(rng.uniform(30, 200), rng.choice([0, 1, 2])), float(rng.randint(120, 210)), rng.randint(10, 90),
+         rng.choice(GENDERS), rng.choice(ACTIVITIES), rng.choice(GOALS))
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize('values', [
+    np.arange(0, 200, 0.05),                 # semua tie di desimal kedua
+    np.array([0.25, 0.35, 2.675, 1.45, 105.45, 94.95, 24.05, 18.45]),
+    np.random.default_rng(0).uniform(0, 300, 5000),
+])
+def test_round_like_python_matches_builtin_round(values):
+    expected = [round(float(v), 1) for v in values]
+    assert round_like_python(values).tolist() == expected
+
+
+def test_compute_plan_matches_scalar_formulas():
+    for args in random_inputs(20000):
+        result = compute_plan(*args)
+        expected = scalar_plan(*args)
+        assert {key: result[key] for key in expected} == expected, args
+
+
+def test_bmi_and_protein_on_rounding_ties():
+    # Berat yang membuat weight * faktor tepat di .x5 (kasus yang berbeda antara np.round dan round)
+    for weight in np.arange(40, 120, 0.1).round(1):
+        weight = float(weight)
+        for goal in ('gain', 'maintain', 'lose'):
+            result = compute_plan(weight, 170.0, 30, 'female', 'light', goal)
+            expected = scalar_plan(weight, 170.0, 30, 'female', 'light', goal)
+            assert result['protein'] == expected['protein']
+            assert result['goal_protein'] == expected['goal_protein']
+            assert result['bmi'] == expected['bmi']
+
+
+def test_batch_matches_single_rows():
+    inputs = random_inputs(2000, seed=2)
+    columns = list(zip(*inputs))
+    plans = compute_plans(*columns)
+    rows = plan_rows(*columns)
+    for i, args in enumerate(inputs):
+        expected = scalar_plan(*args)
+        assert float(plans['bmi'][i]) == expected['bmi']
+        assert int(plans['goal_calories'][i]) == expected['goal_calories']
+        assert {key: rows[i][key] for key in expected} == expected
+
+
+def test_plan_rows_marks_invalid_rows():
+    rows = plan_rows([70, 0, float('nan'), 60], [170, 170, 170, -1], [30, 30, 30, 30], 'male', 'light', 'lose')
+    assert rows[0] is not None
+    assert rows[1:] == [None, None, None]
+
+
+@pytest.mark.parametrize('weight, height, age, valid', [
+    (1, 50, 1, True),
+    (500, 300, 150, True),
+    (0.9, 170, 30, False),
+    (500.1, 170, 30, False),
+    (70, 49, 30, False),
+    (70, 301, 30, False),
+    (70, 170, 0, False),
+    (70, 170, 151, False),
+    (1e308, 0.0001, 30, False),
+    (float('inf'), 170, 30, False),
+])
+def test_valid_mask_physical_ranges(weight, height, age, valid):
+    assert bool(valid_mask(weight, height, age)) is valid
+
+
+def test_out_of_range_rows_do_not_overflow():
+    rows = plan_rows([1e308, 500], [0.0001, 50], [30, 150], 'male', 'light', 'lose')
+    assert rows[0] is None
+    assert np.isfinite(rows[1]['bmi']) and 0 < rows[1]['daily_calories'] < 2 ** 31
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from planner import RANGE_ERROR
+
+TOKEN = 'batch-token'
+AUTH = {'Authorization': f'Bearer {TOKEN}'}
+
+
+@pytest.fixture
+def batch(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'BATCH_API_TOKEN', TOKEN)
+
+    def post(body, content_type='text/csv', headers=AUTH, **params):
+        return client.post('/api/plans/batch', data=body, content_type=content_type,
+                           headers=headers, query_string=params)
+    return post
+
+
+def lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_requires_bearer_token(batch, app_module, monkeypatch):
+    assert batch('weight,height,age\n70,170,30\n', headers={}).status_code == 401
+    assert batch('weight,height,age\n70,170,30\n', headers={'Authorization': 'Bearer salah'}).status_code == 401
+    assert batch('{}', content_type='text/plain').status_code == 415
+    monkeypatch.setattr(app_module, 'BATCH_API_TOKEN', None)
+    assert batch('weight,height,age\n70,170,30\n').status_code == 503
+
+
+def test_csv_rows_are_planned_in_chunks(batch):
+    body = 'id,weight,height,age,gender,activity,goal\n' + ''.join(
+        f'{i},{60 + i},170,30,male,light,lose\n' for i in range(5))
+    response = batch(body, chunk_size=2)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    out = lines(response)
+    assert [row['row'] for row in out] == [1, 2, 3, 4, 5]
+    assert [row['id'] for row in out] == ['0', '1', '2', '3', '4']
+    assert all(row['goal_key'] == 'lose' and 'error' not in row for row in out)
+
+
+def test_ndjson_bad_and_out_of_range_rows(batch):
+    body = '\n'.join([
+        json.dumps({'weight': 70, 'height': 170, 'age': 30, 'gender': 'female'}),
+        'bukan json',
+        json.dumps({'weight': 1e308, 'height': 0.0001, 'age': 30}),
+        '',
+        json.dumps({'weight': 80, 'height': 180, 'age': 40, 'goal': 'gain'}),
+    ])
+    out = lines(batch(body, content_type='application/x-ndjson'))
+    assert [row['row'] for row in out] == [1, 2, 3, 4]
+    assert out[0]['bmi'] == 24.2
+    assert out[1]['error'] == 'Baris tidak dapat dibaca'
+    assert out[2]['error'] == RANGE_ERROR
+    assert out[3]['goal_key'] == 'gain'
+
+
+def test_invalid_utf8_ends_stream_with_error_line(batch):
+    body = b'weight,height,age\n70,170,30\n' + b'\xff\xfe\xfa,170,30\n' * 2000
+    out = lines(batch(body))
+    assert out[-1]['error'].startswith('Data tidak dapat dibaca')
+    assert 'bmi' not in out[-1]
+
+
+def test_save_writes_existing_users_with_executemany(batch, app_module, mysql):
+    primary = mysql.server(app_module.app.config['MYSQL_HOST'])
+    primary.responses['FROM users WHERE id IN'] = [(1,), (2,)]
+    body = ('user_id,weight,height,age,gender,activity,goal\n'
+            '1,70,170,30,male,light,lose\n'
+            '2,1000,170,30,male,light,lose\n'
+            '3,60,160,25,female,moderate,maintain\n')
+    out = lines(batch(body, save=1))
+    assert [row.get('saved') for row in out] == [True, None, False]
+    assert out[1]['error'] == RANGE_ERROR
+
+    [(query, args)] = primary.batches
+    assert query.startswith('INSERT INTO progress_history')
+    # Baris di luar rentang tidak dikirim ke DB; user 3 tidak ada di tabel users
+    assert [row[0] for row in args] == [1]
+    assert primary.commits == 1
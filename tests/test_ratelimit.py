@@ -0,0 +1,157 @@
+import pytest
+from flask import Flask, session
+
+import ratelimit
+from ratelimit import MemoryBuckets, RateLimiter, parse_rule
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.mark.parametrize('rule, expected', [
+    ('10/minute', (10 / 60, 10.0)),
+    ('5/second;burst=2', (5.0, 2.0)),
+    ('100/hours', (100 / 3600, 100.0)),
+    ('off', None),
+    ('0', None),
+    (None, None),
+])
+def test_parse_rule(rule, expected):
+    assert parse_rule(rule) == expected
+
+
+def test_bucket_refills_over_time(clock):
+    buckets = MemoryBuckets()
+    rate, burst = 1.0, 2.0  # 1 token per detik, maksimal 2
+    assert buckets.take('k', rate, burst) == (True, 0.0)
+    assert buckets.take('k', rate, burst) == (True, 0.0)
+    allowed, retry_after = buckets.take('k', rate, burst)
+    assert not allowed and retry_after == pytest.approx(1.0)
+
+    clock.now += 0.5
+    allowed, retry_after = buckets.take('k', rate, burst)
+    assert not allowed and retry_after == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert buckets.take('k', rate, burst)[0]
+    # Tidak terisi melebihi burst walaupun lama menganggur
+    clock.now += 60
+    assert [buckets.take('k', rate, burst)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_buckets_are_evicted_lru(clock):
+    buckets = MemoryBuckets(maxsize=2)
+    for key in ('a', 'b', 'c'):
+        buckets.take(key, 1.0, 1.0)
+    assert buckets.stats()['buckets'] == 2
+    # 'a' dibuang, jadi mendapat bucket penuh lagi
+    assert buckets.take('a', 1.0, 1.0)[0]
+
+
+def make_app(limiter):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+
+    @app.route('/ping', methods=['GET', 'POST'])
+    @limiter.limit('ping', user='2/minute', ip='3/minute', methods=('POST',))
+    def ping():
+        return 'ok'
+
+    @app.route('/login/<int:user_id>')
+    def login(user_id):
+        session['loggedin'] = True
+        session['id'] = user_id
+        return 'ok'
+
+    return app
+
+
+def test_limited_request_gets_429_with_retry_after(clock):
+    limiter = RateLimiter(MemoryBuckets())
+    client = make_app(limiter).test_client()
+    client.get('/login/1')
+
+    assert [client.post('/ping').status_code for _ in range(2)] == [200, 200]
+    response = client.post('/ping')
+    assert response.status_code == 429
+    # 2/minute: token berikutnya tersedia setelah 30 detik
+    assert response.headers['Retry-After'] == '30'
+    # Method yang tidak dibatasi tetap lolos
+    assert client.get('/ping').status_code == 200
+
+    clock.now += 30
+    assert client.post('/ping').status_code == 200
+    assert limiter.stats()['ping_limited'] == 1
+
+
+def test_ip_limit_applies_across_users(clock):
+    limiter = RateLimiter(MemoryBuckets())
+    app = make_app(limiter)
+    statuses = []
+    for user_id in (1, 2, 3, 4):
+        client = app.test_client()
+        client.get(f'/login/{user_id}')
+        statuses.append(client.post('/ping').status_code)
+    assert statuses == [200, 200, 200, 429]
+
+
+def test_rejected_by_ip_does_not_spend_user_tokens(clock):
+    # Jatah user diisi lambat (2/jam) agar token yang hilang tidak tertutup refill
+    limiter = RateLimiter(MemoryBuckets(), env={'RATE_LIMIT_PING_USER': '2/hour'})
+    app = make_app(limiter)
+    for user_id in (2, 3, 4):  # user lain di balik NAT yang sama menghabiskan bucket IP
+        other = app.test_client()
+        other.get(f'/login/{user_id}')
+        other.post('/ping')
+    client = app.test_client()
+    client.get('/login/1')
+    assert {client.post('/ping').status_code for _ in range(5)} == {429}
+
+    clock.now += 60  # bucket IP terisi penuh lagi, bucket user tidak berubah
+    assert [client.post('/ping').status_code for _ in range(3)] == [200, 200, 429]
+    assert limiter.stats()['ping_limited'] == 6
+
+
+def test_ip_limit_uses_forwarded_client_behind_trusted_proxy(clock):
+    from werkzeug.middleware.proxy_fix import ProxyFix
+
+    limiter = RateLimiter(MemoryBuckets(), trust_proxy=True)
+    app = make_app(limiter)
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+    client = app.test_client()
+    for i in range(5):
+        response = client.post('/ping', headers={'X-Forwarded-For': f'10.0.0.{i}'})
+        assert response.status_code == 200
+
+
+def test_env_overrides_and_disabled_limiter(clock):
+    limiter = RateLimiter(MemoryBuckets(), env={'RATE_LIMIT_PING_USER': 'off', 'RATE_LIMIT_PING_IP': '1/minute'})
+    client = make_app(limiter).test_client()
+    assert [client.post('/ping').status_code for _ in range(2)] == [200, 429]
+
+    disabled = RateLimiter(MemoryBuckets(), enabled=False)
+    client = make_app(disabled).test_client()
+    assert {client.post('/ping').status_code for _ in range(10)} == {200}
+
+
+def test_app_returns_json_429_for_api_routes(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module.rate_limiter, 'enabled', True)
+    monkeypatch.setattr(app_module.rate_limiter, 'backend', MemoryBuckets())
+    monkeypatch.setitem(app_module.rate_limiter.rules, 'list_models', {'user': None, 'ip': (1 / 60, 1.0)})
+    client.get('/api/list_models')
+    response = client.get('/api/list_models')
+    assert response.status_code == 429
+    assert response.is_json and response.json['error']
+    assert int(response.headers['Retry-After']) >= 1
@@ -0,0 +1,93 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from sessions import SQLiteSessionStore
+
+
+def test_sqlite_store_roundtrip_and_revoke(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.sqlite3'))
+    store.save('a', '{"id": 1}', 1, ttl=60)
+    store.save('b', '{"id": 1}', 1, ttl=60)
+    store.save('c', '{"id": 2}', 2, ttl=60)
+    data, expires_at = store.get('a')
+    assert data == '{"id": 1}' and expires_at > time.time()
+
+    assert store.delete_user(1) == 2
+    assert store.get('a') == (None, None) and store.get('c')[0] is not None
+
+    store.save('old', '{}', None, ttl=-1)
+    assert store.get('old') == (None, None)
+    assert store.purge_expired() == 1
+
+
+@pytest.fixture
+def server_sessions(app_module):
+    store = app_module.app.session_interface.store
+    cookie_name = app_module.app.config['SESSION_COOKIE_NAME']
+
+    def sid(client):
+        cookie = client.get_cookie(cookie_name)
+        return cookie.value if cookie else None
+    return store, sid
+
+
+@pytest.fixture
+def user_row(app_module, mysql):
+    primary = mysql.server(app_module.app.config['MYSQL_HOST'])
+    primary.responses['FROM users WHERE username = %s LIMIT 1'] = [{
+        'id': 9, 'username': 'budi', 'fullname': 'Budi', 'email': 'budi@example.com',
+        'created_at': datetime(2024, 1, 1), 'password_hash': app_module.password_hasher.hash('rahasia'),
+    }]
+    return primary
+
+
+def test_login_regenerates_sid_and_sets_permanent_cookie(client, server_sessions, user_row):
+    store, sid = server_sessions
+    with client.session_transaction() as sess:
+        sess['next'] = '/dietplanner'  # session anonim yang sudah tersimpan
+    anonymous_sid = sid(client)
+    assert store.get(anonymous_sid)[0] is not None
+
+    response = client.post('/login', data={'email': 'budi', 'password': 'rahasia'})
+    assert response.status_code == 302
+    logged_in_sid = sid(client)
+    assert logged_in_sid != anonymous_sid
+    assert store.get(anonymous_sid) == (None, None)  # mencegah session fixation
+
+    # Cookie persisten: berakhir bersamaan dengan baris session di store
+    cookie = client.get_cookie('session')
+    assert cookie.expires is not None
+    _, store_expires = store.get(logged_in_sid)
+    assert abs(cookie.expires.timestamp() - store_expires) < 5
+    with client.session_transaction() as sess:
+        assert sess.permanent and sess['id'] == 9
+
+    client.get('/logout')
+    assert store.get(logged_in_sid) == (None, None)
+    with client.session_transaction() as sess:
+        assert 'loggedin' not in sess
+
+
+def test_revoke_sessions_cli(app_module, mysql, server_sessions):
+    store, sid = server_sessions
+    clients = [app_module.app.test_client() for _ in range(2)]
+    sids = []
+    for c in clients:
+        with c.session_transaction() as sess:
+            sess['loggedin'] = True
+            sess['id'] = 4
+        sids.append(sid(c))
+    assert all(store.get(s)[0] is not None for s in sids)
+
+    primary = mysql.server(app_module.app.config['MYSQL_HOST'])
+    primary.responses['FROM users WHERE username = %s'] = [(4,)]
+    result = app_module.app.test_cli_runner().invoke(args=['revoke-sessions', 'andi'])
+    assert result.exit_code == 0, result.output
+    assert '2 session dicabut' in result.output
+    assert all(store.get(s) == (None, None) for s in sids)
+
+    primary.responses['FROM users WHERE username = %s'] = []
+    result = app_module.app.test_cli_runner().invoke(args=['revoke-sessions', 'tidak-ada'])
+    assert result.exit_code != 0 and 'tidak ditemukan' in result.output
@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from writebehind import WriteBehindBuffer
+
+
+class Sink:
+    # flush_rows palsu: menyimpan batch, atau gagal selama `failing` True
+    def __init__(self):
+        self.batches = []
+        self.failing = False
+        self.flushed = threading.Event()
+
+    def __call__(self, rows):
+        if self.failing:
+            raise RuntimeError('db down')
+        self.batches.append(list(rows))
+        self.flushed.set()
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+
+def make_row(user_id, n):
+    return {'user_id': user_id, 'n': n, 'created_at': datetime(2024, 1, 1, 8, 0, n)}
+
+
+@pytest.fixture
+def sink():
+    return Sink()
+
+
+@pytest.fixture
+def spill_path(tmp_path):
+    return str(tmp_path / 'history.spill')
+
+
+def test_flushes_in_batches_when_max_rows_reached(sink):
+    buffer = WriteBehindBuffer('test', sink, max_rows=3, max_delay=60)
+    for n in range(3):
+        assert buffer.add(make_row(1, n))
+    assert sink.flushed.wait(5)
+    assert [row['n'] for row in sink.rows] == [0, 1, 2]
+    assert buffer.stats()['flushes'] == 1
+    buffer.close()
+
+
+def test_flushes_after_max_delay(sink):
+    buffer = WriteBehindBuffer('test', sink, max_rows=100, max_delay=0.05)
+    buffer.add(make_row(1, 0))
+    assert sink.flushed.wait(5)
+    assert len(sink.rows) == 1
+    buffer.close()
+
+
+def test_pending_rows_are_visible_per_user(sink):
+    buffer = WriteBehindBuffer('test', sink, max_rows=100, max_delay=60)
+    buffer.add(make_row(1, 0))
+    buffer.add(make_row(2, 1))
+    assert [row['n'] for row in buffer.pending(1)] == [0]
+    assert buffer.flush() == 2
+    assert buffer.pending(1) == []
+    buffer.close()
+
+
+def test_failed_flush_keeps_rows_for_retry(sink):
+    buffer = WriteBehindBuffer('test', sink, max_rows=100, max_delay=60)
+    sink.failing = True
+    buffer.add(make_row(1, 0))
+    assert buffer.flush() == 0
+    assert buffer.stats()['errors'] == 1
+    assert buffer.stats()['queued'] == 1
+
+    sink.failing = False
+    assert buffer.flush() == 1
+    assert [row['n'] for row in sink.rows] == [0]
+    buffer.close()
+
+
+def test_overflow_goes_to_spill_file(sink, spill_path):
+    buffer = WriteBehindBuffer('test', sink, max_rows=100, max_delay=60, max_pending=2, spill_path=spill_path)
+    sink.failing = True
+    for n in range(5):
+        buffer.add(make_row(1, n))
+    buffer.flush()
+    # Baris tertua dipindah ke spill file, dua terbaru tetap antre
+    with open(spill_path, encoding='utf-8') as f:
+        assert [json.loads(line)['n'] for line in f] == [0, 1, 2]
+    assert buffer.stats()['queued'] == 2
+    assert buffer.stats()['spilled'] == 3
+    buffer.close()
+    with open(spill_path, encoding='utf-8') as f:
+        assert [json.loads(line)['n'] for line in f] == [0, 1, 2, 3, 4]
+
+
+def test_close_spills_unsaved_rows_and_next_start_recovers_them(sink, spill_path):
+    buffer = WriteBehindBuffer('test', sink, max_rows=100, max_delay=60, spill_path=spill_path)
+    sink.failing = True
+    buffer.add(make_row(1, 0))
+    buffer.add(make_row(2, 1))
+    buffer.close()
+    assert buffer.add(make_row(1, 2)) is False  # sudah ditutup: caller menulis langsung
+    assert os.path.exists(spill_path)
+
+    # Worker berikutnya: spill file dimuat saat add() pertama
+    recovered = Sink()
+    restarted = WriteBehindBuffer('test', recovered, max_rows=100, max_delay=0.05, spill_path=spill_path)
+    restarted.add(make_row(3, 3))
+    deadline = time.monotonic() + 5
+    while len(recovered.rows) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(row['n'] for row in recovered.rows) == [0, 1, 3]
+    # created_at dikembalikan sebagai datetime
+    assert all(isinstance(row['created_at'], datetime) for row in recovered.rows)
+    assert restarted.stats()['recovered'] == 2
+    assert not os.path.exists(spill_path)
+    restarted.close()
+
+
+def test_spill_without_path_drops_rows(sink):
+    buffer = WriteBehindBuffer('test', sink, max_rows=100, max_delay=60)
+    sink.failing = True
+    buffer.add(make_row(1, 0))
+    buffer.close()
+    assert buffer.stats()['dropped'] == 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork tidak tersedia')
+def test_forked_worker_starts_its_own_flush_thread(sink):
+    buffer = WriteBehindBuffer('test', sink, max_rows=100, max_delay=0.05)
+    buffer.add(make_row(1, 0))
+    buffer.flush()
+    sink.flushed.clear()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: antrean parent tidak ikut, thread flush dimulai oleh add()
+        try:
+            ok = buffer.pending(1) == [] and buffer._thread is None
+            buffer.add(make_row(1, 1))
+            ok = ok and sink.flushed.wait(5) and sink.rows[-1]['n'] == 1
+            os.write(write_fd, b'1' if ok else b'0')
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b'1'
+    os.close(read_fd)
+    buffer.close()
@@ -0,0 +1,232 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Write-behind buffer untuk INSERT yang tidak perlu menunggu commit
+#
+# Request hanya menambahkan baris ke buffer di memori; thread latar menulis
+# buffer ke DB dengan satu multi-row INSERT + satu commit jika jumlah baris
+# mencapai max_rows atau baris tertua sudah menunggu max_delay detik.
+#
+# - Gagal flush: baris dikembalikan ke depan antrean dan dicoba lagi.
+#   Jika antrean melebihi max_pending, baris tertua dipindah ke spill file
+#   (atau dibuang jika spill_path tidak diisi).
+# - Shutdown (atexit): flush terakhir; yang gagal ditulis ke spill file
+#   (NDJSON) dan dimuat ulang oleh load_spill() saat worker berikutnya start.
+# - pending(user_id): baris yang belum tersimpan, untuk read-your-writes di
+#   proses yang sama.
+# - Fork (gunicorn --preload): thread tidak ikut ter-fork, jadi thread flush
+#   dijalankan lazy per proses pada add() pertama. Child membuang salinan
+#   antrean parent (tetap milik parent) dan membuat ulang lock-nya.
+# ---------------------------------------------------------
+
+
+def _encode(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'Tidak dapat di-serialize: {type(value).__name__}')
+
+
+class WriteBehindBuffer:
+    def __init__(self, name, flush_rows, max_rows=200, max_delay=1.0, max_pending=50000,
+                 spill_path=None, datetime_fields=('created_at',)):
+        # flush_rows(list of dict) menulis + commit satu batch; raise jika gagal
+        self.name = name
+        self.flush_rows = flush_rows
+        self.max_rows = max(1, max_rows)
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+        self.datetime_fields = datetime_fields
+        self._rows = []
+        self._inflight = []
+        self._oldest = None
+        self._closed = False
+        self._thread = None
+        self._atexit = False
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._counters = {'enqueued': 0, 'flushed': 0, 'flushes': 0, 'errors': 0,
+                          'spilled': 0, 'recovered': 0, 'dropped': 0}
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Dijalankan di child tepat setelah fork (hanya satu thread yang hidup)
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._rows, self._inflight, self._oldest = [], [], None
+        self._thread = None
+        for key in self._counters:
+            self._counters[key] = 0
+
+    def start(self):
+        # Muat spill file lalu jalankan thread flush di proses ini
+        with self._cond:
+            self._start_locked()
+        return self
+
+    def _start_locked(self):
+        if self._thread is None and not self._closed:
+            # Sebelum baris pertama proses ini masuk antrean, agar spill milik
+            # proses ini sendiri tidak ikut termuat ulang
+            try:
+                self.load_spill()
+            except OSError as e:
+                logger.error('Write-behind %s gagal memuat spill file: %s', self.name, e)
+            self._thread = threading.Thread(target=self._run, name=f'writebehind-{self.name}', daemon=True)
+            self._thread.start()
+            if not self._atexit:
+                # Registrasi atexit ikut diwarisi child, cukup sekali
+                self._atexit = True
+                atexit.register(self.close)
+
+    def add(self, row):
+        # False jika buffer sudah ditutup (caller menulis langsung ke DB)
+        with self._cond:
+            if self._closed:
+                return False
+            self._start_locked()
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+            self._counters['enqueued'] += 1
+            if len(self._rows) >= self.max_rows:
+                self._cond.notify()
+        return True
+
+    def pending(self, user_id):
+        with self._cond:
+            return [row for row in self._inflight + self._rows if row.get('user_id') == user_id]
+
+    def _due(self):
+        return self._rows and (len(self._rows) >= self.max_rows or time.monotonic() - self._oldest >= self.max_delay)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    wait = self.max_delay
+                    if self._rows:
+                        wait = max(0.0, self.max_delay - (time.monotonic() - self._oldest))
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self):
+        # Tulis semua baris yang antre; mengembalikan jumlah baris yang tersimpan
+        with self._flush_lock:
+            with self._cond:
+                rows, self._rows = self._rows, []
+                self._inflight = rows
+                self._oldest = None
+            done = 0
+            try:
+                while done < len(rows):
+                    batch = rows[done:done + self.max_rows]
+                    self.flush_rows(batch)
+                    done += len(batch)
+                    with self._cond:
+                        self._inflight = rows[done:]
+                        self._counters['flushed'] += len(batch)
+                        self._counters['flushes'] += 1
+            except Exception as e:
+                logger.error('Write-behind %s gagal menulis %d baris: %s', self.name, len(rows) - done, e)
+                with self._cond:
+                    # Dicoba lagi setelah max_delay (baris gagal kembali ke depan antrean)
+                    self._rows[:0] = rows[done:]
+                    self._oldest = time.monotonic()
+                    self._counters['errors'] += 1
+                    overflow = self._rows[:max(0, len(self._rows) - self.max_pending)]
+                    del self._rows[:len(overflow)]
+                if overflow:
+                    self._spill(overflow)
+            finally:
+                with self._cond:
+                    self._inflight = []
+            return done
+
+    def _spill(self, rows):
+        if not self.spill_path:
+            logger.error('Write-behind %s membuang %d baris (spill_path tidak diisi)', self.name, len(rows))
+            with self._cond:
+                self._counters['dropped'] += len(rows)
+            return
+        try:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=_encode) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            with self._cond:
+                self._counters['spilled'] += len(rows)
+            logger.warning('Write-behind %s: %d baris disimpan ke %s', self.name, len(rows), self.spill_path)
+        except OSError as e:
+            logger.error('Write-behind %s gagal menulis spill file: %s', self.name, e)
+            with self._cond:
+                self._counters['dropped'] += len(rows)
+
+    def load_spill(self):
+        # Masukkan kembali baris dari spill file ke antrean. File di-rename dulu
+        # (atomik) agar hanya satu worker yang memuatnya.
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return 0
+        recovering = f'{self.spill_path}.{os.getpid()}.recovering'
+        try:
+            os.rename(self.spill_path, recovering)
+        except OSError:
+            return 0
+        rows = []
+        with open(recovering, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                for field in self.datetime_fields:
+                    if row.get(field):
+                        row[field] = datetime.fromisoformat(row[field])
+                rows.append(row)
+        with self._cond:
+            self._rows.extend(rows)
+            if rows and self._oldest is None:
+                self._oldest = time.monotonic()
+            self._counters['recovered'] += len(rows)
+        os.remove(recovering)
+        if rows:
+            logger.info('Write-behind %s: %d baris dimuat ulang dari spill file', self.name, len(rows))
+        return len(rows)
+
+    def close(self, timeout=5):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+        with self._cond:
+            rows, self._rows = self._rows, []
+            self._oldest = None
+        if rows:
+            self._spill(rows)
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._counters)
+            data['queued'] = len(self._rows) + len(self._inflight)
+            data['oldest_age'] = round(time.monotonic() - self._oldest, 3) if self._oldest else 0.0
+        data['max_rows'] = self.max_rows
+        return data